@@ -5,6 +5,8 @@ import pyautogui
 import numpy as np
 import collections
 import matplotlib.pyplot as plt
+import multiprocessing
+from multiprocessing import shared_memory
 import time
 from enum import IntEnum
 from google.protobuf.json_format import MessageToDict
@@ -13,6 +15,9 @@ pyautogui.FAILSAFE = False
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
+TRAIL_LENGTH = 500  # points shown per plot
+PLOT_FPS = 20       # the plots redraw at most this often, in their own process
+
 # ==================== Gestures ====================
 class Gest(IntEnum):
     FIST = 0; PALM = 31; V_GEST = 33; TWO_FINGER_CLOSED = 34
@@ -57,16 +62,59 @@ class TremorFilter:
         avg_y = sum(p[1] for p in self.buffer) / len(self.buffer)
         return avg_x, avg_y
 
-# ==================== Main System ====================
-class GestureController:
-    def __init__(self):
-        self.cap = cv2.VideoCapture(0)
-        self.filter = TremorFilter()
-        self.recog = HandRecog()
-        self.raw_trail = collections.deque(maxlen=500)
-        self.clean_trail = collections.deque(maxlen=500)
+# ==================== Shared Trail ====================
+class SharedTrail:
+    """
+    Ring buffer of the last `capacity` (raw_x, raw_y, clean_x, clean_y) points
+    in shared memory. The control loop appends in O(1); the plot process
+    attaches with the same name and count and reads snapshots.
+    """
+    def __init__(self, capacity=TRAIL_LENGTH, name=None, count=None):
+        self.capacity = capacity
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner,
+                                              size=capacity * 4 * np.dtype(np.float64).itemsize)
+        self.points = np.ndarray((capacity, 4), dtype=np.float64, buffer=self.shm.buf)
+        # Points written so far; there is a single writer, so no lock
+        self.count = count if count is not None else multiprocessing.Value('q', 0, lock=False)
+
+    def append(self, raw_x, raw_y, clean_x, clean_y):
+        self.points[self.count.value % self.capacity] = (raw_x, raw_y, clean_x, clean_y)
+        self.count.value += 1
+
+    def snapshot(self, count):
+        """Copy of the points, oldest first, as of `count` writes."""
+        if count <= self.capacity:
+            points = self.points[:count].copy()
+        else:
+            start = count % self.capacity
+            points = np.concatenate((self.points[start:], self.points[:start]))
+        # The writer doesn't wait for us: drop the oldest slots it overwrote
+        # during the copy, plus the one it may be writing right now
+        after = self.count.value + 1
+        overwritten = max(0, after - self.capacity) - max(0, count - self.capacity)
+        return points[min(overwritten, len(points)):]
+
+    def close(self):
+        del self.points
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# ==================== Plot Renderer ====================
+class TrailRenderer:
+    """
+    The raw and filtered trails, redrawn at most `fps` times a second. Only
+    the lines, dots and titles are redrawn (blitted over a cached background);
+    a full redraw happens when the trail leaves the axis limits or the window
+    changes.
+    """
+    MARGIN = 0.12
+
+    def __init__(self, trail, fps=PLOT_FPS):
+        self.trail = trail
+        self.fps = fps
 
-        # Setup plots
         plt.ion()
         self.fig, (self.ax1, self.ax2) = plt.subplots(1, 2, figsize=(16, 8))
         self.ax1.set_title("RAW HAND (With Tremor)", color='red', fontsize=18, fontweight='bold')
@@ -76,12 +124,102 @@ class GestureController:
             ax.invert_yaxis(); ax.grid(alpha=0.3)
             ax.set_aspect('equal')
 
-        self.line_raw, = self.ax1.plot([], [], 'r-', linewidth=3, alpha=0.8)
-        self.line_clean, = self.ax2.plot([], [], 'lime', linewidth=5, alpha=0.9)
-        self.dot_raw = self.ax1.scatter([], [], c='red', s=150, zorder=5)
-        self.dot_clean = self.ax2.scatter([], [], c='lime', s=150, zorder=5)
+        self.line_raw, = self.ax1.plot([], [], 'r-', linewidth=3, alpha=0.8, animated=True)
+        self.line_clean, = self.ax2.plot([], [], 'lime', linewidth=5, alpha=0.9, animated=True)
+        self.dot_raw = self.ax1.scatter([], [], c='red', s=150, zorder=5, animated=True)
+        self.dot_clean = self.ax2.scatter([], [], c='lime', s=150, zorder=5, animated=True)
+        self.ax1.title.set_animated(True)
+        self.ax2.title.set_animated(True)
+        self.artists = [self.line_raw, self.line_clean, self.dot_raw, self.dot_clean, self.ax1.title, self.ax2.title]
 
         self.fig.suptitle("Adaptive Tremor Removal for MR (2025)", fontsize=20, fontweight='bold')
+        self.background = None
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
+        plt.show(block=False)
+        plt.pause(0.1)
+
+    def on_draw(self, event):
+        # Every full draw (first show, resize, new limits) refreshes the cached background
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        for artist in self.artists:
+            self.fig.draw_artist(artist)
+
+    def blit(self):
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw()
+            return
+        canvas.restore_region(self.background)
+        self.draw_artists()
+        canvas.blit(self.fig.bbox)
+
+    def fit(self, ax, xy):
+        """Moves the limits when points leave them or fill under half of them; True if changed."""
+        low = xy.min(axis=0) - self.MARGIN
+        high = xy.max(axis=0) + self.MARGIN
+        (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+        outside = low[0] < x0 or high[0] > x1 or low[1] < y0 or high[1] > y1
+        too_wide = (x1 - x0) > 2 * (high[0] - low[0]) or (y1 - y0) > 2 * (high[1] - low[1])
+        if outside or too_wide:
+            ax.set_xlim(low[0], high[0])
+            ax.set_ylim(low[1], high[1])
+            return True
+        return False
+
+    def update(self, points):
+        raw, clean = points[:, :2], points[:, 2:]
+        self.line_raw.set_data(raw[:, 0], raw[:, 1])
+        self.line_clean.set_data(clean[:, 0], clean[:, 1])
+        self.dot_raw.set_offsets(raw[-1:])
+        self.dot_clean.set_offsets(clean[-1:])
+        self.ax1.set_title(f"RAW + TREMOR ({len(raw)} points)", color='red', fontsize=16)
+        self.ax2.set_title(f"TREMOR REMOVED! ({len(clean)} points)", color='green', fontsize=16)
+
+        rescaled = self.fit(self.ax1, raw)
+        rescaled = self.fit(self.ax2, clean) or rescaled
+        if rescaled:
+            self.fig.canvas.draw()
+        else:
+            self.blit()
+
+    def run(self, stop):
+        interval = 1.0 / self.fps
+        last_count = 0
+        while not stop.is_set() and plt.fignum_exists(self.fig.number):
+            started = time.perf_counter()
+            count = self.trail.count.value
+            if count != last_count:
+                self.update(self.trail.snapshot(count))
+                last_count = count
+            self.fig.canvas.flush_events()
+            time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+        plt.close(self.fig)
+
+def run_renderer(shm_name, count, capacity, stop, fps):
+    """Entry point of the plot process."""
+    trail = SharedTrail(capacity, shm_name, count)
+    try:
+        TrailRenderer(trail, fps).run(stop)
+    finally:
+        trail.close()
+
+# ==================== Main System ====================
+class GestureController:
+    def __init__(self):
+        self.cap = cv2.VideoCapture(0)
+        self.filter = TremorFilter()
+        self.recog = HandRecog()
+        self.screen_w, self.screen_h = pyautogui.size()
+
+        # Plots live in their own process, so drawing never stalls the cursor
+        self.trail = SharedTrail(TRAIL_LENGTH)
+        self.stop_plot = multiprocessing.Event()
+        self.renderer = multiprocessing.Process(
+            target=run_renderer, daemon=True,
+            args=(self.trail.shm.name, self.trail.count, TRAIL_LENGTH, self.stop_plot, PLOT_FPS))
 
     def add_tremor(self, x, y):
         t = time.time()
@@ -98,6 +236,10 @@ class GestureController:
         print("Move your hand in circles — watch the magic!")
         print("="*60 + "\n")
 
+        self.renderer.start()
+        loop_fps = 0.0
+        last_frame = time.perf_counter()
+
         with mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.8, min_tracking_confidence=0.8) as hands:
             while self.cap.isOpened():
                 ret, frame = self.cap.read()
@@ -126,15 +268,13 @@ class GestureController:
                     # APPLY TREMOR REMOVAL FILTER
                     clean_x, clean_y = self.filter.filter(raw_x, raw_y)
 
-                    # Store trails
-                    self.raw_trail.append((raw_x, raw_y))
-                    self.clean_trail.append((clean_x, clean_y))
+                    # Store trails (read by the plot process)
+                    self.trail.append(raw_x, raw_y, clean_x, clean_y)
 
                     # Gesture control
                     gesture = self.recog.get_gesture(hand)
                     if gesture == Gest.V_GEST or gesture == Gest.PALM:
-                        sx, sy = pyautogui.size()
-                        pyautogui.moveTo(clean_x * sx, clean_y * sy, duration=0)
+                        pyautogui.moveTo(clean_x * self.screen_w, clean_y * self.screen_h, duration=0)
                     elif gesture == Gest.FIST:
                         pyautogui.mouseDown()
                     elif gesture == Gest.MID:
@@ -144,31 +284,13 @@ class GestureController:
                     else:
                         pyautogui.mouseUp()
 
-                # Update plots
-                if self.raw_trail:
-                    rx, ry = zip(*self.raw_trail)
-                    cx, cy = zip(*self.clean_trail)
-
-                    self.line_raw.set_data(rx, ry)
-                    self.line_clean.set_data(cx, cy)
-                    self.dot_raw.set_offsets([[rx[-1], ry[-1]]])
-                    self.dot_clean.set_offsets([[cx[-1], cy[-1]]])
-
-                    margin = 0.12
-                    self.ax1.set_xlim(min(rx)-margin, max(rx)+margin)
-                    self.ax1.set_ylim(min(ry)-margin, max(ry)+margin)
-                    self.ax2.set_xlim(min(cx)-margin, max(cx)+margin)
-                    self.ax2.set_ylim(min(cy)-margin, max(cy)+margin)
-
-                    self.ax1.set_title(f"RAW + TREMOR ({len(rx)} points)", color='red', fontsize=16)
-                    self.ax2.set_title(f"TREMOR REMOVED! ({len(cx)} points)", color='green', fontsize=16)
-
-                    self.fig.canvas.draw()
-                    self.fig.canvas.flush_events()
+                now = time.perf_counter()
+                loop_fps = 0.9 * loop_fps + 0.1 / max(now - last_frame, 1e-6)
+                last_frame = now
 
                 cv2.putText(frame, "PERFECT TREMOR REMOVAL SYSTEM", (10, 50),
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 3)
-                cv2.putText(frame, "", (10, 100),
+                cv2.putText(frame, f"Control loop: {loop_fps:.0f} FPS", (10, 100),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,255,255), 2)
 
                 cv2.imshow(" Tremor-Aware MR Gesture Controller (PERFECT)", frame)
@@ -177,8 +299,9 @@ class GestureController:
 
         self.cap.release()
         cv2.destroyAllWindows()
-        plt.ioff()
-        plt.close()
+        self.stop_plot.set()
+        self.renderer.join(timeout=2)
+        self.trail.close()
         print("\nDemo ended. Your system works perfectly!")
 
 # ==================== RUN ====================
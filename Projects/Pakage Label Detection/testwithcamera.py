@@ -1,47 +1,54 @@
-from ultralytics import YOLO
+import os
+import sys
+
 import cv2
-import time
 
-# Load your YOLO model
-model = YOLO("best.pt")  # Update path if needed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vision_runtime import Plugin, UltralyticsBackend, VisionRuntime
+from tiled_inference import TiledPredictor
 
-# Open webcam
-cap = cv2.VideoCapture(0)
+# Tiled mode: only run the detector on native-resolution tiles over the
+# regions that changed, so small labels are not shrunk away and static
+# parts of the frame cost nothing. Set to False for whole-frame predict.
+TILED_MODE = True
+SHOW_TILES = True
+HEADLESS = False  # True = no window, stats printed to the console
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics at /metrics
+TRACE_PATH = None  # e.g. "trace.jsonl" to dump per-frame stage spans
 
-if not cap.isOpened():
-    print("Error: Could not open webcam.")
-    exit()
 
-# FPS calculation
-prev_time = 0
+class TiledLabelBackend(UltralyticsBackend):
+    def __init__(self, weights):
+        super().__init__(weights)
+        self.tiled = TiledPredictor(self.model, tile=None, overlap=0.2, conf=0.25, iou=0.5)
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+    def predict(self, frame):
+        # Batched tile inference + global NMS
+        return self.tiled(frame)
 
-    # Run YOLO detection (uses GPU automatically)
-    results = model.predict(source=frame, imgsz=640, conf=0.25)
 
-    # Draw results on frame
-    for result in results:
-        annotated_frame = result.plot()
+class TileOverlay(Plugin):
+    def __init__(self, backend):
+        self.backend = backend
 
-    # FPS overlay
-    current_time = time.time()
-    fps = 1 / (current_time - prev_time) if prev_time != 0 else 0
-    prev_time = current_time
+    def process(self, state):
+        state.overlays.append((f"Tiles: {len(self.backend.tiled.last_tiles)}", (255, 255, 0)))
 
-    cv2.putText(annotated_frame, f"FPS: {fps:.2f}", (20, 40),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    def draw(self, frame, state):
+        for x1, y1, x2, y2 in self.backend.tiled.last_tiles:
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 255, 0), 1)
 
-    # Show
-    cv2.imshow("YOLO Webcam - GPU + FPS", annotated_frame)
 
-    # Press 'q' to quit
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+# Load your YOLO model (uses GPU automatically)
+if TILED_MODE:
+    backend = TiledLabelBackend("best.pt")  # Update path if needed
+    plugins = [TileOverlay(backend)] if SHOW_TILES else []
+else:
+    backend = UltralyticsBackend("best.pt", imgsz=640, conf=0.25)
+    plugins = []
 
-# Cleanup
-cap.release()
-cv2.destroyAllWindows()
+# Webcam 0, press 'q' to quit
+VisionRuntime(0, backend, plugins, headless=HEADLESS,
+              window_name="YOLO Webcam - GPU + FPS", quit_key="q",
+              metrics_port=METRICS_PORT, trace_path=TRACE_PATH).run()
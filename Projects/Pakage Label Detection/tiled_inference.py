@@ -0,0 +1,239 @@
+import cv2
+import numpy as np
+
+# Tiled / ROI inference for small package labels.
+#
+# Instead of letterboxing the whole frame down to 640 (which shrinks small
+# labels to a few pixels and spends most of the compute on empty belt), we:
+#   1. find the regions that changed since the last frame with cheap
+#      downscaled frame differencing,
+#   2. cut those regions into native-resolution SAHI-style tiles,
+#   3. run the detector on all tiles in one batched predict call,
+#   4. shift the boxes back to frame coordinates and merge them with a
+#      global class-aware NMS.
+# The number of tiles (and therefore the compute) follows the active area.
+
+
+def nms(dets, iou_threshold=0.5):
+    """
+    Class-aware NMS over detections in the form [[x1,y1,x2,y2,conf,cls],...]
+    Returns the kept rows, sorted by confidence.
+    """
+    if len(dets) == 0:
+        return dets
+
+    # Offset boxes by class so boxes of different classes never overlap
+    offset = dets[:, 5:6] * (dets[:, :4].max() + 1)
+    boxes = dets[:, :4] + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = dets[:, 4].argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(boxes[i, 0], boxes[rest, 0])
+        yy1 = np.maximum(boxes[i, 1], boxes[rest, 1])
+        xx2 = np.minimum(boxes[i, 2], boxes[rest, 2])
+        yy2 = np.minimum(boxes[i, 3], boxes[rest, 3])
+        inter = np.maximum(0., xx2 - xx1) * np.maximum(0., yy2 - yy1)
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return dets[keep]
+
+
+def merge_rects(rects):
+    """
+    Repeatedly unions overlapping [x1,y1,x2,y2] rectangles until none overlap.
+    """
+    rects = [list(r) for r in rects]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        while rects:
+            a = rects.pop()
+            i = 0
+            while i < len(rects):
+                b = rects[i]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    a = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    rects.pop(i)
+                    merged = True
+                else:
+                    i += 1
+            out.append(a)
+        rects = out
+    return [tuple(r) for r in rects]
+
+
+class MotionROIDetector:
+    """
+    Finds changed regions with frame differencing on a downscaled grey frame.
+    """
+    def __init__(self, scale=0.25, diff_threshold=25, min_area=20, pad=32):
+        """
+        scale          - downscale factor used for differencing (cheap at 0.25)
+        diff_threshold - per-pixel grey level change that counts as motion
+        min_area       - smallest changed blob kept, in downscaled pixels
+        pad            - padding added around each ROI, in full-res pixels
+        """
+        self.scale = scale
+        self.diff_threshold = diff_threshold
+        self.min_area = min_area
+        self.pad = pad
+        self.prev_gray = None
+
+    def reset(self):
+        self.prev_gray = None
+
+    def detect(self, frame):
+        """
+        Returns a list of (x1,y1,x2,y2) regions in full-res frame coordinates.
+        The first frame after a reset is reported as fully active.
+        """
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            self.prev_gray = gray
+            return [(0, 0, w, h)]
+
+        diff = cv2.absdiff(self.prev_gray, gray)
+        self.prev_gray = gray
+        _, mask = cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        rois = []
+        for c in contours:
+            if cv2.contourArea(c) < self.min_area:
+                continue
+            x, y, bw, bh = cv2.boundingRect(c)
+            x1 = max(0, int(x / self.scale) - self.pad)
+            y1 = max(0, int(y / self.scale) - self.pad)
+            x2 = min(w, int((x + bw) / self.scale) + self.pad)
+            y2 = min(h, int((y + bh) / self.scale) + self.pad)
+            rois.append((x1, y1, x2, y2))
+
+        return merge_rects(rois)
+
+
+def _axis_starts(start, end, tile, step, limit):
+    """
+    Tile origins covering [start, end) along one axis, clamped to [0, limit).
+    """
+    if limit <= tile:
+        return [0]
+    length = end - start
+    if length <= tile:
+        # Centre a single tile on the region
+        origin = start + length // 2 - tile // 2
+        return [min(max(origin, 0), limit - tile)]
+    starts = list(range(start, end - tile, step))
+    starts.append(end - tile)
+    return [min(max(s, 0), limit - tile) for s in starts]
+
+
+def auto_tile(frame_w, frame_h):
+    """
+    Default tile size for a frame: half of the longer side rounded up to a
+    multiple of 32 (a valid imgsz), so the frame always splits into at least
+    two tiles. A 640x480 capture gets 320 px tiles.
+    """
+    half = (max(frame_w, frame_h) + 1) // 2
+    return max(32, -(-half // 32) * 32)
+
+
+def slice_regions(rois, frame_w, frame_h, tile=640, overlap=0.2):
+    """
+    Cuts every ROI into overlapping tile x tile windows (SAHI-style slicing).
+    Returns a de-duplicated list of (x1,y1,x2,y2) tiles.
+    """
+    step = max(1, int(tile * (1 - overlap)))
+    tiles = set()
+    for x1, y1, x2, y2 in rois:
+        for ty in _axis_starts(y1, y2, tile, step, frame_h):
+            for tx in _axis_starts(x1, x2, tile, step, frame_w):
+                tiles.add((tx, ty, min(tx + tile, frame_w), min(ty + tile, frame_h)))
+    return sorted(tiles)
+
+
+class TiledPredictor:
+    """
+    Runs a YOLO model only on tiles covering the active regions of each frame.
+    """
+    def __init__(self, model, tile=None, overlap=0.2, conf=0.25, iou=0.5,
+                 max_batch=16, full_refresh_every=30, roi_detector=None):
+        """
+        model              - ultralytics YOLO model
+        tile               - tile size in pixels, also used as imgsz;
+                             None derives it from the frame size (auto_tile)
+        overlap            - fraction of overlap between neighbouring tiles
+        conf, iou          - confidence threshold and global NMS IoU threshold
+        max_batch          - maximum number of tiles per predict call
+        full_refresh_every - tile the whole frame every N frames as a safety net
+        """
+        self.model = model
+        self.tile = tile
+        self.overlap = overlap
+        self.conf = conf
+        self.iou = iou
+        self.max_batch = max_batch
+        self.full_refresh_every = full_refresh_every
+        self.roi_detector = roi_detector or MotionROIDetector()
+        self.frame_count = 0
+        self.dets = np.empty((0, 6))
+        self.last_tiles = []
+
+    def _predict_tiles(self, frame, tiles, tile):
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        dets = []
+        for b in range(0, len(crops), self.max_batch):
+            results = self.model.predict(source=crops[b:b + self.max_batch], imgsz=tile,
+                                         conf=self.conf, verbose=False)
+            for (x1, y1, _, _), result in zip(tiles[b:b + self.max_batch], results):
+                boxes = result.boxes
+                if len(boxes) == 0:
+                    continue
+                xyxy = boxes.xyxy.cpu().numpy() + np.array([x1, y1, x1, y1])
+                dets.append(np.column_stack((xyxy, boxes.conf.cpu().numpy(), boxes.cls.cpu().numpy())))
+        return np.concatenate(dets) if dets else np.empty((0, 6))
+
+    def __call__(self, frame):
+        """
+        Returns merged detections [[x1,y1,x2,y2,conf,cls],...] for the frame.
+        Detections outside the active regions are carried over from earlier frames.
+        """
+        h, w = frame.shape[:2]
+        rois = self.roi_detector.detect(frame)
+        full_refresh = self.full_refresh_every and self.frame_count % self.full_refresh_every == 0
+        self.frame_count += 1
+        if full_refresh:
+            rois = [(0, 0, w, h)]
+
+        tile = self.tile or auto_tile(w, h)
+        tiles = slice_regions(rois, w, h, tile, self.overlap)
+        self.last_tiles = tiles
+        if not tiles:
+            return self.dets
+
+        fresh = self._predict_tiles(frame, tiles, tile)
+
+        # Keep previous boxes whose centre is not covered by any tile we just ran
+        kept = self.dets
+        if len(kept) and not full_refresh:
+            cx = (kept[:, 0] + kept[:, 2]) / 2
+            cy = (kept[:, 1] + kept[:, 3]) / 2
+            covered = np.zeros(len(kept), dtype=bool)
+            for x1, y1, x2, y2 in tiles:
+                covered |= (cx >= x1) & (cx < x2) & (cy >= y1) & (cy < y2)
+            kept = kept[~covered]
+        else:
+            kept = np.empty((0, 6))
+
+        self.dets = nms(np.concatenate((kept, fresh)), self.iou)
+        return self.dets
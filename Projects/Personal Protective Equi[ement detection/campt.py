@@ -1,43 +1,21 @@
-from ultralytics import YOLO
-import cv2, time
+import os
+import sys
 
-# Load trained PPE model
-model = YOLO("all.pt")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-# Open webcam
-cap = cv2.VideoCapture(0)
-cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)   # reduce if FPS is low
-cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+from vision_runtime import MotionGate, UltralyticsBackend, VisionRuntime
 
-if not cap.isOpened():
-    print("❌ Cannot access webcam")
-    exit()
+HEADLESS = False  # True = no window, stats printed to the console
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics at /metrics
+TRACE_PATH = None  # e.g. "trace.jsonl" to dump per-frame stage spans
+GATE_MIN_CHANGED = 0.01  # fraction of changed pixels that triggers a new detection
+GATE_MAX_INTERVAL = 2.0  # re-run the detector at least this often (seconds)
 
-prev_time = 0
+# Load trained PPE model (FP16 + smaller imgsz for speed)
+backend = UltralyticsBackend("all.pt", half=True, imgsz=480)
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # YOLO inference (FP16 + smaller imgsz for speed)
-    results = model(frame, stream=True, half=True, imgsz=480)
-
-    # Annotate detections
-    for r in results:
-        annotated_frame = r.plot()
-
-    # FPS calculation
-    curr_time = time.time()
-    fps = 1 / (curr_time - prev_time) if prev_time else 0
-    prev_time = curr_time
-    cv2.putText(annotated_frame, f"FPS: {int(fps)}", (20, 40),
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-    cv2.imshow("PPE Detection - Webcam", annotated_frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
+# Open webcam at 640x480 (reduce if FPS is low), press 'q' to quit
+gate = MotionGate(min_changed=GATE_MIN_CHANGED, max_interval=GATE_MAX_INTERVAL)
+VisionRuntime(0, backend, gate=gate, headless=HEADLESS, window_name="PPE Detection - Webcam",
+              capture_width=640, capture_height=480,
+              metrics_port=METRICS_PORT, trace_path=TRACE_PATH).run()
@@ -1,61 +1,24 @@
-import cv2
-from ultralytics import YOLO
-import time
+import os
+import sys
 
-# Load your trained YOLOv8n model
-model = YOLO("best(2).pt")  # path to your trained weights
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-# Choose video source
-# 0 = default webcam, or replace with video file path
-source = 0  
-cap = cv2.VideoCapture(source)
-
-# Get original video dimensions
-width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-# Optional: Resize for faster FPS
-resize_width = 640
-resize_height = int(height * (resize_width / width))
-
-# FPS calculation
-prev_time = 0
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
+from vision_runtime import MotionGate, UltralyticsBackend, VisionRuntime
 
-    # Resize frame for speed
-    frame_resized = cv2.resize(frame, (resize_width, resize_height))
+HEADLESS = False  # True = no window, stats printed to the console
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics at /metrics
+TRACE_PATH = None  # e.g. "trace.jsonl" to dump per-frame stage spans
+GATE_MIN_CHANGED = 0.01  # fraction of changed pixels that triggers a new detection
+GATE_MAX_INTERVAL = 2.0  # re-run the detector at least this often (seconds)
 
-    # Inference
-    results = model.predict(frame_resized, verbose=False,conf=0.7)
-
-    # Draw boxes and labels
-    annotated_frame = results[0].plot()
-
-    # Calculate FPS
-    curr_time = time.time()
-    fps = 1 / (curr_time - prev_time)
-    prev_time = curr_time
-
-    cv2.putText(
-        annotated_frame,
-        f"FPS: {fps:.2f}",
-        (10, 30),
-        cv2.FONT_HERSHEY_SIMPLEX,
-        1,
-        (0, 255, 0),
-        2,
-    )
-
-    # Show frame
-    cv2.imshow("YOLOv8 People Detection", annotated_frame)
+# Choose video source
+# 0 = default webcam, or replace with video file path
+source = 0
 
-    # Press 'q' to quit
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+# Load your trained YOLOv8n model; frames are resized to 640 wide for faster FPS
+backend = UltralyticsBackend("best(2).pt", input_width=640, conf=0.7)
 
-cap.release()
-cv2.destroyAllWindows()
+# Skip inference while the shop is empty and static, press 'q' to quit
+gate = MotionGate(min_changed=GATE_MIN_CHANGED, max_interval=GATE_MAX_INTERVAL)
+VisionRuntime(source, backend, gate=gate, headless=HEADLESS, window_name="YOLOv8 People Detection",
+              metrics_port=METRICS_PORT, trace_path=TRACE_PATH).run()
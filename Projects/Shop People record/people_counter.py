@@ -0,0 +1,321 @@
+import datetime
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from filterpy.kalman import KalmanFilter
+
+from vision_runtime import Plugin
+
+# SORT implementation (from https://github.com/abewley/sort)
+
+def convert_bbox_to_z(bbox):
+    """
+    Takes a bounding box in the form [x1,y1,x2,y2] and returns z in the form
+      [x,y,s,r] where x,y is the centre of the box and s is the scale/area and r is
+      the aspect ratio
+    """
+    w = bbox[2] - bbox[0]
+    h = bbox[3] - bbox[1]
+    x = bbox[0] + w/2.
+    y = bbox[1] + h/2.
+    s = w * h  # scale is just area
+    r = w / float(h)
+    return np.array([x, y, s, r]).reshape((4, 1))
+
+def convert_x_to_bbox(x, score=None):
+    """
+    Takes a bounding box in the centre form [x,y,s,r] and returns it in [x1,y1,x2,y2]
+    """
+    w = np.sqrt(x[2] * x[3])
+    h = x[2] / w
+    if score is None:
+        return np.array([x[0]-w/2., x[1]-h/2., x[0]+w/2., x[1]+h/2.]).reshape((1, 4))
+    else:
+        return np.array([x[0]-w/2., x[1]-h/2., x[0]+w/2., x[1]+h/2., score]).reshape((1, 5))
+
+def iou_batch(bb_test, bb_gt):
+    """
+    From SORT: Computes IOU between two bboxes in the form [x1,y1,x2,y2]
+    """
+    bb_gt = np.expand_dims(bb_gt, 0)
+    bb_test = np.expand_dims(bb_test, 1)
+    
+    xx1 = np.maximum(bb_test[..., 0], bb_gt[..., 0])
+    yy1 = np.maximum(bb_test[..., 1], bb_gt[..., 1])
+    xx2 = np.minimum(bb_test[..., 2], bb_gt[..., 2])
+    yy2 = np.minimum(bb_test[..., 3], bb_gt[..., 3])
+    w = np.maximum(0., xx2 - xx1)
+    h = np.maximum(0., yy2 - yy1)
+    wh = w * h
+    o = wh / ((bb_test[..., 2] - bb_test[..., 0]) * (bb_test[..., 3] - bb_test[..., 1])                                      
+              + (bb_gt[..., 2] - bb_gt[..., 0]) * (bb_gt[..., 3] - bb_gt[..., 1]) - wh)
+    return o
+
+class KalmanBoxTracker:
+    """
+    This class represents the internal state of individual tracked objects observed as bbox.
+    """
+    count = 0
+    def __init__(self, bbox):
+        """
+        Initialises a tracker using initial bounding box.
+        """
+        # define constant velocity model
+        self.kf = KalmanFilter(dim_x=7, dim_z=4)
+        self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],
+                              [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]])
+        self.kf.H = np.array([[1,0,0,0,0,0,0],[0,1,0,0,0,0,0],[0,0,1,0,0,0,0],[0,0,0,1,0,0,0]])
+        self.kf.R[2:,2:] *= 10.
+        self.kf.P[4:,4:] *= 1000.  # give high uncertainty to the unobservable initial velocities
+        self.kf.P *= 10.
+        self.kf.Q[-1,-1] *= 0.01
+        self.kf.Q[4:,4:] *= 0.01
+
+        self.kf.x[:4] = convert_bbox_to_z(bbox)
+        self.time_since_update = 0
+        self.id = KalmanBoxTracker.count
+        KalmanBoxTracker.count += 1
+        self.history = []
+        self.hits = 0
+        self.hit_streak = 0
+        self.age = 0
+
+    def update(self, bbox):
+        """
+        Updates the state vector with observed bbox.
+        """
+        self.time_since_update = 0
+        self.history = []
+        self.hits += 1
+        self.hit_streak += 1
+        self.kf.update(convert_bbox_to_z(bbox))
+
+    def predict(self):
+        """
+        Advances the state vector and returns the predicted bounding box estimate.
+        """
+        if (self.kf.x[6] + self.kf.x[2]) <= 0:
+            self.kf.x[6] = 0
+        self.kf.predict()
+        self.age += 1
+        if self.time_since_update > 0:
+            self.hit_streak = 0
+        self.time_since_update += 1
+        self.history.append(convert_x_to_bbox(self.kf.x))
+        return self.history[-1]
+
+    def get_state(self):
+        """
+        Returns the current bounding box estimate.
+        """
+        return convert_x_to_bbox(self.kf.x)
+
+def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
+    """
+    Assigns detections to tracked object (both represented as bounding boxes)
+    Returns 3 lists of matches, unmatched_detections and unmatched_trackers
+    """
+    if len(trackers) == 0:
+        return np.empty((0, 2), dtype=int), np.arange(len(detections)), np.empty((0, 5), dtype=int)
+
+    iou_matrix = iou_batch(detections, trackers)
+
+    if min(iou_matrix.shape) > 0:
+        a = (iou_matrix > iou_threshold).astype(np.int32)
+        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
+            matched_indices = np.stack(np.where(a), axis=1)
+        else:
+            matched_indices = linear_sum_assignment(-iou_matrix)
+            matched_indices = np.asarray(matched_indices)
+            matched_indices = np.transpose(matched_indices)
+    else:
+        matched_indices = np.empty(shape=(0, 2))
+
+    unmatched_detections = []
+    for d, det in enumerate(detections):
+        if d not in matched_indices[:, 0]:
+            unmatched_detections.append(d)
+    unmatched_trackers = []
+    for t, trk in enumerate(trackers):
+        if t not in matched_indices[:, 1]:
+            unmatched_trackers.append(t)
+
+    # filter out matched with low IOU
+    matches = []
+    for m in matched_indices:
+        if iou_matrix[m[0], m[1]] < iou_threshold:
+            unmatched_detections.append(m[0])
+            unmatched_trackers.append(m[1])
+        else:
+            matches.append(m.reshape(1, 2))
+    if len(matches) == 0:
+        matches = np.empty((0, 2), dtype=int)
+    else:
+        matches = np.concatenate(matches, axis=0)
+
+    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
+
+class Sort:
+    def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
+        """
+        Sets key parameters for SORT
+        """
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.trackers = []
+        self.frame_count = 0
+
+    def update(self, dets=np.empty((0, 5))):
+        """
+        Params:
+          dets - a numpy array of detections in the format [[x1,y1,x2,y2,score],[x1,y1,x2,y2,score],...]
+        Requires: this method must be called once for each frame even with empty detections (use np.empty((0,5)) for frames without detections).
+        Returns the a similar array, where the last column is the object ID.
+        NOTE: The number of objects returned may differ from the number of detections provided.
+        """
+        self.frame_count += 1
+        # get predicted locations from existing trackers.
+        trks = np.zeros((len(self.trackers), 5))
+        to_del = []
+        ret = []
+        for t, trk in enumerate(trks):
+            pos = self.trackers[t].predict()[0]
+            trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
+            if np.any(np.isnan(pos)):
+                to_del.append(t)
+        trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
+        for t in reversed(to_del):
+            self.trackers.pop(t)
+        matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
+
+        # update matched trackers with assigned detections
+        for m in matched:
+            self.trackers[m[1]].update(dets[m[0], :])
+
+        # create and initialise new trackers for unmatched detections
+        for i in unmatched_dets:
+            trk = KalmanBoxTracker(dets[i, :])
+            self.trackers.append(trk)
+        i = len(self.trackers)
+        for trk in reversed(self.trackers):
+            d = trk.get_state()[0]
+            if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
+                ret.append(np.concatenate((d, [trk.id + 1])).reshape(1, -1))  # +1 as MOT benchmark starts at 1
+            i -= 1
+            if trk.time_since_update > self.max_age:
+                self.trackers.pop(i)
+        if len(ret) > 0:
+            return np.concatenate(ret)
+        return np.empty((0, 5))
+
+# Line-crossing counter plugin for vision_runtime
+
+class LineCounter(Plugin):
+    """
+    Tracks people with SORT and counts entries/exits across two horizontal lines.
+    Crossing green downward then red downward is an entry; red upward then
+    green upward is an exit. Optionally appends the counts to a CSV on entry.
+    """
+    stage = "tracking"
+
+    def __init__(self, entry_line=0.4, exit_line=0.6, csv_path=None,
+                 max_age=20, min_hits=3, iou_threshold=0.3):
+        """
+        entry_line, exit_line - line positions as a fraction of frame height
+        """
+        self.entry_line = entry_line
+        self.exit_line = exit_line
+        self.csv_path = csv_path
+        self.tracker = Sort(max_age=max_age, min_hits=min_hits, iou_threshold=iou_threshold)
+        self.entries = 0
+        self.exits = 0
+        self.prev_ys = {}  # id: previous centroid y
+        self.states = {}   # id: state ('none', 'entering', 'exiting')
+        self.tracks = np.empty((0, 5))
+
+    def _log(self):
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        row = [timestamp, self.entries, self.exits, self.entries - self.exits]
+        df = pd.DataFrame([row], columns=["timestamp", "entries", "exits", "inside"])
+        df.to_csv(self.csv_path, mode='a', header=not os.path.exists(self.csv_path), index=False)
+
+    def process(self, state):
+        height = state.frame.shape[0]
+        entry_line_y = int(height * self.entry_line)
+        exit_line_y = int(height * self.exit_line)
+
+        dets = state.dets[:, :5] if len(state.dets) else np.empty((0, 5))
+        self.tracks = self.tracker.update(dets)
+
+        current_ids = set()
+        for x1, y1, x2, y2, track_id in self.tracks:
+            track_id = int(track_id)
+            centroid_y = (y1 + y2) / 2
+            current_ids.add(track_id)
+
+            if track_id not in self.prev_ys:
+                self.prev_ys[track_id] = centroid_y
+                self.states[track_id] = 'none'
+                continue
+
+            prev_y = self.prev_ys[track_id]
+            track_state = self.states[track_id]
+
+            # Detect directed crossings
+            cross_green_down = (prev_y <= entry_line_y and centroid_y > entry_line_y)
+            cross_green_up = (prev_y >= entry_line_y and centroid_y < entry_line_y)
+            cross_red_down = (prev_y <= exit_line_y and centroid_y > exit_line_y)
+            cross_red_up = (prev_y >= exit_line_y and centroid_y < exit_line_y)
+
+            if track_state == 'none':
+                if cross_green_down:
+                    self.states[track_id] = 'entering'
+                elif cross_red_up:
+                    self.states[track_id] = 'exiting'
+            elif track_state == 'entering':
+                if cross_red_down:
+                    self.entries += 1
+                    self.states[track_id] = 'none'
+                    # Save to CSV when entries change
+                    if self.csv_path:
+                        self._log()
+                elif cross_green_up:
+                    self.states[track_id] = 'none'
+            elif track_state == 'exiting':
+                if cross_green_up:
+                    self.exits += 1
+                    self.states[track_id] = 'none'
+                elif cross_red_down:
+                    self.states[track_id] = 'none'
+
+            # Update previous y
+            self.prev_ys[track_id] = centroid_y
+
+        # Clean up lost tracks
+        for lost_id in set(self.prev_ys.keys()) - current_ids:
+            del self.prev_ys[lost_id]
+            del self.states[lost_id]
+
+        state.info["entries"] = self.entries
+        state.info["exits"] = self.exits
+        state.overlays.append((f"Entries: {self.entries}", (0, 255, 0)))
+        state.overlays.append((f"Exits: {self.exits}", (0, 0, 255)))
+        state.overlays.append((f"Inside: {self.entries - self.exits}", (255, 255, 255)))
+
+    def draw(self, frame, state):
+        height, width = frame.shape[:2]
+        entry_line_y = int(height * self.entry_line)
+        exit_line_y = int(height * self.exit_line)
+
+        # Draw bounding box and ID
+        for x1, y1, x2, y2, track_id in self.tracks:
+            cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
+            cv2.putText(frame, str(int(track_id)), (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2)
+
+        # Draw lines
+        cv2.line(frame, (0, entry_line_y), (width, entry_line_y), (0, 255, 0), 2)  # Green entry
+        cv2.line(frame, (0, exit_line_y), (width, exit_line_y), (0, 0, 255), 2)    # Red exit
@@ -1,322 +1,27 @@
-import cv2
-from ultralytics import YOLO
-import numpy as np
-from scipy.optimize import linear_sum_assignment
-from filterpy.kalman import KalmanFilter
+import os
+import sys
 
-# SORT implementation (from https://github.com/abewley/sort)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
-def convert_bbox_to_z(bbox):
-    """
-    Takes a bounding box in the form [x1,y1,x2,y2] and returns z in the form
-      [x,y,s,r] where x,y is the centre of the box and s is the scale/area and r is
-      the aspect ratio
-    """
-    w = bbox[2] - bbox[0]
-    h = bbox[3] - bbox[1]
-    x = bbox[0] + w/2.
-    y = bbox[1] + h/2.
-    s = w * h  # scale is just area
-    r = w / float(h)
-    return np.array([x, y, s, r]).reshape((4, 1))
+from vision_runtime import MotionGate, UltralyticsBackend, VisionRuntime
+from people_counter import LineCounter
 
-def convert_x_to_bbox(x, score=None):
-    """
-    Takes a bounding box in the centre form [x,y,s,r] and returns it in [x1,y1,x2,y2]
-    """
-    w = np.sqrt(x[2] * x[3])
-    h = x[2] / w
-    if score is None:
-        return np.array([x[0]-w/2., x[1]-h/2., x[0]+w/2., x[1]+h/2.]).reshape((1, 4))
-    else:
-        return np.array([x[0]-w/2., x[1]-h/2., x[0]+w/2., x[1]+h/2., score]).reshape((1, 5))
+HEADLESS = False  # True = no window, stats printed to the console
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics at /metrics
+TRACE_PATH = None  # e.g. "trace.jsonl" to dump per-frame stage spans
+# People move fast across the lines, so keep the safety-net interval short
+GATE_MIN_CHANGED = 0.005  # fraction of changed pixels that triggers a new detection
+GATE_MAX_INTERVAL = 0.5   # seconds
 
-def iou_batch(bb_test, bb_gt):
-    """
-    From SORT: Computes IOU between two bboxes in the form [x1,y1,x2,y2]
-    """
-    bb_gt = np.expand_dims(bb_gt, 0)
-    bb_test = np.expand_dims(bb_test, 1)
-    
-    xx1 = np.maximum(bb_test[..., 0], bb_gt[..., 0])
-    yy1 = np.maximum(bb_test[..., 1], bb_gt[..., 1])
-    xx2 = np.minimum(bb_test[..., 2], bb_gt[..., 2])
-    yy2 = np.minimum(bb_test[..., 3], bb_gt[..., 3])
-    w = np.maximum(0., xx2 - xx1)
-    h = np.maximum(0., yy2 - yy1)
-    wh = w * h
-    o = wh / ((bb_test[..., 2] - bb_test[..., 0]) * (bb_test[..., 3] - bb_test[..., 1])                                      
-              + (bb_gt[..., 2] - bb_gt[..., 0]) * (bb_gt[..., 3] - bb_gt[..., 1]) - wh)
-    return o
+# Load the YOLOv8 model (best.pt trained on people class), detect only people (class 0)
+backend = UltralyticsBackend("best.pt", conf=0.5, classes=0)
 
-class KalmanBoxTracker:
-    """
-    This class represents the internal state of individual tracked objects observed as bbox.
-    """
-    count = 0
-    def __init__(self, bbox):
-        """
-        Initialises a tracker using initial bounding box.
-        """
-        # define constant velocity model
-        self.kf = KalmanFilter(dim_x=7, dim_z=4)
-        self.kf.F = np.array([[1,0,0,0,1,0,0],[0,1,0,0,0,1,0],[0,0,1,0,0,0,1],[0,0,0,1,0,0,0],
-                              [0,0,0,0,1,0,0],[0,0,0,0,0,1,0],[0,0,0,0,0,0,1]])
-        self.kf.H = np.array([[1,0,0,0,0,0,0],[0,1,0,0,0,0,0],[0,0,1,0,0,0,0],[0,0,0,1,0,0,0]])
-        self.kf.R[2:,2:] *= 10.
-        self.kf.P[4:,4:] *= 1000.  # give high uncertainty to the unobservable initial velocities
-        self.kf.P *= 10.
-        self.kf.Q[-1,-1] *= 0.01
-        self.kf.Q[4:,4:] *= 0.01
+# Tunable line positions as a fraction of frame height:
+# green entry line at 40% (higher on frame), red exit line at 60%
+counter = LineCounter(entry_line=0.4, exit_line=0.6, max_age=20, min_hits=3, iou_threshold=0.3)
 
-        self.kf.x[:4] = convert_bbox_to_z(bbox)
-        self.time_since_update = 0
-        self.id = KalmanBoxTracker.count
-        KalmanBoxTracker.count += 1
-        self.history = []
-        self.hits = 0
-        self.hit_streak = 0
-        self.age = 0
-
-    def update(self, bbox):
-        """
-        Updates the state vector with observed bbox.
-        """
-        self.time_since_update = 0
-        self.history = []
-        self.hits += 1
-        self.hit_streak += 1
-        self.kf.update(convert_bbox_to_z(bbox))
-
-    def predict(self):
-        """
-        Advances the state vector and returns the predicted bounding box estimate.
-        """
-        if (self.kf.x[6] + self.kf.x[2]) <= 0:
-            self.kf.x[6] = 0
-        self.kf.predict()
-        self.age += 1
-        if self.time_since_update > 0:
-            self.hit_streak = 0
-        self.time_since_update += 1
-        self.history.append(convert_x_to_bbox(self.kf.x))
-        return self.history[-1]
-
-    def get_state(self):
-        """
-        Returns the current bounding box estimate.
-        """
-        return convert_x_to_bbox(self.kf.x)
-
-def associate_detections_to_trackers(detections, trackers, iou_threshold=0.3):
-    """
-    Assigns detections to tracked object (both represented as bounding boxes)
-    Returns 3 lists of matches, unmatched_detections and unmatched_trackers
-    """
-    if len(trackers) == 0:
-        return np.empty((0, 2), dtype=int), np.arange(len(detections)), np.empty((0, 5), dtype=int)
-
-    iou_matrix = iou_batch(detections, trackers)
-
-    if min(iou_matrix.shape) > 0:
-        a = (iou_matrix > iou_threshold).astype(np.int32)
-        if a.sum(1).max() == 1 and a.sum(0).max() == 1:
-            matched_indices = np.stack(np.where(a), axis=1)
-        else:
-            matched_indices = linear_sum_assignment(-iou_matrix)
-            matched_indices = np.asarray(matched_indices)
-            matched_indices = np.transpose(matched_indices)
-    else:
-        matched_indices = np.empty(shape=(0, 2))
-
-    unmatched_detections = []
-    for d, det in enumerate(detections):
-        if d not in matched_indices[:, 0]:
-            unmatched_detections.append(d)
-    unmatched_trackers = []
-    for t, trk in enumerate(trackers):
-        if t not in matched_indices[:, 1]:
-            unmatched_trackers.append(t)
-
-    # filter out matched with low IOU
-    matches = []
-    for m in matched_indices:
-        if iou_matrix[m[0], m[1]] < iou_threshold:
-            unmatched_detections.append(m[0])
-            unmatched_trackers.append(m[1])
-        else:
-            matches.append(m.reshape(1, 2))
-    if len(matches) == 0:
-        matches = np.empty((0, 2), dtype=int)
-    else:
-        matches = np.concatenate(matches, axis=0)
-
-    return matches, np.array(unmatched_detections), np.array(unmatched_trackers)
-
-class Sort:
-    def __init__(self, max_age=1, min_hits=3, iou_threshold=0.3):
-        """
-        Sets key parameters for SORT
-        """
-        self.max_age = max_age
-        self.min_hits = min_hits
-        self.iou_threshold = iou_threshold
-        self.trackers = []
-        self.frame_count = 0
-
-    def update(self, dets=np.empty((0, 5))):
-        """
-        Params:
-          dets - a numpy array of detections in the format [[x1,y1,x2,y2,score],[x1,y1,x2,y2,score],...]
-        Requires: this method must be called once for each frame even with empty detections (use np.empty((0,5)) for frames without detections).
-        Returns the a similar array, where the last column is the object ID.
-        NOTE: The number of objects returned may differ from the number of detections provided.
-        """
-        self.frame_count += 1
-        # get predicted locations from existing trackers.
-        trks = np.zeros((len(self.trackers), 5))
-        to_del = []
-        ret = []
-        for t, trk in enumerate(trks):
-            pos = self.trackers[t].predict()[0]
-            trk[:] = [pos[0], pos[1], pos[2], pos[3], 0]
-            if np.any(np.isnan(pos)):
-                to_del.append(t)
-        trks = np.ma.compress_rows(np.ma.masked_invalid(trks))
-        for t in reversed(to_del):
-            self.trackers.pop(t)
-        matched, unmatched_dets, unmatched_trks = associate_detections_to_trackers(dets, trks, self.iou_threshold)
-
-        # update matched trackers with assigned detections
-        for m in matched:
-            self.trackers[m[1]].update(dets[m[0], :])
-
-        # create and initialise new trackers for unmatched detections
-        for i in unmatched_dets:
-            trk = KalmanBoxTracker(dets[i, :])
-            self.trackers.append(trk)
-        i = len(self.trackers)
-        for trk in reversed(self.trackers):
-            d = trk.get_state()[0]
-            if (trk.time_since_update < 1) and (trk.hit_streak >= self.min_hits or self.frame_count <= self.min_hits):
-                ret.append(np.concatenate((d, [trk.id + 1])).reshape(1, -1))  # +1 as MOT benchmark starts at 1
-            i -= 1
-            if trk.time_since_update > self.max_age:
-                self.trackers.pop(i)
-        if len(ret) > 0:
-            return np.concatenate(ret)
-        return np.empty((0, 5))
-
-# Main application
-
-model = YOLO("best.pt")  # Load the YOLOv8 model (best.pt trained on people class)
-
-tracker = Sort(max_age=20, min_hits=3, iou_threshold=0.3)  # Initialize SORT tracker
-
-cap = cv2.VideoCapture(0)  # Open webcam
-
-# Get frame dimensions
-width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-# Tunable line positions (adjust these y-coordinates as needed)
-entry_line_y = int(height * 0.4)  # Green entry line (higher on frame, smaller y)
-exit_line_y = int(height * 0.6)   # Red exit line (lower on frame, larger y)
-
-entries = 0
-exits = 0
-
-prev_ys = {}  # id: previous centroid y
-states = {}   # id: state ('none', 'entering', 'exiting')
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Run YOLO inference
-    results = model.predict(frame, conf=0.5, classes=0)  # Detect only people (class 0)
-
-    dets = []
-    for result in results:
-        for box in result.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-            conf = box.conf[0].cpu().numpy()
-            dets.append([x1, y1, x2, y2, conf])
-
-    dets = np.array(dets) if dets else np.empty((0, 5))
-
-    # Update tracker
-    trackers = tracker.update(dets)
-
-    current_ids = set()
-
-    for track in trackers:
-        x1, y1, x2, y2, track_id = track
-        track_id = int(track_id)
-
-        # Draw bounding box and ID
-        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), (0, 255, 0), 2)
-        cv2.putText(frame, str(track_id), (int(x1), int(y1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 0, 0), 2)
-
-        centroid_y = (y1 + y2) / 2
-        current_ids.add(track_id)
-
-        if track_id not in prev_ys:
-            prev_ys[track_id] = centroid_y
-            states[track_id] = 'none'
-            continue
-
-        prev_y = prev_ys[track_id]
-        state = states[track_id]
-
-        # Detect directed crossings
-        cross_green_down = (prev_y <= entry_line_y and centroid_y > entry_line_y)
-        cross_green_up = (prev_y >= entry_line_y and centroid_y < entry_line_y)
-        cross_red_down = (prev_y <= exit_line_y and centroid_y > exit_line_y)
-        cross_red_up = (prev_y >= exit_line_y and centroid_y < exit_line_y)
-
-        if state == 'none':
-            if cross_green_down:
-                states[track_id] = 'entering'
-            elif cross_red_up:
-                states[track_id] = 'exiting'
-        elif state == 'entering':
-            if cross_red_down:
-                entries += 1
-                states[track_id] = 'none'
-            elif cross_green_up:
-                states[track_id] = 'none'
-        elif state == 'exiting':
-            if cross_green_up:
-                exits += 1
-                states[track_id] = 'none'
-            elif cross_red_down:
-                states[track_id] = 'none'
-
-        # Update previous y
-        prev_ys[track_id] = centroid_y
-
-    # Clean up lost tracks
-    lost_ids = set(prev_ys.keys()) - current_ids
-    for lost_id in lost_ids:
-        del prev_ys[lost_id]
-        del states[lost_id]
-
-    # Draw lines
-    cv2.line(frame, (0, entry_line_y), (width, entry_line_y), (0, 255, 0), 2)  # Green entry
-    cv2.line(frame, (0, exit_line_y), (width, exit_line_y), (0, 0, 255), 2)    # Red exit
-
-    # Display counts
-    inside = entries - exits
-    cv2.putText(frame, f"Entries: {entries}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 255, 0), 2)
-    cv2.putText(frame, f"Exits: {exits}", (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (0, 0, 255), 2)
-    cv2.putText(frame, f"Inside: {inside}", (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.75, (255, 255, 255), 2)
-
-    cv2.imshow("Shop People Counter", frame)
-
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+# Open webcam, press 'q' to quit
+gate = MotionGate(min_changed=GATE_MIN_CHANGED, max_interval=GATE_MAX_INTERVAL)
+VisionRuntime(0, backend, [counter], gate=gate, headless=HEADLESS, window_name="Shop People Counter",
+              draw_boxes=False, show_fps=False,
+              metrics_port=METRICS_PORT, trace_path=TRACE_PATH).run()
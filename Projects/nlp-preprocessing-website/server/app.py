@@ -1,85 +1,39 @@
-from flask import Flask, request, jsonify
+import time
+
+_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer, WordNetLemmatizer
-from nltk import pos_tag
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+import numpy as np
 import pandas as pd
-import string
-import re
+import os
+
+import batch
+from corpus_index import CorpusIndex
+from sparse import page_params, sparse_response
+from pipeline import compile_pipeline, pos_tag_text
+import startup
 
 app = Flask(__name__)
 CORS(app)
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
-
-try:
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('averaged_perceptron_tagger')
-
-try:
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('wordnet')
+# Verify NLTK data once and pre-load WordNet, the tagger and stopwords
+startup.initialize(_started)
 
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt_tab')
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
 
-stemmer = PorterStemmer()
-lemmatizer = WordNetLemmatizer()
+@app.after_request
+def record_latency(response):
+    if request.path != '/health' and 'request_started' in g:
+        startup.record_request(time.perf_counter() - g.request_started)
+    return response
 
 def preprocess_text(text, options):
-    processed_text = text
-    steps = []
-
-    if options.get('lowercase'):
-        processed_text = processed_text.lower()
-        steps.append('Converted to lowercase')
-
-    if options.get('remove_punctuation'):
-        processed_text = processed_text.translate(str.maketrans('', '', string.punctuation))
-        steps.append('Removed punctuation')
-
-    if options.get('remove_numbers'):
-        processed_text = re.sub(r'\d+', '', processed_text)
-        steps.append('Removed numbers')
-
-    tokens = word_tokenize(processed_text)
-
-    if options.get('remove_stopwords'):
-        stop_words = set(stopwords.words('english'))
-        tokens = [word for word in tokens if word.lower() not in stop_words]
-        steps.append('Removed stopwords')
-
-    if options.get('stemming'):
-        tokens = [stemmer.stem(word) for word in tokens]
-        steps.append('Applied stemming')
-
-    if options.get('lemmatization'):
-        tokens = [lemmatizer.lemmatize(word) for word in tokens]
-        steps.append('Applied lemmatization')
-
-    processed_text = ' '.join(tokens)
-
-    return {
-        'original': text,
-        'processed': processed_text,
-        'tokens': tokens,
-        'steps': steps
-    }
+    # Pipelines are compiled once per combination of options and reused
+    return compile_pipeline(options).run(text)
 
 @app.route('/api/preprocess', methods=['POST'])
 def preprocess():
@@ -102,63 +56,43 @@ def pos_tagging():
     if not text:
         return jsonify({'error': 'No text provided'}), 400
 
-    preprocessed = preprocess_text(text, options)
-    tokens = preprocessed['tokens']
-
-    pos_tags = pos_tag(tokens)
-
-    pos_explanation = {
-        'NN': 'Noun, singular',
-        'NNS': 'Noun, plural',
-        'NNP': 'Proper noun, singular',
-        'NNPS': 'Proper noun, plural',
-        'VB': 'Verb, base form',
-        'VBD': 'Verb, past tense',
-        'VBG': 'Verb, gerund/present participle',
-        'VBN': 'Verb, past participle',
-        'VBP': 'Verb, present tense',
-        'VBZ': 'Verb, 3rd person singular present',
-        'JJ': 'Adjective',
-        'JJR': 'Adjective, comparative',
-        'JJS': 'Adjective, superlative',
-        'RB': 'Adverb',
-        'RBR': 'Adverb, comparative',
-        'RBS': 'Adverb, superlative',
-        'DT': 'Determiner',
-        'IN': 'Preposition/subordinating conjunction',
-        'CC': 'Coordinating conjunction',
-        'PRP': 'Personal pronoun',
-        'PRP$': 'Possessive pronoun',
-        'TO': 'to',
-        'MD': 'Modal',
-        'CD': 'Cardinal number',
-    }
-
-    tagged_with_explanation = [
-        {
-            'word': word,
-            'tag': tag,
-            'explanation': pos_explanation.get(tag, 'Other')
-        }
-        for word, tag in pos_tags
-    ]
-
-    # return jsonify({
-    #     'original': text,
-    #     'preprocessed': preprocessed['processed'],
-    #     'steps': preprocessed['steps'],
-    #     'pos_tags': tagged_with_explanation
-    # }
-    return jsonify({
-    'original': text,
-    'preprocessed': preprocessed['processed'],
-    'tokens': preprocessed['tokens'],  # 👈 This line fixes the error
-    'steps': preprocessed['steps'],
-    'pos_tags': tagged_with_explanation
-})
+    return jsonify(pos_tag_text(text, options))
 
+def batch_response(kind):
+    data = request.json or {}
+    texts = data.get('texts', [])
+    options = data.get('options', {})
 
-    
+    if not isinstance(texts, list) or len(texts) == 0:
+        return jsonify({'error': 'No texts provided'}), 400
+
+    if len(texts) > batch.MAX_BATCH_DOCS:
+        return jsonify({'error': f'At most {batch.MAX_BATCH_DOCS} texts per batch'}), 413
+
+    if options is not None and not isinstance(options, dict):
+        return jsonify({'error': 'options must be an object'}), 400
+
+    # Bad parameters are a 400 here, not a broken stream after a 200
+    try:
+        chunk_size = batch.parse_chunk_size(data.get('chunk_size', batch.DEFAULT_CHUNK_SIZE))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    # One JSON object per line as documents finish, then a {"summary": ...} line
+    lines = batch.stream_batch(kind, texts, options, chunk_size)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@app.route('/api/preprocess/batch', methods=['POST'])
+def preprocess_batch():
+    return batch_response('preprocess')
+
+@app.route('/api/pos_tag/batch', methods=['POST'])
+def pos_tag_batch():
+    return batch_response('pos_tag')
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return jsonify(batch.stats.snapshot())
 
 @app.route('/api/bag_of_words', methods=['POST'])
 def bag_of_words():
@@ -178,6 +112,13 @@ def bag_of_words():
         bow_matrix = vectorizer.fit_transform(texts)
 
         feature_names = vectorizer.get_feature_names_out()
+
+        # Sparse formats never build the docs x vocab dense table
+        fmt = data.get('format', 'dense')
+        if fmt != 'dense':
+            params = page_params(data, *bow_matrix.shape)
+            return jsonify(sparse_response(bow_matrix, feature_names, params, fmt))
+
         bow_array = bow_matrix.toarray()
 
         df = pd.DataFrame(bow_array, columns=feature_names)
@@ -207,6 +148,8 @@ def bag_of_words():
     'tokens': []         # 👈 Add this
 })
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -228,15 +171,18 @@ def tfidf():
         tfidf_matrix = vectorizer.fit_transform(texts)
 
         feature_names = vectorizer.get_feature_names_out()
-        tfidf_array = tfidf_matrix.toarray()
+
+        # Sparse formats never build the docs x vocab dense table
+        fmt = data.get('format', 'dense')
+        if fmt != 'dense':
+            params = page_params(data, *tfidf_matrix.shape)
+            return jsonify(sparse_response(tfidf_matrix, feature_names, params, fmt, decimals=4))
+
+        tfidf_array = np.round(tfidf_matrix.toarray(), 4)
 
         df = pd.DataFrame(tfidf_array, columns=feature_names)
         df.insert(0, 'Document', [f'Doc {i+1}' for i in range(len(texts))])
 
-        for col in df.columns:
-            if col != 'Document':
-                df[col] = df[col].round(4)
-
         vocab_df = pd.DataFrame({
             'Word': feature_names,
             'Index': range(len(feature_names))
@@ -261,12 +207,69 @@ def tfidf():
     'tokens': []         # 👈 Add this
 })
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+_corpus_index = None
+
+def get_corpus_index():
+    global _corpus_index
+    if _corpus_index is None:
+        _corpus_index = CorpusIndex(os.environ.get('NLP_INDEX_DIR', 'corpus_index'))
+    else:
+        # Other gunicorn workers may have added documents since
+        _corpus_index.refresh()
+    return _corpus_index
+
+@app.route('/api/index/documents', methods=['POST'])
+def index_add_documents():
+    data = request.json or {}
+    texts = data.get('texts', [])
+    names = data.get('names')
+
+    if not isinstance(texts, list) or len(texts) == 0:
+        return jsonify({'error': 'No texts provided'}), 400
+
+    if names is not None and (not isinstance(names, list) or len(names) != len(texts)):
+        return jsonify({'error': "'names' must have one entry per text"}), 400
+
+    index = get_corpus_index()
+    doc_ids = index.add_many([str(t) for t in texts], names)
+    return jsonify({'doc_ids': doc_ids, **index.stats()})
+
+@app.route('/api/index/tfidf', methods=['POST'])
+def index_tfidf():
+    data = request.json or {}
+    doc_ids = data.get('doc_ids')
+    index = get_corpus_index()
+
+    if index.n_docs == 0:
+        return jsonify({'error': 'Index is empty'}), 400
+
+    if doc_ids is not None and (not isinstance(doc_ids, list) or
+                                not all(isinstance(i, int) and not isinstance(i, bool) for i in doc_ids)):
+        return jsonify({'error': "'doc_ids' must be a list of integers"}), 400
+
+    try:
+        # Only the requested page of documents is ever vectorised
+        ids = np.arange(index.n_docs) if doc_ids is None else np.asarray(doc_ids, dtype=np.int64).reshape(-1)
+        params = page_params(data, len(ids), index.n_terms)
+        page_ids = ids[params['doc_offset']:params['doc_offset'] + params['doc_limit']]
+        matrix = index.tfidf(page_ids)
+        return jsonify(sparse_response(matrix, index.terms, params, data.get('format', 'terms'), decimals=4,
+                                       doc_names=index.doc_names(page_ids), total_documents=len(ids)))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/index/stats', methods=['GET'])
+def index_stats():
+    return jsonify(get_corpus_index().stats())
+
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'ok'})
+    return jsonify({'status': 'ok', 'startup': startup.health()})
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
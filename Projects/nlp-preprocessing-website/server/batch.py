@@ -0,0 +1,175 @@
+import collections
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pipeline import compile_pipeline, pos_tag_text
+from startup import warm_up
+
+BATCH_WORKERS = int(os.environ.get('NLP_BATCH_WORKERS', os.cpu_count() or 2))
+DEFAULT_CHUNK_SIZE = 64
+MAX_CHUNK_SIZE = 1000
+MAX_BATCH_DOCS = int(os.environ.get('NLP_MAX_BATCH_DOCS', 50_000))
+# Chunks submitted ahead of the one being streamed, per worker
+IN_FLIGHT_PER_WORKER = 2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forked workers inherit the warm models; spawned ones load them up front
+            _pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS, initializer=warm_up)
+        return _pool
+
+
+def _discard_pool(pool):
+    """Drops a broken pool so the next batch starts a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def parse_chunk_size(value):
+    """Returns chunk_size clamped to [1, MAX_CHUNK_SIZE]; raises ValueError if it is not an integer."""
+    if isinstance(value, bool):
+        raise ValueError('chunk_size must be an integer')
+    try:
+        chunk_size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('chunk_size must be an integer')
+    return max(1, min(chunk_size, MAX_CHUNK_SIZE))
+
+
+def _process_chunk(kind, texts, options):
+    """Runs in a worker process; returns [(result_or_error, seconds), ...]."""
+    fn = pos_tag_text if kind == 'pos_tag' else lambda text, opts: compile_pipeline(opts).run(text)
+    out = []
+    for text in texts:
+        start = time.perf_counter()
+        if not text or not str(text).strip():
+            result = {'error': 'No text provided'}
+        else:
+            result = fn(str(text), options)
+        out.append((result, time.perf_counter() - start))
+    return out
+
+
+class BatchStats:
+    """Running totals for /api/metrics, shared by all batch requests."""
+
+    def __init__(self, window=10_000):
+        self.lock = threading.Lock()
+        self.latencies = collections.deque(maxlen=window)
+        self.documents = 0
+        self.batches = 0
+        self.seconds = 0.0
+        self.last_batch = {}
+
+    def record(self, latencies, summary):
+        with self.lock:
+            self.latencies.extend(latencies)
+            self.documents += summary['documents']
+            self.batches += 1
+            self.seconds += summary['seconds']
+            self.last_batch = summary
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'batches': self.batches,
+                'documents': self.documents,
+                'docs_per_sec': round(self.documents / self.seconds, 1) if self.seconds else 0.0,
+                'latency_ms': latency_summary(self.latencies),
+                'last_batch': self.last_batch,
+                'workers': BATCH_WORKERS,
+            }
+
+
+stats = BatchStats()
+
+
+def latency_summary(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': round(ordered[-1] * 1000, 3),
+    }
+
+
+def stream_batch(kind, texts, options, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields one NDJSON line per document, in input order, then a summary line.
+
+    Texts are split into chunks that run across the process pool. Only a
+    bounded number of chunks is in flight, so memory stays flat however many
+    documents the batch holds. chunk_size must already be parsed with
+    parse_chunk_size. A chunk that fails as a whole (e.g. a crashed worker)
+    yields an error line for each of its documents instead of ending the
+    stream.
+    """
+    pool = get_pool()
+    max_in_flight = BATCH_WORKERS * IN_FLIGHT_PER_WORKER
+    chunks = (texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size))
+    pending = collections.deque()
+    latencies = []
+    index = 0
+    start = time.perf_counter()
+
+    def submit_next():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        try:
+            future = pool.submit(_process_chunk, kind, chunk, options)
+        except Exception as exc:
+            future = Future()
+            future.set_exception(exc)
+        pending.append((len(chunk), future))
+
+    for _ in range(max_in_flight):
+        submit_next()
+
+    while pending:
+        size, future = pending.popleft()
+        try:
+            results = future.result()
+        except Exception as exc:
+            if isinstance(exc, BrokenProcessPool):
+                _discard_pool(pool)
+            results = [({'error': f'Chunk failed: {exc!r}'}, 0.0)] * size
+        submit_next()
+        for result, seconds in results:
+            latencies.append(seconds)
+            line = {'index': index, 'latency_ms': round(seconds * 1000, 3)}
+            line.update({'error': result['error']} if 'error' in result else {'result': result})
+            yield json.dumps(line) + '\n'
+            index += 1
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        'documents': index,
+        'seconds': round(elapsed, 4),
+        'docs_per_sec': round(index / elapsed, 1) if elapsed else 0.0,
+        'chunk_size': chunk_size,
+        'latency_ms': latency_summary(latencies),
+    }
+    stats.record(latencies, summary)
+    yield json.dumps({'summary': summary}) + '\n'
@@ -0,0 +1,106 @@
+"""
+Throughput benchmark: the original per-request preprocess_text vs the
+compiled, cached pipeline.
+
+    python benchmark_preprocess.py --docs 20000
+"""
+import argparse
+import random
+import re
+import string
+import time
+
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer, WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+from pipeline import OPTION_KEYS, cache_info, compile_pipeline
+
+stemmer = PorterStemmer()
+lemmatizer = WordNetLemmatizer()
+
+WORDS = (
+    "the model was trained on thousands of labelled reviews and it predicted "
+    "sentiment with 93 percent accuracy while running quickly on cheap hardware "
+    "users reported that the movies were wonderful but the endings felt rushed "
+    "researchers are studying how children learn languages by listening to stories "
+    "prices rose by 12 percent in 2024 as companies struggled with supply chains"
+).split()
+
+
+def legacy_preprocess_text(text, options):
+    """The pre-pipeline implementation, kept here as the baseline."""
+    processed_text = text
+    steps = []
+    if options.get('lowercase'):
+        processed_text = processed_text.lower()
+        steps.append('Converted to lowercase')
+    if options.get('remove_punctuation'):
+        processed_text = processed_text.translate(str.maketrans('', '', string.punctuation))
+        steps.append('Removed punctuation')
+    if options.get('remove_numbers'):
+        processed_text = re.sub(r'\d+', '', processed_text)
+        steps.append('Removed numbers')
+    tokens = word_tokenize(processed_text)
+    if options.get('remove_stopwords'):
+        stop_words = set(stopwords.words('english'))
+        tokens = [word for word in tokens if word.lower() not in stop_words]
+        steps.append('Removed stopwords')
+    if options.get('stemming'):
+        tokens = [stemmer.stem(word) for word in tokens]
+        steps.append('Applied stemming')
+    if options.get('lemmatization'):
+        tokens = [lemmatizer.lemmatize(word) for word in tokens]
+        steps.append('Applied lemmatization')
+    return {'original': text, 'processed': ' '.join(tokens), 'tokens': tokens, 'steps': steps}
+
+
+def make_corpus(n_docs, seed=0):
+    rng = random.Random(seed)
+    docs = []
+    for _ in range(n_docs):
+        sentences = []
+        for _ in range(rng.randint(1, 4)):
+            words = rng.choices(WORDS, k=rng.randint(6, 20))
+            words[0] = words[0].capitalize()
+            sentences.append(' '.join(words) + rng.choice('.!?'))
+        docs.append(' '.join(sentences))
+    return docs
+
+
+def run(fn, corpus, options):
+    start = time.perf_counter()
+    tokens = 0
+    outputs = []
+    for doc in corpus:
+        result = fn(doc, options)
+        tokens += len(result['tokens'])
+        outputs.append(result['processed'])
+    return time.perf_counter() - start, tokens, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs)
+    options = {name: True for name in OPTION_KEYS}
+
+    # Load NLTK resources before timing either side
+    legacy_preprocess_text(corpus[0], options)
+
+    legacy_time, tokens, legacy_out = run(legacy_preprocess_text, corpus, options)
+    compiled_time, _, compiled_out = run(lambda text, opts: compile_pipeline(opts).run(text), corpus, options)
+
+    assert legacy_out == compiled_out, 'compiled pipeline output differs from the original'
+
+    print(f"docs={len(corpus)} tokens={tokens}")
+    print(f"legacy:   {legacy_time:.2f}s  {len(corpus) / legacy_time:,.0f} docs/s  {tokens / legacy_time:,.0f} tokens/s")
+    print(f"compiled: {compiled_time:.2f}s  {len(corpus) / compiled_time:,.0f} docs/s  {tokens / compiled_time:,.0f} tokens/s")
+    print(f"speedup:  {legacy_time / compiled_time:.1f}x")
+    print(cache_info())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,299 @@
+import json
+import os
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, use a single server process
+    fcntl = None
+
+# Same tokenisation as sklearn's CountVectorizer/TfidfVectorizer defaults
+TOKEN_RE = re.compile(r'(?u)\b\w\w+\b')
+
+# name: dtype of each append-only array kept on disk
+ARRAYS = {
+    'df': np.int64,          # document frequency per term id
+    'doc_indptr': np.int64,  # CSR row pointers, one per document + 1
+    'doc_terms': np.int32,   # term ids of every (document, term) pair
+    'doc_counts': np.int32,  # raw term counts matching doc_terms
+}
+
+
+class CorpusIndex:
+    """
+    Incrementally updatable vocabulary / document-frequency index.
+
+    Documents are added one at a time in O(document length): new terms get
+    the next id in the vocabulary hash map, document frequencies are bumped
+    for the document's unique terms, and its term counts are appended to a
+    CSR-style store. Everything lives in memory-mapped .npy files (plus an
+    append-only vocab.txt / docs.jsonl) under `path`, grown by doubling.
+    TF-IDF for any subset of documents is computed on demand with the same
+    smooth-idf + l2 formula as TfidfVectorizer, so nothing is ever refit.
+
+    Several processes (e.g. gunicorn workers) may open the same path: every
+    write holds an exclusive flock on index.lock, every read a shared one,
+    and each picks up the other processes' committed documents from
+    meta.json before it touches the arrays.
+    """
+
+    def __init__(self, path, initial_capacity=1024):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = open(os.path.join(path, 'index.lock'), 'a')
+
+        with self.lock, self._flock(exclusive=True):
+            self.meta = self._read_meta()
+            self.terms = self._read_lines('vocab.txt', self.meta['n_terms'])
+            self.vocabulary = {term: i for i, term in enumerate(self.terms)}
+            self.names = [json.loads(line)['name'] for line in self._read_lines('docs.jsonl', self.meta['n_docs'])]
+
+            self.arrays = {}
+            for name, dtype in ARRAYS.items():
+                file = os.path.join(path, f'{name}.npy')
+                if os.path.exists(file):
+                    self.arrays[name] = np.load(file, mmap_mode='r+')
+                else:
+                    self.arrays[name] = np.lib.format.open_memmap(file, mode='w+', dtype=dtype,
+                                                                  shape=(initial_capacity,))
+            self._vocab_file = open(os.path.join(path, 'vocab.txt'), 'a', encoding='utf-8')
+            self._docs_file = open(os.path.join(path, 'docs.jsonl'), 'a', encoding='utf-8')
+            # Records the text file sizes that go with the counts
+            self._flush()
+
+    @contextmanager
+    def _flock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        """
+        Holds the thread lock and the file lock, with the state reloaded from
+        disk. Writers must _flush() before leaving so other processes see a
+        consistent meta.json.
+        """
+        # The thread lock comes first: threads share one flock, so it
+        # doesn't exclude them from each other
+        with self.lock, self._flock(exclusive):
+            self._reload(truncate=exclusive)
+            yield
+
+    def _read_meta(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'n_docs': 0, 'n_terms': 0, 'nnz': 0, 'vocab_bytes': 0, 'docs_bytes': 0}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _read_range(self, name, start, end):
+        """Lines stored between byte offsets start and end of a text file."""
+        if end <= start:
+            return []
+        with open(os.path.join(self.path, name), 'rb') as f:
+            f.seek(start)
+            return f.read(end - start).decode('utf-8').splitlines()
+
+    def _reload(self, truncate):
+        """Catches up with documents other processes have committed since our last look."""
+        meta = self._read_meta()
+        if meta != self.meta:
+            for term in self._read_range('vocab.txt', self.meta['vocab_bytes'], meta['vocab_bytes']):
+                self.vocabulary[term] = len(self.terms)
+                self.terms.append(term)
+            lines = self._read_range('docs.jsonl', self.meta['docs_bytes'], meta['docs_bytes'])
+            self.names.extend(json.loads(line)['name'] for line in lines)
+            # Grown arrays were replaced on disk; our maps may still point at the old files
+            self.arrays = {name: np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r+')
+                           for name in ARRAYS}
+            self.meta = meta
+        if truncate:
+            # Drop lines a crashed writer appended without committing them to meta.json
+            for name, key in (('vocab.txt', 'vocab_bytes'), ('docs.jsonl', 'docs_bytes')):
+                file = os.path.join(self.path, name)
+                if os.path.getsize(file) > self.meta[key]:
+                    os.truncate(file, self.meta[key])
+
+    def _read_lines(self, name, limit):
+        """Reads the first `limit` lines, dropping any written after the last flush."""
+        file = os.path.join(self.path, name)
+        if not os.path.exists(file):
+            return []
+        with open(file, encoding='utf-8') as f:
+            lines = [line.rstrip('\n') for line in f]
+        if len(lines) > limit:
+            lines = lines[:limit]
+            with open(file, 'w', encoding='utf-8') as f:
+                f.writelines(line + '\n' for line in lines)
+        return lines
+
+    def _reserve(self, name, size):
+        """Grows an on-disk array (by doubling) so it holds at least `size` items."""
+        array = self.arrays[name]
+        if size <= len(array):
+            return array
+        capacity = len(array)
+        while capacity < size:
+            capacity *= 2
+        file = os.path.join(self.path, f'{name}.npy')
+        tmp = file + '.tmp'
+        grown = np.lib.format.open_memmap(tmp, mode='w+', dtype=array.dtype, shape=(capacity,))
+        grown[:len(array)] = array
+        grown.flush()
+        del grown, array
+        self.arrays[name] = None
+        os.replace(tmp, file)
+        self.arrays[name] = np.load(file, mmap_mode='r+')
+        return self.arrays[name]
+
+    @property
+    def n_docs(self):
+        return self.meta['n_docs']
+
+    @property
+    def n_terms(self):
+        return self.meta['n_terms']
+
+    def add(self, text, name=None):
+        """Adds one document and returns its id."""
+        with self._locked(exclusive=True):
+            doc_id = self._add(text, name)
+            self._flush()
+        return doc_id
+
+    def _add(self, text, name):
+        # Caller holds _locked(exclusive=True)
+        counts = Counter(TOKEN_RE.findall(text.lower()))
+        term_ids = np.empty(len(counts), dtype=np.int32)
+        values = np.fromiter(counts.values(), dtype=np.int32, count=len(counts))
+        for i, term in enumerate(counts):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                term_id = len(self.terms)
+                self.vocabulary[term] = term_id
+                self.terms.append(term)
+                self._vocab_file.write(term + '\n')
+            term_ids[i] = term_id
+
+        n_terms = len(self.terms)
+        df = self._reserve('df', n_terms)
+        df[self.meta['n_terms']:n_terms] = 0
+        df[term_ids] += 1
+
+        doc_id = self.meta['n_docs']
+        nnz = self.meta['nnz']
+        indptr = self._reserve('doc_indptr', doc_id + 2)
+        doc_terms = self._reserve('doc_terms', nnz + len(term_ids))
+        doc_counts = self._reserve('doc_counts', nnz + len(term_ids))
+        doc_terms[nnz:nnz + len(term_ids)] = term_ids
+        doc_counts[nnz:nnz + len(term_ids)] = values
+        indptr[doc_id] = nnz
+        indptr[doc_id + 1] = nnz + len(term_ids)
+
+        name = name if name is not None else f'Doc {doc_id + 1}'
+        self.names.append(name)
+        self._docs_file.write(json.dumps({'id': doc_id, 'name': name}) + '\n')
+        self.meta.update(n_docs=doc_id + 1, n_terms=n_terms, nnz=nnz + len(term_ids))
+        return doc_id
+
+    def add_many(self, texts, names=None):
+        names = names or [None] * len(texts)
+        with self._locked(exclusive=True):
+            ids = [self._add(text, name) for text, name in zip(texts, names)]
+            self._flush()
+        return ids
+
+    def flush(self):
+        with self._locked(exclusive=True):
+            self._flush()
+
+    def _flush(self):
+        # Caller holds the exclusive file lock; meta.json is the commit point
+        for array in self.arrays.values():
+            array.flush()
+        self._vocab_file.flush()
+        self._docs_file.flush()
+        self.meta.update(vocab_bytes=os.fstat(self._vocab_file.fileno()).st_size,
+                         docs_bytes=os.fstat(self._docs_file.fileno()).st_size)
+        tmp = os.path.join(self.path, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, os.path.join(self.path, 'meta.json'))
+
+    def refresh(self):
+        """Picks up documents added by other processes."""
+        with self._locked():
+            pass
+
+    def _idf(self):
+        # Caller holds _locked(): _reserve may swap out the df array meanwhile
+        n = self.n_docs
+        df = np.asarray(self.arrays['df'][:self.n_terms], dtype=np.float64)
+        return np.log((1 + n) / (1 + df)) + 1
+
+    def _counts(self, doc_ids):
+        # Caller holds _locked()
+        indptr = np.asarray(self.arrays['doc_indptr'][:self.n_docs + 1])
+        if doc_ids is None:
+            doc_ids = np.arange(self.n_docs)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64).reshape(-1)
+        bad = doc_ids[(doc_ids < 0) | (doc_ids >= self.n_docs)]
+        if len(bad):
+            raise ValueError(f'Unknown document id {int(bad[0])}')
+        starts, ends = indptr[doc_ids], indptr[doc_ids + 1]
+        row_ptr = np.concatenate(([0], np.cumsum(ends - starts)))
+        positions = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)] or [np.empty(0, np.int64)])
+        columns = np.asarray(self.arrays['doc_terms'][positions])
+        values = np.asarray(self.arrays['doc_counts'][positions], dtype=np.float64)
+        return csr_matrix((values, columns, row_ptr), shape=(len(doc_ids), self.n_terms))
+
+    def idf(self):
+        with self._locked():
+            return self._idf()
+
+    def counts(self, doc_ids=None):
+        """Raw term counts for doc_ids (default: all) as a documents x vocabulary CSR matrix."""
+        with self._locked():
+            return self._counts(doc_ids)
+
+    def tfidf(self, doc_ids=None):
+        """TF-IDF rows for doc_ids using the current corpus statistics."""
+        # Counts and idf from the same snapshot, so the vocabulary sizes match
+        with self._locked():
+            matrix = self._counts(doc_ids)
+            idf = self._idf()
+        matrix.data *= idf[matrix.indices]
+        return normalize(matrix, norm='l2', copy=False)
+
+    def doc_names(self, doc_ids=None):
+        if doc_ids is None:
+            return list(self.names)
+        return [self.names[int(i)] for i in doc_ids]
+
+    def stats(self):
+        return {
+            'documents': self.n_docs,
+            'vocabulary_size': self.n_terms,
+            'nnz': self.meta['nnz'],
+            'path': os.path.abspath(self.path),
+        }
+
+    def close(self):
+        self.flush()
+        self._vocab_file.close()
+        self._docs_file.close()
+        self._lock_file.close()
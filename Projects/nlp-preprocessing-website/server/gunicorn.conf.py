@@ -0,0 +1,20 @@
+import gc
+import multiprocessing
+import os
+
+bind = '0.0.0.0:5000'
+workers = multiprocessing.cpu_count()
+
+# Every worker gets its own batch process pool (batch.py); split the cores
+# between them instead of starting cpu_count pools of cpu_count processes
+os.environ.setdefault('NLP_BATCH_WORKERS', str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Import (and warm) the app once in the master; workers inherit NLTK models,
+# stopwords and WordNet copy-on-write instead of loading their own copies
+preload_app = True
+
+
+def when_ready(server):
+    # Keep the garbage collector from touching (and so copying) the
+    # pre-fork heap in every worker
+    gc.freeze()
@@ -0,0 +1,171 @@
+import re
+import string
+from functools import lru_cache
+
+from nltk.tag.perceptron import PerceptronTagger
+from nltk.corpus import stopwords
+from nltk.stem import PorterStemmer, WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+# Option flags understood by the pipeline, in the order they are applied
+OPTION_KEYS = (
+    'lowercase',
+    'remove_punctuation',
+    'remove_numbers',
+    'remove_stopwords',
+    'stemming',
+    'lemmatization',
+)
+
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+NUMBERS_RE = re.compile(r'\d+')
+
+# Bounded so a stream of unique tokens can't grow memory forever
+TOKEN_CACHE_SIZE = 100_000
+
+stemmer = PorterStemmer()
+lemmatizer = WordNetLemmatizer()
+
+
+@lru_cache(maxsize=1)
+def stop_words():
+    return frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=1)
+def get_tagger():
+    # nltk.pos_tag builds (and unpickles) a new tagger on every call
+    return PerceptronTagger()
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def stem(word):
+    return stemmer.stem(word)
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def lemmatize(word):
+    return lemmatizer.lemmatize(word)
+
+
+class Pipeline:
+    """A preprocessing chain compiled from an options dict."""
+
+    def __init__(self, key):
+        self.key = key
+        enabled = dict(zip(OPTION_KEYS, key))
+        self.text_steps = []
+        self.token_steps = []
+        self.steps = []
+
+        if enabled['lowercase']:
+            self.text_steps.append(str.lower)
+            self.steps.append('Converted to lowercase')
+
+        if enabled['remove_punctuation']:
+            self.text_steps.append(lambda text: text.translate(PUNCTUATION_TABLE))
+            self.steps.append('Removed punctuation')
+
+        if enabled['remove_numbers']:
+            self.text_steps.append(lambda text: NUMBERS_RE.sub('', text))
+            self.steps.append('Removed numbers')
+
+        if enabled['remove_stopwords']:
+            words = stop_words()
+            self.token_steps.append(lambda tokens: [word for word in tokens if word.lower() not in words])
+            self.steps.append('Removed stopwords')
+
+        if enabled['stemming']:
+            self.token_steps.append(lambda tokens: [stem(word) for word in tokens])
+            self.steps.append('Applied stemming')
+
+        if enabled['lemmatization']:
+            self.token_steps.append(lambda tokens: [lemmatize(word) for word in tokens])
+            self.steps.append('Applied lemmatization')
+
+    def tokens(self, text):
+        for step in self.text_steps:
+            text = step(text)
+        tokens = word_tokenize(text)
+        for step in self.token_steps:
+            tokens = step(tokens)
+        return tokens
+
+    def run(self, text):
+        tokens = self.tokens(text)
+        return {
+            'original': text,
+            'processed': ' '.join(tokens),
+            'tokens': tokens,
+            'steps': list(self.steps)
+        }
+
+
+def options_key(options):
+    return tuple(bool(options.get(name)) for name in OPTION_KEYS)
+
+
+@lru_cache(maxsize=2 ** len(OPTION_KEYS))
+def _compile(key):
+    return Pipeline(key)
+
+
+def compile_pipeline(options):
+    """Returns the cached Pipeline for this combination of option flags."""
+    return _compile(options_key(options or {}))
+
+
+POS_EXPLANATION = {
+    'NN': 'Noun, singular',
+    'NNS': 'Noun, plural',
+    'NNP': 'Proper noun, singular',
+    'NNPS': 'Proper noun, plural',
+    'VB': 'Verb, base form',
+    'VBD': 'Verb, past tense',
+    'VBG': 'Verb, gerund/present participle',
+    'VBN': 'Verb, past participle',
+    'VBP': 'Verb, present tense',
+    'VBZ': 'Verb, 3rd person singular present',
+    'JJ': 'Adjective',
+    'JJR': 'Adjective, comparative',
+    'JJS': 'Adjective, superlative',
+    'RB': 'Adverb',
+    'RBR': 'Adverb, comparative',
+    'RBS': 'Adverb, superlative',
+    'DT': 'Determiner',
+    'IN': 'Preposition/subordinating conjunction',
+    'CC': 'Coordinating conjunction',
+    'PRP': 'Personal pronoun',
+    'PRP$': 'Possessive pronoun',
+    'TO': 'to',
+    'MD': 'Modal',
+    'CD': 'Cardinal number',
+}
+
+
+def pos_tag_text(text, options):
+    """Preprocesses text and tags each token, as returned by /api/pos_tag."""
+    preprocessed = compile_pipeline(options).run(text)
+    tagged_with_explanation = [
+        {
+            'word': word,
+            'tag': tag,
+            'explanation': POS_EXPLANATION.get(tag, 'Other')
+        }
+        for word, tag in get_tagger().tag(preprocessed['tokens'])
+    ]
+    return {
+        'original': text,
+        'preprocessed': preprocessed['processed'],
+        'tokens': preprocessed['tokens'],
+        'steps': preprocessed['steps'],
+        'pos_tags': tagged_with_explanation
+    }
+
+
+def cache_info():
+    return {
+        'pipelines': _compile.cache_info()._asdict(),
+        'stem': stem.cache_info()._asdict(),
+        'lemmatize': lemmatize.cache_info()._asdict(),
+    }
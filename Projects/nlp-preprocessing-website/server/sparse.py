@@ -0,0 +1,109 @@
+import numpy as np
+
+SPARSE_FORMATS = ('terms', 'csr')
+MAX_PAGE = 10_000
+
+
+def page_params(data, total_documents, vocabulary_size):
+    """Reads and clamps paging/top-k parameters from a request body."""
+    def read(name, default, upper, lower=0):
+        value = data.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{name}' must be an integer")
+        if value < lower:
+            raise ValueError(f"'{name}' must be >= {lower}")
+        return min(value, upper)
+
+    doc_offset = read('doc_offset', 0, total_documents)
+    vocab_offset = read('vocab_offset', 0, vocabulary_size)
+    return {
+        'doc_offset': doc_offset,
+        'doc_limit': read('doc_limit', min(total_documents, MAX_PAGE), MAX_PAGE, lower=1),
+        'vocab_offset': vocab_offset,
+        'vocab_limit': read('vocab_limit', vocabulary_size, vocabulary_size),
+        'top_k': read('top_k', 0, vocabulary_size),
+    }
+
+
+def _round(values, decimals):
+    return values.round(decimals).tolist() if decimals is not None else values.tolist()
+
+
+def sparse_response(matrix, feature_names, params, fmt='terms', decimals=None, doc_names=None,
+                    total_documents=None):
+    """
+    Serialises a document x term sparse matrix without densifying it.
+
+    fmt='terms' - per document, the non-zero [term, weight] pairs sorted by
+                  weight (only the top_k if top_k > 0)
+    fmt='csr'   - the CSR arrays of the requested page plus its vocabulary
+    Only rows [doc_offset, doc_offset + doc_limit) and columns
+    [vocab_offset, vocab_offset + vocab_limit) are included. Pass
+    total_documents when `matrix` already holds just that page of rows.
+    """
+    if fmt not in SPARSE_FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', expected one of {SPARSE_FORMATS}")
+
+    vocabulary_size = matrix.shape[1]
+    if total_documents is None:
+        total_documents = matrix.shape[0]
+        d0, d1 = params['doc_offset'], min(total_documents, params['doc_offset'] + params['doc_limit'])
+        page = matrix[d0:d1]
+    else:
+        d0, d1 = params['doc_offset'], params['doc_offset'] + matrix.shape[0]
+        page = matrix
+    v0, v1 = params['vocab_offset'], min(vocabulary_size, params['vocab_offset'] + params['vocab_limit'])
+    if (v0, v1) != (0, vocabulary_size):
+        page = page[:, v0:v1]
+    page = page.tocsr()
+    page.sort_indices()
+    names = feature_names[v0:v1]
+    doc_names = doc_names or [f'Doc {i + 1}' for i in range(d0, d1)]
+
+    response = {
+        'format': fmt,
+        'shape': [total_documents, vocabulary_size],
+        'vocabulary_size': vocabulary_size,
+        'nnz': int(page.nnz),
+        'pagination': {
+            'doc_offset': d0,
+            'doc_limit': params['doc_limit'],
+            'total_documents': total_documents,
+            'next_doc_offset': d1 if d1 < total_documents else None,
+            'vocab_offset': v0,
+            'vocab_limit': params['vocab_limit'],
+            'next_vocab_offset': v1 if v1 < vocabulary_size else None,
+        },
+    }
+
+    if fmt == 'csr':
+        response.update({
+            'documents': doc_names,
+            'vocabulary': list(names),
+            'indptr': page.indptr.tolist(),
+            'indices': page.indices.tolist(),
+            'data': _round(page.data, decimals),
+        })
+        return response
+
+    top_k = params['top_k']
+    documents = []
+    for row, doc_name in enumerate(doc_names):
+        start, end = page.indptr[row], page.indptr[row + 1]
+        values = page.data[start:end]
+        columns = page.indices[start:end]
+        if top_k and len(values) > top_k:
+            keep = np.argpartition(-values, top_k - 1)[:top_k]
+            values, columns = values[keep], columns[keep]
+        order = np.argsort(-values, kind='stable')
+        documents.append({
+            'document': doc_name,
+            'terms': [[names[c], w] for c, w in zip(columns[order].tolist(), _round(values[order], decimals))],
+        })
+    response['documents'] = documents
+    response['top_k'] = top_k
+    return response
@@ -0,0 +1,74 @@
+import os
+import time
+
+import nltk
+from nltk.tokenize import word_tokenize
+
+from pipeline import get_tagger, lemmatize, stop_words
+
+# (resource path, download package); each is probed exactly once at startup
+RESOURCES = (
+    ('tokenizers/punkt', 'punkt'),
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+    ('corpora/stopwords', 'stopwords'),
+    ('taggers/averaged_perceptron_tagger', 'averaged_perceptron_tagger'),
+    ('corpora/wordnet', 'wordnet'),
+)
+
+report = {
+    'resources': {},
+    'resource_check_ms': None,
+    'warmup_ms': {},
+    'cold_start_ms': None,
+    'first_request_ms': None,
+}
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def ensure_resources():
+    start = time.perf_counter()
+    for path, package in RESOURCES:
+        try:
+            nltk.data.find(path)
+            status = 'present'
+        except LookupError:
+            status = 'downloaded' if nltk.download(package, quiet=True) else 'missing'
+        report['resources'][package] = status
+    report['resource_check_ms'] = _ms(time.perf_counter() - start)
+
+
+def warm_up():
+    """Loads every lazily initialised model so no request pays for it."""
+    steps = (
+        ('stopwords', stop_words),
+        ('punkt', lambda: word_tokenize('Warm up the tokenizer.')),
+        ('wordnet', lambda: lemmatize('warming')),
+        ('perceptron_tagger', lambda: get_tagger().tag(['warm', 'up'])),
+    )
+    for name, step in steps:
+        start = time.perf_counter()
+        step()
+        report['warmup_ms'][name] = _ms(time.perf_counter() - start)
+
+
+def initialize(started_at):
+    """
+    Runs once per process that imports the app. Under gunicorn with
+    preload_app the master does this and forked workers share the warmed
+    objects copy-on-write.
+    """
+    ensure_resources()
+    warm_up()
+    report['cold_start_ms'] = _ms(time.perf_counter() - started_at)
+
+
+def record_request(seconds):
+    if report['first_request_ms'] is None:
+        report['first_request_ms'] = _ms(seconds)
+
+
+def health():
+    return dict(report, pid=os.getpid())
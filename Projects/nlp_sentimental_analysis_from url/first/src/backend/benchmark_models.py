@@ -0,0 +1,91 @@
+"""
+Accuracy / latency comparison of the sentiment runtimes on a labelled sample.
+
+Loads each runtime, scores every text of the sample (a JSONL file of
+{"text", "label"} lines with positive/negative labels) in batches, and
+prints load time, throughput, per-batch latency, accuracy and agreement with
+the FP32 model. Use it to pick SENTIMENT_RUNTIME / LEXICON_THRESHOLD for a
+deployment:
+
+    python benchmark_models.py
+    python benchmark_models.py --sample my_labelled.jsonl --runtimes torch int8 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import time
+
+from nlp.models import RUNTIMES, lexicon_model, load_model
+from nlp.sentiment import BATCH_SIZE, score_texts
+
+DEFAULT_SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_sample.jsonl")
+
+
+def load_sample(path):
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [row["text"] for row in rows], [row["label"].lower() for row in rows]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def benchmark(model, texts, batch_size, repeat):
+    """Returns the predicted labels and timing stats over `repeat` passes."""
+    score_texts(model, texts[:batch_size], batch_size)  # warm-up
+    batch_times = []
+    for _ in range(repeat):
+        predictions = []
+        for i in range(0, len(texts), batch_size):
+            start = time.perf_counter()
+            predictions.extend(score_texts(model, texts[i:i + batch_size], batch_size))
+            batch_times.append(time.perf_counter() - start)
+    labels = [(p or {"label": "neutral"})["label"].lower() for p in predictions]
+    total = sum(batch_times)
+    return labels, {
+        "texts_per_sec": len(texts) * repeat / total if total else 0.0,
+        "p50_ms": percentile(batch_times, 50) * 1000,
+        "p95_ms": percentile(batch_times, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sentiment runtimes on a labelled sample")
+    parser.add_argument("--sample", default=DEFAULT_SAMPLE)
+    parser.add_argument("--runtimes", nargs="+", default=list(RUNTIMES) + ["lexicon"],
+                        choices=list(RUNTIMES) + ["lexicon"])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    texts, gold = load_sample(args.sample)
+    print(f"{len(texts)} texts from {args.sample}, batch size {args.batch_size}\n")
+
+    rows, reference = [], None
+    for runtime in args.runtimes:
+        start = time.perf_counter()
+        try:
+            model = lexicon_model if runtime == "lexicon" else load_model(runtime)
+        except Exception as e:
+            print(f"{runtime}: skipped ({e})")
+            continue
+        load_seconds = time.perf_counter() - start
+        predicted, timing = benchmark(model, texts, args.batch_size, args.repeat)
+        if runtime == "torch":
+            reference = predicted
+        accuracy = sum(p == g for p, g in zip(predicted, gold)) / len(gold)
+        agreement = (sum(p == r for p, r in zip(predicted, reference)) / len(reference)) if reference else None
+        rows.append((runtime, load_seconds, timing, accuracy, agreement))
+
+    print(f"\n{'runtime':<8} {'load s':>7} {'texts/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'accuracy':>9} {'vs fp32':>8}")
+    for runtime, load_seconds, timing, accuracy, agreement in rows:
+        vs = f"{agreement:.1%}" if agreement is not None else "-"
+        print(f"{runtime:<8} {load_seconds:>7.2f} {timing['texts_per_sec']:>9.1f} {timing['p50_ms']:>8.2f} "
+              f"{timing['p95_ms']:>8.2f} {accuracy:>9.1%} {vs:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Disk-backed LRU caches for fetched pages and per-text sentiment scores.
+
+Both levels live in one SQLite file, so they survive restarts. Each level
+has its own table, its own entry/byte limits and optional TTL, and evicts
+the least recently used rows once a limit is exceeded.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.environ.get("SENTIMENT_CACHE_PATH", "cache.sqlite3")
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 3600))
+PAGE_CACHE_MAX_MB = float(os.environ.get("PAGE_CACHE_MAX_MB", 200))
+SCORE_CACHE_MAX_ENTRIES = int(os.environ.get("SCORE_CACHE_MAX_ENTRIES", 500_000))
+RESULTS_MAX = int(os.environ.get("RESULTS_MAX", 1000))
+
+# Keeps each IN (...) query under SQLite's bound-parameter limit
+SQL_CHUNK = 500
+
+
+def text_key(text: str, namespace: str = "") -> str:
+    """Content hash of the normalised text (lowercased, whitespace collapsed)."""
+    normalised = " ".join(text.lower().split())
+    return hashlib.sha1(f"{namespace}\0{normalised}".encode("utf-8")).hexdigest()
+
+
+class SqliteLRU:
+    """One cache level: a table of JSON values with LRU eviction."""
+
+    def __init__(self, conn, lock, table, max_entries=None, max_bytes=None, ttl=None):
+        self.conn = conn
+        self.lock = lock
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        with self.lock, self.conn:
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed)")
+            self.entries, self.bytes = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {table}"
+            ).fetchone()
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """Returns {key: value} for the keys that are cached and not expired."""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found, expired = {}, []
+        with self.lock, self.conn:
+            for i in range(0, len(keys), SQL_CHUNK):
+                chunk = keys[i:i + SQL_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, value, created FROM {self.table} WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if self.ttl is not None and now - created > self.ttl:
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+                hit_keys = [key for key in chunk if key in found]
+                if hit_keys:
+                    self.conn.execute(
+                        f"UPDATE {self.table} SET accessed = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                        [now] + hit_keys
+                    )
+            if expired:
+                self._delete(expired)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key, value):
+        self.put_many({key: value})
+
+    def put_many(self, items):
+        if not items:
+            return
+        now = time.time()
+        rows = [(key, json.dumps(value)) for key, value in items.items()]
+        with self.lock, self.conn:
+            self._delete([key for key, _ in rows], count_evictions=False)
+            self.conn.executemany(
+                f"INSERT INTO {self.table} (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                [(key, value, len(value), now, now) for key, value in rows]
+            )
+            self.entries += len(rows)
+            self.bytes += sum(len(value) for _, value in rows)
+            self._evict()
+
+    def _delete(self, keys, count_evictions=True):
+        """Deletes keys and updates the totals; caller holds the lock."""
+        for i in range(0, len(keys), SQL_CHUNK):
+            chunk = keys[i:i + SQL_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            removed, size = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table} WHERE key IN ({marks})", chunk
+            ).fetchone()
+            self.conn.execute(f"DELETE FROM {self.table} WHERE key IN ({marks})", chunk)
+            self.entries -= removed
+            self.bytes -= size
+            if count_evictions:
+                self.evictions += removed
+
+    def _evict(self):
+        while ((self.max_entries is not None and self.entries > self.max_entries)
+               or (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            over = self.entries - self.max_entries if self.max_entries is not None else 0
+            # Evict in bulk: at least the overflow, plus some headroom
+            batch = max(over, 1, self.entries // 20)
+            keys = [row[0] for row in self.conn.execute(
+                f"SELECT key FROM {self.table} ORDER BY accessed LIMIT ?", (batch,)
+            )]
+            if not keys:
+                break
+            self._delete(keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "ttl": self.ttl,
+        }
+
+
+class AnalysisCache:
+    """
+    pages  - fetched markdown keyed by URL, expires after PAGE_CACHE_TTL seconds
+    scores - {"label", "score"} keyed by text_key(text, model), never expires
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.pages = SqliteLRU(self.conn, self.lock, "pages",
+                               max_bytes=int(PAGE_CACHE_MAX_MB * 1024 * 1024), ttl=PAGE_CACHE_TTL)
+        self.scores = SqliteLRU(self.conn, self.lock, "scores", max_entries=SCORE_CACHE_MAX_ENTRIES)
+
+    def stats(self):
+        return {"path": os.path.abspath(self.path), "pages": self.pages.stats(), "scores": self.scores.stats()}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class LRUDict(OrderedDict):
+    """A dict that drops its least recently used items beyond maxsize."""
+
+    def __init__(self, maxsize=RESULTS_MAX):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
@@ -14,31 +14,56 @@ Key Improvements:
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Literal
 from datetime import datetime
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
 import uuid
-import requests
-import re
 
 # NLP imports
-from transformers import pipeline
 import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from collections import Counter
+
+from nlp.models import load_analyzer
+from nlp.preprocessor import analyze_texts, extract_texts
+from nlp.sentiment import analyze_sentiment
+from scraper.fetcher import create_fetcher
+from cache import AnalysisCache, LRUDict, RESULTS_MAX
 
 # Download NLTK data (quietly)
-nltk.download('punkt', quiet=True)
 nltk.download('stopwords', quiet=True)
 nltk.download('wordnet', quiet=True)
 
+# Pooled async HTTP client (Jina Reader by default, see scraper/fetcher.py)
+fetcher = create_fetcher()
+
+# CPU-bound work (parsing, transformer, NLTK) runs here, off the event loop.
+# Threads share the one loaded model; torch releases the GIL during inference.
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", 2))
+analysis_pool = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+# Page cache reads/writes get their own thread so they never queue behind
+# analyses; the cache serialises on one SQLite connection anyway
+cache_io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-io")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await fetcher.start()
+    yield
+    await fetcher.close()
+    # Queued analyses are dropped, running ones finish before the cache closes under them
+    analysis_pool.shutdown(wait=True, cancel_futures=True)
+    cache_io_pool.shutdown(wait=True)
+    analysis_cache.close()
+
 # Initialize FastAPI
 app = FastAPI(
     title="SentimentIQ API",
     description="AI-Powered Sentiment Intelligence Platform",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS (restrict in production)
@@ -50,25 +75,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Sentiment pipeline (DistilBERT - fast & accurate)
-try:
-    sentiment_analyzer = pipeline(
-        "sentiment-analysis",
-        model="distilbert-base-uncased-finetuned-sst-2-english",
-        device=-1  # CPU; use 0 for GPU if available
-    )
-except Exception as e:
-    print(f"Warning: Transformer model load failed: {e}")
-    sentiment_analyzer = None
+# Sentiment pipeline (DistilBERT - fast & accurate), scored in length-sorted batches.
+# Configure with SENTIMENT_RUNTIME, SENTIMENT_BATCH_SIZE, SENTIMENT_THREADS and SENTIMENT_MAX_TEXTS.
+sentiment_analyzer = load_analyzer()
 
-lemmatizer = WordNetLemmatizer()
+# Fetched pages and per-text scores, persisted in SQLite (see cache.py)
+analysis_cache = AnalysisCache()
 
-# In-memory store (replace with Redis/DB in production)
-results_store = {}
+# In-memory store (replace with Redis/DB in production), keeps the RESULTS_MAX most recent
+results_store = LRUDict(RESULTS_MAX)
+# Job status by id: {"status": "pending" | "done" | "failed", "error": HTTPException | None}
+jobs = LRUDict(RESULTS_MAX)
+# Keeps running job tasks referenced until they finish
+job_tasks = set()
 
 # Pydantic Models (unchanged except sourceType now includes more)
 class AnalyzeRequest(BaseModel):
     url: HttpUrl
+    scoreAll: bool = False  # score every extracted text instead of the first SENTIMENT_MAX_TEXTS
 
 class WordFrequency(BaseModel):
     word: str
@@ -111,6 +135,11 @@ class SentimentResult(BaseModel):
     sourceType: Literal["website", "youtube", "twitter", "unknown"]
     totalTextsAnalyzed: int
 
+class JobStatus(BaseModel):
+    id: str
+    status: Literal["pending", "done", "failed"]
+    detail: str = ""
+
 
 # Helper Functions
 def detect_source_type(url: str) -> str:
@@ -122,153 +151,6 @@ def detect_source_type(url: str) -> str:
     else:
         return "website"
 
-def fetch_with_jina(url: str) -> str:
-    """Fetch clean Markdown content using free Jina Reader API."""
-    jina_url = f"https://r.jina.ai/{url}"
-    headers = {
-        "Accept": "application/json",
-        "X-Return-Format": "markdown"
-    }
-    try:
-        response = requests.get(jina_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
-        content = data.get("data", {}).get("content") or data.get("content", "")
-        return content
-    except Exception as e:
-        print(f"Jina Reader error: {e}")
-        return ""
-
-def extract_texts(markdown: str, source_type: str) -> List[str]:
-    """Parse Markdown into individual text segments (comments/tweets/etc.)"""
-    if not markdown:
-        return []
-
-    lines = [line.strip() for line in markdown.split("\n") if line.strip()]
-    texts = []
-
-    if source_type == "youtube":
-        # YouTube: comments often appear as plain lines or with @author prefixes
-        for line in lines:
-            if len(line) > 30 and len(line) < 1000 and not line.startswith(("#", "[", ">", "- ", "* ")):
-                # Detect author pattern like "@user: text" or "user - text"
-                match = re.match(r"^@?(\w[\w.-]*\w)\s*[:\-–—]\s*(.+)", line)
-                if match:
-                    text = match.group(2).strip()
-                else:
-                    text = line
-                if len(text) > 20:
-                    texts.append(text)
-
-    elif source_type == "twitter":
-        for line in lines:
-            cleaned = line.lstrip("#*-_> ")
-            if 20 < len(cleaned) < 500:
-                texts.append(cleaned)
-
-    else:  # Generic websites
-        for line in lines:
-            cleaned = line.lstrip("#*-_> ")
-            if 30 < len(cleaned) < 1000:
-                texts.append(cleaned)
-
-    # Fallback: split into paragraphs if very few texts found
-    if len(texts) < 10:
-        paragraphs = [p.strip() for p in markdown.split("\n\n") if p.strip()]
-        for para in paragraphs:
-            cleaned = re.sub(r"^#+", "", para).strip()
-            if 50 < len(cleaned) < 2000:
-                texts.append(cleaned)
-
-    return texts[:400]  # Increased limit for better sentiment accuracy
-
-def preprocess_text(text: str) -> str:
-    text = re.sub(r'http\S+|www\S+', '', text)
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-    text = text.lower()
-    tokens = word_tokenize(text)
-    try:
-        stop_words = set(stopwords.words('english'))
-        tokens = [lemmatizer.lemmatize(t) for t in tokens if t not in stop_words and len(t) > 2]
-    except:
-        tokens = [t for t in tokens if len(t) > 2]
-    return ' '.join(tokens)
-
-def analyze_sentiment(texts: List[str]) -> dict:
-    if not texts:
-        return {
-            "sentiment": "neutral",
-            "confidence": 0.0,
-            "distribution": {"positive": 33, "negative": 33, "neutral": 34},
-            "scores": []
-        }
-
-    positive_count = negative_count = neutral_count = 0
-    all_scores = []
-
-    for text in texts[:100]:  # Increased sample size for better accuracy
-        if len(text) < 10:
-            continue
-
-        if sentiment_analyzer:
-            try:
-                result = sentiment_analyzer(text[:512])[0]
-                label = result['label'].lower()
-                score = result['score']
-                if label == 'positive':
-                    positive_count += 1
-                else:
-                    negative_count += 1
-                all_scores.append({"text": text[:100], "label": label, "score": score})
-            except:
-                neutral_count += 1
-        else:
-            # Simple fallback (rarely used)
-            positive_words = ['good', 'great', 'excellent', 'amazing', 'love', 'best', 'awesome']
-            negative_words = ['bad', 'terrible', 'awful', 'hate', 'worst', 'poor', 'disappointing']
-            text_lower = text.lower()
-            pos = sum(w in text_lower for w in positive_words)
-            neg = sum(w in text_lower for w in negative_words)
-            if pos > neg:
-                positive_count += 1
-            elif neg > pos:
-                negative_count += 1
-            else:
-                neutral_count += 1
-
-    total = positive_count + negative_count + neutral_count or 1
-    distribution = {
-        "positive": round(positive_count / total * 100),
-        "negative": round(negative_count / total * 100),
-        "neutral": round(neutral_count / total * 100)
-    }
-
-    if positive_count >= negative_count and positive_count >= neutral_count:
-        sentiment = "positive"
-        confidence = positive_count / total * 100
-    elif negative_count >= positive_count and negative_count >= neutral_count:
-        sentiment = "negative"
-        confidence = negative_count / total * 100
-    else:
-        sentiment = "neutral"
-        confidence = neutral_count / total * 100
-
-    return {
-        "sentiment": sentiment,
-        "confidence": round(confidence, 2),
-        "distribution": distribution,
-        "scores": all_scores
-    }
-
-def extract_word_frequencies(texts: List[str], top_n: int = 15) -> List[WordFrequency]:
-    all_words = []
-    for text in texts:
-        processed = preprocess_text(text)
-        all_words.extend(processed.split())
-    word_counts = Counter(all_words)
-    top_words = word_counts.most_common(top_n)
-    return [WordFrequency(word=word, count=count) for word, count in top_words]
-
 def extract_top_phrases(sentiment_scores: List[dict]) -> List[TopPhrase]:
     phrases = []
     for score_data in sentiment_scores[:10]:  # More top phrases
@@ -287,12 +169,8 @@ def generate_summary(url: str, sentiment: str, texts_count: int) -> str:
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
-@app.post("/analyze", response_model=SentimentResult)
-async def analyze_url(request: AnalyzeRequest):
-    url = str(request.url)
-    source_type = detect_source_type(url)
-
-    markdown = fetch_with_jina(url)
+def run_analysis(result_id: str, url: str, source_type: str, markdown: str, score_all: bool) -> SentimentResult:
+    """The CPU-bound part of an analysis; runs in analysis_pool."""
     texts = extract_texts(markdown, source_type)
 
     if not texts:
@@ -301,47 +179,97 @@ async def analyze_url(request: AnalyzeRequest):
             detail="Could not extract readable content from the URL (try checking if the page is public and has comments/text)."
         )
 
-    sentiment_data = analyze_sentiment(texts)
-    word_frequencies = extract_word_frequencies(texts)
-    top_phrases = extract_top_phrases(sentiment_data.get("scores", []))
+    sentiment_data = analyze_sentiment(sentiment_analyzer, texts, score_all=score_all, cache=analysis_cache.scores)
+    # One tokenization per text feeds both word counts and phrases
+    text_stats = analyze_texts(texts, sentiment_data["labels"])
+    word_frequencies = [WordFrequency(word=word, count=count) for word, count in text_stats.top_words()]
+    top_phrases = [
+        TopPhrase(phrase=p["phrase"], sentiment=p["sentiment"], score=p["score"])
+        for p in text_stats.top_phrases()
+    ] or extract_top_phrases(sentiment_data.get("scores", []))
 
     summary = generate_summary(url, sentiment_data["sentiment"], len(texts))
 
-    result_id = str(uuid.uuid4())
-    # result = SentimentResult(
-    #     id=result_id,
-    #     url=url,
-    #     sentiment=sentiment_data["sentiment"],
-    #     confidence=sentiment_data["confidence"],
-    #     distribution=sentiment_data["distribution"],
-    #     wordFrequencies=word_frequencies,
-    #     topPhrases=top_phrases,
-    #     summary=summary,
-    #     analyzedAt=datetime.utcnow().isoformat(),
-    #     sourceType=source_type,
-    #     totalTextsAnalyzed=len(texts)
-    # )
-    result = SentimentResult(
-    id=result_id,
-    url=url,
-    sentiment=sentiment_data["sentiment"],
-    confidence=sentiment_data["confidence"],
-    distribution=sentiment_data["distribution"],
-    wordFrequencies=word_frequencies,
-    topPhrases=top_phrases,
-    scores=sentiment_data.get("scores", []),  # <-- ADD THIS
-    summary=summary,
-    analyzedAt=datetime.utcnow().isoformat(),
-    sourceType=source_type,
-    totalTextsAnalyzed=len(texts)
+    return SentimentResult(
+        id=result_id,
+        url=url,
+        sentiment=sentiment_data["sentiment"],
+        confidence=sentiment_data["confidence"],
+        distribution=sentiment_data["distribution"],
+        wordFrequencies=word_frequencies,
+        topPhrases=top_phrases,
+        scores=sentiment_data.get("scores", []),
+        summary=summary,
+        analyzedAt=datetime.utcnow().isoformat(),
+        sourceType=source_type,
+        totalTextsAnalyzed=len(texts)
     )
 
-
+async def process_job(result_id: str, request: AnalyzeRequest) -> SentimentResult:
+    url = str(request.url)
+    source_type = detect_source_type(url)
+    try:
+        loop = asyncio.get_running_loop()
+        markdown = await loop.run_in_executor(cache_io_pool, analysis_cache.pages.get, url)
+        if markdown is None:
+            markdown = await fetcher.fetch(url)
+            if markdown:
+                await loop.run_in_executor(cache_io_pool, analysis_cache.pages.put, url, markdown)
+        result = await loop.run_in_executor(
+            analysis_pool, run_analysis, result_id, url, source_type, markdown, request.scoreAll
+        )
+    except HTTPException as e:
+        jobs[result_id] = {"status": "failed", "error": e}
+        raise
+    except Exception as e:
+        print(f"Analysis error for {url}: {e}")
+        jobs[result_id] = {"status": "failed", "error": HTTPException(status_code=500, detail="Analysis failed")}
+        raise
     results_store[result_id] = result
+    jobs[result_id] = {"status": "done", "error": None}
     return result
 
+def submit_job(request: AnalyzeRequest):
+    result_id = str(uuid.uuid4())
+    jobs[result_id] = {"status": "pending", "error": None}
+    task = asyncio.create_task(process_job(result_id, request))
+    job_tasks.add(task)
+    # Failures are recorded in `jobs`; retrieve the exception so it isn't logged as unhandled
+    task.add_done_callback(lambda t: (job_tasks.discard(t), t.cancelled() or t.exception()))
+    return result_id, task
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Entries, size and hit ratio of the page and score caches."""
+    return analysis_cache.stats()
+
+@app.post("/analyze", response_model=SentimentResult)
+async def analyze_url(request: AnalyzeRequest):
+    """Runs an analysis and waits for it; other requests keep being served meanwhile."""
+    _, task = submit_job(request)
+    # Shielded so a client disconnect doesn't cancel the job; the result still lands in results_store
+    return await asyncio.shield(task)
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(request: AnalyzeRequest):
+    """Queues an analysis and returns its id right away; poll /results/{id} for the result."""
+    result_id, _ = submit_job(request)
+    return JobStatus(id=result_id, status="pending")
+
+@app.get("/jobs/{result_id}", response_model=JobStatus)
+async def get_job(result_id: str):
+    if result_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = jobs[result_id]
+    return JobStatus(id=result_id, status=job["status"], detail=job["error"].detail if job["error"] else "")
+
 @app.get("/results/{result_id}", response_model=SentimentResult)
 async def get_result(result_id: str):
+    job = jobs.get(result_id)
+    if job and job["status"] == "pending":
+        return JSONResponse(status_code=202, content={"id": result_id, "status": "pending"})
+    if job and job["status"] == "failed":
+        raise job["error"]
     if result_id not in results_store:
         raise HTTPException(status_code=404, detail="Result not found")
     return results_store[result_id]
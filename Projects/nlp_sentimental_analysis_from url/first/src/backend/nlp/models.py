@@ -0,0 +1,113 @@
+"""
+Sentiment model runtimes.
+
+SENTIMENT_RUNTIME picks how the transformer runs on CPU:
+    torch - the FP32 Hugging Face pipeline (default)
+    int8  - the same model with its Linear layers dynamically quantized to INT8
+    onnx  - an ONNX Runtime export of the model (needs optimum[onnxruntime]);
+            exported once to ONNX_EXPORT_DIR and reused afterwards
+LexiconModel is a cheap word-list scorer with the same call signature, used
+when the transformer can't load and, past LEXICON_THRESHOLD texts, for very
+long lists.
+"""
+
+import os
+import re
+from typing import List
+
+SENTIMENT_MODEL = os.environ.get("SENTIMENT_MODEL", "distilbert-base-uncased-finetuned-sst-2-english")
+SENTIMENT_RUNTIME = os.environ.get("SENTIMENT_RUNTIME", "torch")
+RUNTIMES = ("torch", "int8", "onnx")
+NUM_THREADS = int(os.environ.get("SENTIMENT_THREADS", 0))  # 0 = torch default
+ONNX_EXPORT_DIR = os.environ.get("ONNX_EXPORT_DIR", "onnx_models")
+LEXICON_THRESHOLD = int(os.environ.get("LEXICON_THRESHOLD", 0))  # 0 = never
+
+POSITIVE_WORDS = frozenset([
+    'good', 'great', 'excellent', 'amazing', 'love', 'loved', 'best', 'awesome', 'nice', 'perfect',
+    'happy', 'wonderful', 'fantastic', 'helpful', 'recommend', 'beautiful', 'brilliant', 'enjoyed'
+])
+NEGATIVE_WORDS = frozenset([
+    'bad', 'terrible', 'awful', 'hate', 'hated', 'worst', 'poor', 'disappointing', 'disappointed',
+    'boring', 'broken', 'useless', 'waste', 'horrible', 'annoying', 'slow', 'scam', 'refund'
+])
+WORD_RE = re.compile(r"[a-z']+")
+
+
+class SentimentModel:
+    """
+    A loaded classifier plus a name that identifies both the weights and the
+    runtime (used to key cached scores). Called like a transformers pipeline.
+    """
+
+    def __init__(self, name: str, pipe):
+        self.name = name
+        self.pipe = pipe
+
+    def __call__(self, texts, **kwargs):
+        return self.pipe(texts, **kwargs)
+
+
+class LexiconModel:
+    """Counts positive/negative words; labels with no clear majority are neutral."""
+
+    name = "lexicon"
+
+    def score(self, text: str) -> dict:
+        words = WORD_RE.findall(text.lower())
+        pos = sum(w in POSITIVE_WORDS for w in words)
+        neg = sum(w in NEGATIVE_WORDS for w in words)
+        if pos == neg:
+            return {"label": "NEUTRAL", "score": 0.5}
+        return {
+            "label": "POSITIVE" if pos > neg else "NEGATIVE",
+            "score": round(0.5 + 0.5 * abs(pos - neg) / (pos + neg), 4)
+        }
+
+    def __call__(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return [self.score(texts)]
+        return [self.score(text) for text in texts]
+
+
+def _onnx_model(model_id: str):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    export_dir = os.path.join(ONNX_EXPORT_DIR, model_id.replace("/", "--"))
+    if os.path.isdir(export_dir):
+        return ORTModelForSequenceClassification.from_pretrained(export_dir)
+    model = ORTModelForSequenceClassification.from_pretrained(model_id, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+def load_model(runtime: str = SENTIMENT_RUNTIME, model_id: str = SENTIMENT_MODEL) -> SentimentModel:
+    """Loads model_id on CPU with the given runtime; raises if it can't."""
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown SENTIMENT_RUNTIME '{runtime}', expected one of {RUNTIMES}")
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if NUM_THREADS > 0:
+        torch.set_num_threads(NUM_THREADS)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    if runtime == "onnx":
+        model = _onnx_model(model_id)
+    else:
+        model = AutoModelForSequenceClassification.from_pretrained(model_id).eval()
+        if runtime == "int8":
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    pipe = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+    return SentimentModel(f"{model_id}:{runtime}", pipe)
+
+
+def load_analyzer():
+    """Loads the configured model, or returns None if it can't be loaded."""
+    try:
+        return load_model()
+    except Exception as e:
+        print(f"Warning: Transformer model load failed: {e}")
+        return None
+
+
+lexicon_model = LexiconModel()
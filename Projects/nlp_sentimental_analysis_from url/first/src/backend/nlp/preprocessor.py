@@ -0,0 +1,168 @@
+"""
+Text extraction and single-pass text analytics.
+
+extract_texts() walks the markdown once, collecting both the line candidates
+and the paragraph fallback. TextStats then tokenizes every text exactly once
+and feeds word counts and n-gram phrase counts from that one token stream;
+phrases are labelled with the sentiment of the texts they occur in.
+"""
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional
+
+URL_RE = re.compile(r'http\S+|www\S+')
+NON_ALPHA_RE = re.compile(r'[^a-zA-Z\s]')
+AUTHOR_RE = re.compile(r"^@?(\w[\w.-]*\w)\s*[:\-–—]\s*(.+)")
+HEADING_RE = re.compile(r"^#+")
+
+MAX_TEXTS = 400
+NGRAM_SIZES = (2, 3)
+MIN_PHRASE_COUNT = 2
+# Phrase table is pruned back to half this size when it grows past it
+MAX_PHRASES = 20_000
+LEMMA_CACHE_SIZE = 50_000
+
+
+@lru_cache(maxsize=1)
+def stop_words() -> frozenset:
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except LookupError:
+        return frozenset()
+
+
+@lru_cache(maxsize=1)
+def _lemmatizer():
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemma(word: str) -> str:
+    try:
+        return _lemmatizer().lemmatize(word)
+    except LookupError:
+        return word
+
+
+def extract_texts(markdown: str, source_type: str) -> List[str]:
+    """Parse Markdown into individual text segments (comments/tweets/etc.)"""
+    if not markdown:
+        return []
+
+    texts = []
+    paragraphs = []
+    paragraph = []
+    for raw in markdown.split("\n"):
+        line = raw.strip()
+        if not line:
+            if paragraph:
+                paragraphs.append("\n".join(paragraph))
+                paragraph = []
+            continue
+        paragraph.append(line)
+
+        if source_type == "youtube":
+            # YouTube: comments often appear as plain lines or with @author prefixes
+            if 30 < len(line) < 1000 and not line.startswith(("#", "[", ">", "- ", "* ")):
+                # Detect author pattern like "@user: text" or "user - text"
+                match = AUTHOR_RE.match(line)
+                text = match.group(2).strip() if match else line
+                if len(text) > 20:
+                    texts.append(text)
+
+        elif source_type == "twitter":
+            cleaned = line.lstrip("#*-_> ")
+            if 20 < len(cleaned) < 500:
+                texts.append(cleaned)
+
+        else:  # Generic websites
+            cleaned = line.lstrip("#*-_> ")
+            if 30 < len(cleaned) < 1000:
+                texts.append(cleaned)
+    if paragraph:
+        paragraphs.append("\n".join(paragraph))
+
+    # Fallback: use paragraphs if very few texts found
+    if len(texts) < 10:
+        for para in paragraphs:
+            cleaned = HEADING_RE.sub("", para).strip()
+            if 50 < len(cleaned) < 2000:
+                texts.append(cleaned)
+
+    return texts[:MAX_TEXTS]  # Increased limit for better sentiment accuracy
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, lemmatized content words (no URLs, stopwords or words under 3 letters)."""
+    text = NON_ALPHA_RE.sub('', URL_RE.sub('', text)).lower()
+    words = stop_words()
+    # Only letters and whitespace are left, so a plain split matches word_tokenize
+    return [lemma(t) for t in text.split() if len(t) > 2 and t not in words]
+
+
+class TextStats:
+    """Word and phrase counts accumulated in one pass over the texts."""
+
+    def __init__(self):
+        self.words = Counter()
+        self.phrases = Counter()
+        # phrase -> Counter of labels and summed scores of the labelled texts containing it
+        self.phrase_labels = {}
+
+    def add(self, text: str, label: Optional[dict] = None):
+        tokens = tokenize(text)
+        self.words.update(tokens)
+        seen = set()
+        for n in NGRAM_SIZES:
+            for i in range(len(tokens) - n + 1):
+                seen.add(" ".join(tokens[i:i + n]))
+        self.phrases.update(seen)
+        if label is not None:
+            for phrase in seen:
+                stats = self.phrase_labels.setdefault(phrase, Counter())
+                stats[label["label"]] += 1
+                stats[label["label"] + "_score"] += label["score"]
+        if len(self.phrases) > MAX_PHRASES:
+            self._prune()
+
+    def _prune(self):
+        keep = dict(self.phrases.most_common(MAX_PHRASES // 2))
+        self.phrases = Counter(keep)
+        self.phrase_labels = {p: s for p, s in self.phrase_labels.items() if p in keep}
+
+    def top_words(self, top_n: int = 15):
+        return self.words.most_common(top_n)
+
+    def top_phrases(self, top_n: int = 10) -> List[dict]:
+        """Most frequent repeated phrases with the majority sentiment of their texts."""
+        out = []
+        # Longest first among equal counts, so "customer service" is dropped
+        # when it only ever occurs inside "great customer service"
+        ranked = sorted(self.phrases.items(), key=lambda item: (-item[1], -item[0].count(" ")))
+        for phrase, count in ranked:
+            if count < MIN_PHRASE_COUNT or len(out) >= top_n:
+                break
+            if any(p["count"] == count and f" {phrase} " in f" {p['phrase']} " for p in out):
+                continue
+            stats = self.phrase_labels.get(phrase)
+            labels = {k: v for k, v in (stats or {}).items() if not k.endswith("_score")}
+            if labels:
+                label = max(labels, key=labels.get)
+                score = stats[label + "_score"] / labels[label]
+            else:
+                label, score = "neutral", 0.5
+            out.append({"phrase": phrase, "sentiment": label, "score": round(score, 3), "count": count})
+        return out
+
+
+def analyze_texts(texts: List[str], labels: Optional[List[Optional[dict]]] = None) -> TextStats:
+    """Tokenizes every text once; labels[i] is the sentiment of texts[i] (or None)."""
+    stats = TextStats()
+    labels = labels or [None] * len(texts)
+    for text, label in zip(texts, labels):
+        stats.add(text, label)
+    return stats
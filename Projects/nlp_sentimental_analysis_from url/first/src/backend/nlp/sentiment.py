@@ -0,0 +1,149 @@
+"""
+Sentiment scoring with batched transformer inference.
+
+Texts are sorted by length and grouped into batches capped both by count and
+by total characters, so padding stays small and long texts don't blow up a
+batch. Truncation happens in the tokenizer (512 tokens), not by slicing
+characters.
+"""
+
+import os
+from typing import List, Optional
+
+from cache import text_key
+from nlp.models import LEXICON_THRESHOLD, lexicon_model
+
+BATCH_SIZE = int(os.environ.get("SENTIMENT_BATCH_SIZE", 32))
+MAX_BATCH_CHARS = int(os.environ.get("SENTIMENT_MAX_BATCH_CHARS", 16000))
+MAX_TEXTS = int(os.environ.get("SENTIMENT_MAX_TEXTS", 100))
+MIN_TEXT_LENGTH = 10
+
+
+def length_sorted_batches(texts: List[str], batch_size: int = BATCH_SIZE,
+                          max_batch_chars: int = MAX_BATCH_CHARS) -> List[List[int]]:
+    """Groups text indices by similar length, capped by count and total characters."""
+    batches, batch, chars = [], [], 0
+    for i in sorted(range(len(texts)), key=lambda i: len(texts[i])):
+        if batch and (len(batch) >= batch_size or chars + len(texts[i]) > max_batch_chars):
+            batches.append(batch)
+            batch, chars = [], 0
+        batch.append(i)
+        chars += len(texts[i])
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def score_texts(analyzer, texts: List[str], batch_size: int = BATCH_SIZE) -> List[Optional[dict]]:
+    """
+    Returns one {"label", "score"} per text in input order, or None for a
+    text the model failed on.
+    """
+    results: List[Optional[dict]] = [None] * len(texts)
+    for batch in length_sorted_batches(texts, batch_size):
+        batch_texts = [texts[i] for i in batch]
+        try:
+            outputs = analyzer(batch_texts, batch_size=len(batch_texts), truncation=True, max_length=512)
+        except Exception as e:
+            # Retry one by one so a single bad text doesn't sink the whole batch
+            print(f"Sentiment batch of {len(batch)} failed ({e}), retrying individually")
+            outputs = []
+            for text in batch_texts:
+                try:
+                    outputs.append(analyzer(text, truncation=True, max_length=512)[0])
+                except Exception as e:
+                    print(f"Sentiment scoring failed for one text: {e}")
+                    outputs.append(None)
+        for i, output in zip(batch, outputs):
+            results[i] = output
+    return results
+
+
+def score_texts_cached(analyzer, texts: List[str], cache=None) -> List[Optional[dict]]:
+    """
+    score_texts() that only runs the model on texts missing from `cache`
+    (a cache.SqliteLRU keyed by the normalised text). Duplicates within the
+    list are scored once.
+    """
+    if cache is None:
+        return score_texts(analyzer, texts)
+    keys = [text_key(text, analyzer.name) for text in texts]
+    found = cache.get_many(keys)
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = text
+    if missing:
+        scored = score_texts(analyzer, list(missing.values()))
+        new = {key: result for key, result in zip(missing, scored) if result is not None}
+        cache.put_many(new)
+        found.update(new)
+    return [found.get(key) for key in keys]
+
+
+def analyze_sentiment(analyzer, texts: List[str], score_all: bool = False, cache=None) -> dict:
+    """
+    Aggregate sentiment of texts. Besides the summary fields, "labels" holds
+    one {"label", "score"} per input text (None where it wasn't scored).
+    """
+    if not texts:
+        return {
+            "sentiment": "neutral",
+            "confidence": 0.0,
+            "distribution": {"positive": 33, "negative": 33, "neutral": 34},
+            "scores": [],
+            "labels": []
+        }
+
+    limit = len(texts) if score_all else min(len(texts), MAX_TEXTS)
+    indices = [i for i in range(limit) if len(texts[i]) >= MIN_TEXT_LENGTH]
+    candidates = [texts[i] for i in indices]
+    labels: List[Optional[dict]] = [None] * len(texts)
+
+    positive_count = negative_count = neutral_count = 0
+    all_scores = []
+
+    if analyzer is None or (LEXICON_THRESHOLD and len(candidates) > LEXICON_THRESHOLD):
+        # Word-list fallback: no model loaded, or too many texts to run it on
+        results = lexicon_model(candidates)
+    else:
+        results = score_texts_cached(analyzer, candidates, cache)
+
+    for i, text, result in zip(indices, candidates, results):
+        if result is None:
+            neutral_count += 1
+            continue
+        label = result['label'].lower()
+        labels[i] = {"label": label, "score": result['score']}
+        if label == 'positive':
+            positive_count += 1
+        elif label == 'negative':
+            negative_count += 1
+        else:
+            neutral_count += 1
+        all_scores.append({"text": text[:100], "label": label, "score": result['score']})
+
+    total = positive_count + negative_count + neutral_count or 1
+    distribution = {
+        "positive": round(positive_count / total * 100),
+        "negative": round(negative_count / total * 100),
+        "neutral": round(neutral_count / total * 100)
+    }
+
+    if positive_count >= negative_count and positive_count >= neutral_count:
+        sentiment = "positive"
+        confidence = positive_count / total * 100
+    elif negative_count >= positive_count and negative_count >= neutral_count:
+        sentiment = "negative"
+        confidence = negative_count / total * 100
+    else:
+        sentiment = "neutral"
+        confidence = neutral_count / total * 100
+
+    return {
+        "sentiment": sentiment,
+        "confidence": round(confidence, 2),
+        "distribution": distribution,
+        "scores": all_scores,
+        "labels": labels
+    }
@@ -0,0 +1,96 @@
+"""
+Async page fetchers.
+
+All fetchers share one pooled aiohttp session and limit how many requests
+run at once against the same target host. The default fetcher goes through
+the Jina Reader API; point JINA_BASE_URL at a local stub server to test
+without network access, or set SENTIMENT_FETCHER=module:Class to plug in a
+different Fetcher subclass.
+"""
+
+import asyncio
+import importlib
+import os
+from urllib.parse import urlsplit
+
+import aiohttp
+
+JINA_BASE_URL = os.environ.get("JINA_BASE_URL", "https://r.jina.ai/")
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", 30))
+MAX_CONNECTIONS = int(os.environ.get("FETCH_MAX_CONNECTIONS", 32))
+PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", 4))
+
+
+class Fetcher:
+    """Base class: turns a URL into markdown text, or "" if it can't."""
+
+    def __init__(self, timeout=FETCH_TIMEOUT, max_connections=MAX_CONNECTIONS, per_host_limit=PER_HOST_LIMIT):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.per_host_limit = per_host_limit
+        self.session = None
+        self._host_limits = {}
+
+    async def start(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def host_limit(self, url: str) -> asyncio.Semaphore:
+        """One semaphore per target host, so a slow site can't take every connection."""
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._host_limits[host]
+
+    async def fetch(self, url: str) -> str:
+        await self.start()
+        async with self.host_limit(url):
+            try:
+                return await self._fetch(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"Fetch error for {url}: {e}")
+                return ""
+
+    async def _fetch(self, url: str) -> str:
+        raise NotImplementedError
+
+
+class JinaFetcher(Fetcher):
+    """Fetch clean Markdown content using free Jina Reader API."""
+
+    def __init__(self, base_url=JINA_BASE_URL, **kwargs):
+        super().__init__(**kwargs)
+        self.base_url = base_url.rstrip("/") + "/"
+
+    async def _fetch(self, url: str) -> str:
+        headers = {
+            "Accept": "application/json",
+            "X-Return-Format": "markdown"
+        }
+        async with self.session.get(f"{self.base_url}{url}", headers=headers) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        if not isinstance(data, dict):
+            return ""
+        inner = data.get("data")
+        content = (inner.get("content") if isinstance(inner, dict) else None) or data.get("content")
+        # {"data": null}, lists, bare strings: no readable content, as with a failed fetch
+        return content if isinstance(content, str) else ""
+
+
+def create_fetcher() -> Fetcher:
+    """Builds the fetcher named by SENTIMENT_FETCHER ("jina" or "module:Class")."""
+    name = os.environ.get("SENTIMENT_FETCHER", "jina")
+    if name == "jina":
+        return JinaFetcher()
+    module, _, cls = name.partition(":")
+    return getattr(importlib.import_module(module), cls)()
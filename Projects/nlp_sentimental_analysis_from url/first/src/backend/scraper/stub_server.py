@@ -0,0 +1,39 @@
+"""
+Local stand-in for the Jina Reader API.
+
+Answers GET /<any url> with {"data": {"content": ...}} built from a markdown
+file, so the backend can run without network access:
+
+    python scraper/stub_server.py page.md --port 9000
+    JINA_BASE_URL=http://127.0.0.1:9000/ uvicorn main:app
+"""
+
+import argparse
+import http.server
+import json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("markdown", help="Markdown file returned for every URL")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    args = parser.parse_args()
+
+    with open(args.markdown, encoding="utf-8") as f:
+        body = json.dumps({"data": {"content": f.read()}}).encode("utf-8")
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    print(f"Serving {args.markdown} at http://{args.host}:{args.port}/")
+    http.server.ThreadingHTTPServer((args.host, args.port), Handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,128 @@
-from flask import Flask, render_template, request, send_from_directory, url_for
+from flask import Flask, Response, render_template, request, send_file, send_from_directory, url_for
+from PIL import Image
+import base64
+import io
 import os
-import subprocess
-import shutil
+import uuid
+
+from inference import TryOnService
+from results_io import ResultWriter, encode
+from tryon import QUALITY_TIERS
 
 app = Flask(__name__)
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 IMAGE_DIR = os.path.join(BASE_DIR, "datasets", "test", "image")
-CLOTH_DIR = os.path.join(BASE_DIR, "datasets", "test", "cloth")
-PAIRS_TXT = os.path.join(BASE_DIR, "datasets", "test_pairs.txt")
-RESULTS_DIR = os.path.join(BASE_DIR, "results", "viton_hd")
+# One cloth/result pair per request, so concurrent users never overwrite each other
+OUTPUT_DIR = os.path.join(BASE_DIR, "results", "web")
+
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-os.makedirs(RESULTS_DIR, exist_ok=True)
+# Garments one /api/tryon/batch request may compare
+MAX_BATCH_CLOTHS = 16
+
+# Loaded once at startup; requests only pay for preprocessing and inference
+service = TryOnService()
+# Encodes the results of batch requests in parallel
+encoder = ResultWriter()
 
 @app.route('/model_images/<filename>')
 def model_images(filename):
     return send_from_directory(IMAGE_DIR, filename)
 
-@app.route('/cloth_uploaded')
-def cloth_uploaded():
-    return send_from_directory(CLOTH_DIR, "cloth.jpg")
-
-@app.route('/result_image')
-def result_image():
-    return send_from_directory(RESULTS_DIR, "final_result.jpg")
+@app.route('/outputs/<filename>')
+def outputs(filename):
+    return send_from_directory(OUTPUT_DIR, filename)
+
+def log_timings(selected_model, timings):
+    print(f"Try-on {selected_model}: " + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in timings.items()))
+
+def is_model(selected_model):
+    """Only plain names of photos in IMAGE_DIR, nothing that walks out of it."""
+    return (selected_model == os.path.basename(selected_model) and selected_model.endswith(".jpg")
+            and os.path.isfile(os.path.join(IMAGE_DIR, selected_model)))
+
+def read_cloth(cloth_file):
+    """The uploaded bytes, or None if PIL cannot decode them as an image."""
+    data = cloth_file.read()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+    return data
+
+def run_try_on(selected_model, cloth, quality="final"):
+    result, cloth, timings = service.try_on(selected_model, cloth, quality)
+    log_timings(selected_model, timings)
+    return result, cloth
+
+def progressive_stream(selected_model, cloth):
+    """multipart/x-mixed-replace parts: an <img> shows the preview, then swaps in the final image."""
+    timings = {}
+    for _, result, timings in service.try_on_progressive(selected_model, cloth):
+        data = encode(result)
+        yield (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: " + str(len(data)).encode() +
+               b"\r\n\r\n" + data + b"\r\n")
+    log_timings(selected_model, timings)
+    yield b"--frame--\r\n"
+
+@app.route("/api/tryon", methods=["POST"])
+def api_try_on():
+    """
+    Returns the result JPEG directly, nothing is written to disk. The optional
+    'quality' field picks 'final' (default), 'preview' (half resolution) or
+    'progressive', which streams the preview and then the final image.
+    """
+    selected_model = request.form.get("model")
+    cloth_file = request.files.get("cloth")
+    quality = request.form.get("quality", "final")
+    if not selected_model or not cloth_file:
+        return {"error": "'model' and 'cloth' are required"}, 400
+    if quality not in QUALITY_TIERS:
+        return {"error": f"'quality' must be one of {', '.join(QUALITY_TIERS)}"}, 400
+    if not is_model(selected_model):
+        return {"error": f"unknown model '{selected_model}'"}, 404
+    cloth = read_cloth(cloth_file)
+    if cloth is None:
+        return {"error": "'cloth' is not a readable image"}, 400
+
+    if quality == "progressive":
+        return Response(progressive_stream(selected_model, cloth),
+                        mimetype="multipart/x-mixed-replace; boundary=frame")
+
+    result, _ = run_try_on(selected_model, cloth, quality)
+    return send_file(io.BytesIO(encode(result)), mimetype="image/jpeg")
+
+@app.route("/api/tryon/batch", methods=["POST"])
+def api_try_on_batch():
+    """
+    One model and several 'cloth' uploads, run as a single batch. Returns the
+    results as base64 JPEGs in upload order, with the per-stage timings and
+    the amortised latency per garment.
+    """
+    selected_model = request.form.get("model")
+    cloth_files = request.files.getlist("cloth")
+    quality = request.form.get("quality", "final")
+    if not selected_model or not cloth_files:
+        return {"error": "'model' and at least one 'cloth' are required"}, 400
+    if len(cloth_files) > MAX_BATCH_CLOTHS:
+        return {"error": f"at most {MAX_BATCH_CLOTHS} cloths per request"}, 400
+    if quality not in ("preview", "final"):
+        return {"error": "'quality' must be 'preview' or 'final'"}, 400
+    if not is_model(selected_model):
+        return {"error": f"unknown model '{selected_model}'"}, 404
+    cloths = [read_cloth(f) for f in cloth_files]
+    unreadable = [f.filename for f, cloth in zip(cloth_files, cloths) if cloth is None]
+    if unreadable:
+        return {"error": f"not readable images: {', '.join(unreadable)}"}, 400
+
+    results, _, timings = service.try_on_many(selected_model, cloths, quality)
+    log_timings(selected_model, timings)
+    return {
+        "results": [base64.b64encode(data).decode("ascii") for data in encoder.encode(results)],
+        "timings_ms": {name: round(seconds * 1000, 1) for name, seconds in timings.items()},
+    }
 
 @app.route("/", methods=["GET", "POST"])
 def index():
@@ -35,35 +134,17 @@ def index():
         selected_model = request.form.get("model")
         cloth_file = request.files["cloth"]
 
-        if selected_model and cloth_file:
-            cloth_path = os.path.join(CLOTH_DIR, "cloth.jpg")
-            cloth_file.save(cloth_path)
-            cloth_preview = url_for("cloth_uploaded")
-
-            with open(PAIRS_TXT, "w") as f:
-                f.write(f"{selected_model} cloth.jpg\n")
-
+        if selected_model and cloth_file and is_model(selected_model):
+            request_id = uuid.uuid4().hex
             try:
-                subprocess.run(
-                    ["python", "test.py", "--name", "viton_hd"],
-                    check=True,
-                    cwd=BASE_DIR
-                )
-
-                # === Find actual output file ===
-                actual_output = None
-                for root, dirs, files in os.walk(RESULTS_DIR):
-                    for file in files:
-                        if file.endswith(".jpg") or file.endswith(".png"):
-                            actual_output = os.path.join(root, file)
-
-                if actual_output:
-                    final_output = os.path.join(RESULTS_DIR, "final_result.jpg")
-                    shutil.copy(actual_output, final_output)
-                    result_url = url_for("result_image")
-
-            except subprocess.CalledProcessError as e:
-                print(f"Error running test.py: {e}")
+                result, cloth = run_try_on(selected_model, cloth_file.read())
+                cloth.save(os.path.join(OUTPUT_DIR, f"{request_id}_cloth.jpg"), "JPEG")
+                result.save(os.path.join(OUTPUT_DIR, f"{request_id}_result.jpg"), "JPEG")
+                cloth_preview = url_for("outputs", filename=f"{request_id}_cloth.jpg")
+                result_url = url_for("outputs", filename=f"{request_id}_result.jpg")
+
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Error running try-on: {e}")
 
     return render_template(
         "index.html",
@@ -73,4 +154,5 @@ def index():
     )
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    # The reloader would start a second process and load the models twice
+    app.run(debug=True, use_reloader=False)
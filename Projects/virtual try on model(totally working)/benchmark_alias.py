@@ -0,0 +1,77 @@
+"""
+CPU latency of the ALIAS generator per quality tier and fast path.
+
+Times the 512x384 preview and the 1024x768 final tier with each of the
+TryOnPipeline options (channels_last, bf16 autocast, TorchScript trace,
+torch.compile) on random conditioning maps. Uses the trained weights when
+checkpoints/alias_final.pth exists, random ones otherwise (same cost).
+
+    python benchmark_alias.py --repeat 3
+"""
+import argparse
+import copy
+import os
+import time
+
+import torch
+
+from networks import ALIASGenerator
+from test import get_opt
+from tryon import TryOnPipeline, fold_spectral_norm
+from utils import load_checkpoint
+
+VARIANTS = {
+    'eager': {},
+    'channels_last': {'channels_last': True},
+    'bf16': {'bf16': True},
+    'channels_last+bf16': {'channels_last': True, 'bf16': True},
+    'trace': {'alias_compile': 'trace'},
+    'compile': {'alias_compile': 'compile'},
+}
+
+
+def random_inputs(batch_size, height, width):
+    parse = torch.zeros(batch_size, 7, height, width)
+    parse.scatter_(1, torch.randint(0, 7, (batch_size, 1, height, width)), 1.0)
+    misalign_mask = (torch.rand(batch_size, 1, height, width) > 0.95).float()
+    parse_div = torch.cat((parse, misalign_mask), dim=1)
+    x = torch.rand(batch_size, 9, height, width) * 2 - 1
+    return x, parse, parse_div, misalign_mask
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS))
+    args = parser.parse_args()
+
+    base_opt = get_opt()
+    base_opt.semantic_nc = 7
+    alias = ALIASGenerator(base_opt, input_nc=9)
+    checkpoint = os.path.join(base_opt.checkpoint_dir, base_opt.alias_checkpoint)
+    if os.path.exists(checkpoint):
+        load_checkpoint(alias, checkpoint)
+    fold_spectral_norm(alias.eval())
+    inputs = random_inputs(args.batch_size, base_opt.load_height, base_opt.load_width)
+
+    print(f"{'variant':<20} {'preview ms':>11} {'final ms':>9}")
+    for name in args.variants:
+        opt = copy.copy(base_opt)
+        for key, value in VARIANTS[name].items():
+            setattr(opt, key, value)
+        pipeline = TryOnPipeline(opt, None, None, copy.deepcopy(alias))
+
+        row = []
+        for quality in ('preview', 'final'):
+            with pipeline.grad_mode():
+                pipeline.generate(inputs, quality)  # warm-up (and trace / compile)
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    pipeline.generate(inputs, quality)
+            row.append((time.perf_counter() - start) / args.repeat * 1000)
+        print(f"{name:<20} {row[0]:>11.0f} {row[1]:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+CPU benchmark of the parse-map one-hot construction at full resolution.
+
+Compares the previous per-channel loops against the single-scatter versions
+used by VITONDataset.load_person (20 LIP labels -> 13 channels) and
+TryOnPipeline (13 predicted labels -> 7 ALIAS channels), and checks that
+both give identical maps.
+
+    python benchmark_parse.py --batch_size 4 --repeat 20
+"""
+import argparse
+import time
+
+import torch
+
+from datasets import PARSE_LABELS, PARSE_REMAP
+from tryon import MERGE_LABELS
+from utils import label_remap
+
+
+def loop_dataset(parse_agnostic, height, width):
+    parse_agnostic_map = torch.zeros(20, height, width, dtype=torch.float)
+    parse_agnostic_map.scatter_(0, parse_agnostic, 1.0)
+    new_parse_agnostic_map = torch.zeros(13, height, width, dtype=torch.float)
+    for i in range(len(PARSE_LABELS)):
+        for label in PARSE_LABELS[i][1]:
+            new_parse_agnostic_map[i] += parse_agnostic_map[label]
+    return new_parse_agnostic_map
+
+
+def fast_dataset(parse_agnostic, height, width):
+    new_parse_agnostic_map = torch.zeros(13, height, width, dtype=torch.float)
+    return new_parse_agnostic_map.scatter_(0, PARSE_REMAP[parse_agnostic], 1.0)
+
+
+def loop_pipeline(parse_pred, height, width):
+    parse_old = torch.zeros(parse_pred.size(0), 13, height, width)
+    parse_old.scatter_(1, parse_pred, 1.0)
+    parse = torch.zeros(parse_pred.size(0), 7, height, width)
+    for idx, channels in MERGE_LABELS.items():
+        for ch in channels:
+            parse[:, idx] += parse_old[:, ch]
+    return parse
+
+
+def make_fast_pipeline(batch_size, height, width):
+    merge_index = label_remap(MERGE_LABELS, 13)
+    buffer = torch.empty(batch_size, 7, height, width)
+
+    def fast_pipeline(parse_pred, height, width):
+        return buffer.zero_().scatter_(1, merge_index[parse_pred], 1.0)
+    return fast_pipeline
+
+
+def bench(fn, arg, height, width, repeat):
+    fn(arg, height, width)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(arg, height, width)
+    return (time.perf_counter() - start) / repeat * 1000, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--load_height', type=int, default=1024)
+    parser.add_argument('--load_width', type=int, default=768)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+    h, w = args.load_height, args.load_width
+
+    parse_agnostic = torch.randint(0, 20, (1, h, w))
+    parse_pred = torch.randint(0, 13, (args.batch_size, 1, h, w))
+
+    cases = [
+        ('dataset 20->13', loop_dataset, fast_dataset, parse_agnostic),
+        (f'pipeline 13->7 (B={args.batch_size})', loop_pipeline,
+         make_fast_pipeline(args.batch_size, h, w), parse_pred),
+    ]
+    print(f"{'case':<24} {'loops ms':>9} {'scatter ms':>11} {'speed-up':>9}")
+    for name, slow, fast, arg in cases:
+        slow_ms, expected = bench(slow, arg, h, w, args.repeat)
+        fast_ms, actual = bench(fast, arg, h, w, args.repeat)
+        assert torch.equal(expected, actual), f"{name}: outputs differ"
+        print(f"{name:<24} {slow_ms:>9.2f} {fast_ms:>11.2f} {slow_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Parity and CPU latency/memory of the cached-basis TpsGridGen against the
+previous implementation, which rebuilt the radial basis over the full
+H x W x N grid and repeated [B, H, W, 1, N] weight tensors on every call.
+
+    python benchmark_tps.py --batch_size 4
+"""
+import argparse
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from networks import TpsGridGen
+
+
+def legacy_forward(tps, theta, height, width):
+    """The former TpsGridGen.forward / apply_transformation, kept for comparison."""
+    grid_X, grid_Y = np.meshgrid(np.linspace(-0.9, 0.9, width), np.linspace(-0.9, 0.9, height))
+    grid_X = torch.tensor(grid_X, dtype=torch.float).unsqueeze(0).unsqueeze(3)
+    grid_Y = torch.tensor(grid_Y, dtype=torch.float).unsqueeze(0).unsqueeze(3)
+    points = torch.cat((grid_X, grid_Y), 3)
+    N = tps.N
+    P_X = tps.P_X_base.unsqueeze(2).unsqueeze(3).unsqueeze(4).transpose(0, 4)
+    P_Y = tps.P_Y_base.unsqueeze(2).unsqueeze(3).unsqueeze(4).transpose(0, 4)
+    Li = tps.Li.unsqueeze(0)
+
+    theta = theta.unsqueeze(2).unsqueeze(3)
+    batch_size = theta.size()[0]
+    Q_X = theta[:, :N, :, :].squeeze(3) + tps.P_X_base
+    Q_Y = theta[:, N:, :, :].squeeze(3) + tps.P_Y_base
+    points_h, points_w = points.size()[1], points.size()[2]
+    P_X = P_X.expand((1, points_h, points_w, 1, N))
+    P_Y = P_Y.expand((1, points_h, points_w, 1, N))
+
+    W_X = torch.bmm(Li[:, :N, :N].expand((batch_size, N, N)), Q_X)
+    W_Y = torch.bmm(Li[:, :N, :N].expand((batch_size, N, N)), Q_Y)
+    W_X = W_X.unsqueeze(3).unsqueeze(4).transpose(1, 4).repeat(1, points_h, points_w, 1, 1)
+    W_Y = W_Y.unsqueeze(3).unsqueeze(4).transpose(1, 4).repeat(1, points_h, points_w, 1, 1)
+    A_X = torch.bmm(Li[:, N:, :N].expand((batch_size, 3, N)), Q_X)
+    A_Y = torch.bmm(Li[:, N:, :N].expand((batch_size, 3, N)), Q_Y)
+    A_X = A_X.unsqueeze(3).unsqueeze(4).transpose(1, 4).repeat(1, points_h, points_w, 1, 1)
+    A_Y = A_Y.unsqueeze(3).unsqueeze(4).transpose(1, 4).repeat(1, points_h, points_w, 1, 1)
+
+    points_X_for_summation = points[:, :, :, 0].unsqueeze(3).unsqueeze(4).expand(points[:, :, :, 0].size() + (1, N))
+    points_Y_for_summation = points[:, :, :, 1].unsqueeze(3).unsqueeze(4).expand(points[:, :, :, 1].size() + (1, N))
+    dist_squared = torch.pow(points_X_for_summation - P_X, 2) + torch.pow(points_Y_for_summation - P_Y, 2)
+    dist_squared[dist_squared == 0] = 1
+    U = torch.mul(dist_squared, torch.log(dist_squared))
+
+    points_X_batch = points[:, :, :, 0].unsqueeze(3).expand((batch_size, points_h, points_w, 1))
+    points_Y_batch = points[:, :, :, 1].unsqueeze(3).expand((batch_size, points_h, points_w, 1))
+    points_X_prime = A_X[:, :, :, :, 0] + torch.mul(A_X[:, :, :, :, 1], points_X_batch) + \
+        torch.mul(A_X[:, :, :, :, 2], points_Y_batch) + torch.sum(torch.mul(W_X, U.expand_as(W_X)), 4)
+    points_Y_prime = A_Y[:, :, :, :, 0] + torch.mul(A_Y[:, :, :, :, 1], points_X_batch) + \
+        torch.mul(A_Y[:, :, :, :, 2], points_Y_batch) + torch.sum(torch.mul(W_Y, U.expand_as(W_Y)), 4)
+    return torch.cat((points_X_prime, points_Y_prime), 3)
+
+
+def measure(fn, repeat):
+    """Mean seconds per call and MB allocated during one call."""
+    fn()  # warm-up
+    with torch.autograd.profiler.profile(profile_memory=True) as prof:
+        fn()
+    allocated = sum(e.cpu_memory_usage for e in prof.function_events if e.cpu_memory_usage > 0)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat, allocated / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--load_height', type=int, default=1024)
+    parser.add_argument('--load_width', type=int, default=768)
+    parser.add_argument('--grid_size', type=int, default=5)
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    opt = SimpleNamespace(load_height=args.load_height, load_width=args.load_width, grid_size=args.grid_size)
+    start = time.perf_counter()
+    tps = TpsGridGen(opt)
+    print(f"TpsGridGen init (basis precompute): {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"basis {tps.basis.numel() * 4 / 2 ** 20:.1f} MB")
+
+    theta = torch.tanh(torch.randn(args.batch_size, 2 * tps.N)) * 0.1
+    with torch.no_grad():
+        expected = legacy_forward(tps, theta, args.load_height, args.load_width)
+        actual = tps(theta)
+        print(f"max |new - legacy| = {(actual - expected).abs().max().item():.2e}")
+
+        legacy_s, legacy_mb = measure(lambda: legacy_forward(tps, theta, args.load_height, args.load_width), args.repeat)
+        new_s, new_mb = measure(lambda: tps(theta), args.repeat)
+    print(f"{'':<8} {'ms':>9} {'alloc MB':>9}")
+    print(f"{'legacy':<8} {legacy_s * 1000:>9.1f} {legacy_mb:>9.1f}")
+    print(f"{'cached':<8} {new_s * 1000:>9.1f} {new_mb:>9.1f}")
+    print(f"speed-up {legacy_s / new_s:.1f}x, memory {legacy_mb / max(new_mb, 1e-9):.1f}x less")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,26 @@ import torch
 from torch.utils import data
 from torchvision import transforms
 
+from utils import label_remap
+
+# 13 semantic channels of the agnostic parse map, from the 20 LIP parsing labels
+PARSE_LABELS = {
+    0: ['background', [0, 10]],
+    1: ['hair', [1, 2]],
+    2: ['face', [4, 13]],
+    3: ['upper', [5, 6, 7]],
+    4: ['bottom', [9, 12]],
+    5: ['left_arm', [14]],
+    6: ['right_arm', [15]],
+    7: ['left_leg', [16]],
+    8: ['right_leg', [17]],
+    9: ['left_shoe', [18]],
+    10: ['right_shoe', [19]],
+    11: ['socks', [8]],
+    12: ['noise', [3, 11]]
+}
+PARSE_REMAP = label_remap({channel: ids for channel, (_, ids) in PARSE_LABELS.items()}, 20)
+
 
 class VITONDataset(data.Dataset):
     def __init__(self, opt):
@@ -20,14 +40,15 @@ class VITONDataset(data.Dataset):
             transforms.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5))
         ])
 
-        # load data list
+        # load data list (none when the dataset only serves load_person/load_cloth)
         img_names = []
         c_names = []
-        with open(osp.join(opt.dataset_dir, opt.dataset_list), 'r') as f:
-            for line in f.readlines():
-                img_name, c_name = line.strip().split()
-                img_names.append(img_name)
-                c_names.append(c_name)
+        if opt.dataset_list:
+            with open(osp.join(opt.dataset_dir, opt.dataset_list), 'r') as f:
+                for line in f.readlines():
+                    img_name, c_name = line.strip().split()
+                    img_names.append(img_name)
+                    c_names.append(c_name)
 
         self.img_names = img_names
         self.c_names = dict()
@@ -115,24 +136,20 @@ class VITONDataset(data.Dataset):
 
         return agnostic
 
-    def __getitem__(self, index):
-        img_name = self.img_names[index]
-        c_name = {}
-        c = {}
-        cm = {}
-        for key in self.c_names:
-            c_name[key] = self.c_names[key][index]
-            c[key] = Image.open(osp.join(self.data_path, 'cloth', c_name[key])).convert('RGB')
-            c[key] = transforms.Resize(self.load_width, interpolation=2)(c[key])
-            cm[key] = Image.open(osp.join(self.data_path, 'cloth-mask', c_name[key]))
-            cm[key] = transforms.Resize(self.load_width, interpolation=0)(cm[key])
+    def load_cloth(self, c, cm):
+        """Cloth image and mask (PIL) -> tensors in [-1, 1] and {0, 1}."""
+        c = transforms.Resize(self.load_width, interpolation=2)(c.convert('RGB'))
+        cm = transforms.Resize(self.load_width, interpolation=0)(cm)
 
-            c[key] = self.transform(c[key])  # [-1,1]
-            cm_array = np.array(cm[key])
-            cm_array = (cm_array >= 128).astype(np.float32)
-            cm[key] = torch.from_numpy(cm_array)  # [0,1]
-            cm[key].unsqueeze_(0)
+        c = self.transform(c)  # [-1,1]
+        cm_array = np.array(cm)
+        cm_array = (cm_array >= 128).astype(np.float32)
+        cm = torch.from_numpy(cm_array)  # [0,1]
+        cm.unsqueeze_(0)
+        return c, cm
 
+    def load_person(self, img_name):
+        """Person-side inputs of img_name: they don't depend on the cloth."""
         # load pose image
         pose_name = img_name.replace('.jpg', '_rendered.png')
         pose_rgb = Image.open(osp.join(self.data_path, 'openpose-img', pose_name))
@@ -153,30 +170,10 @@ class VITONDataset(data.Dataset):
         parse_agnostic = self.get_parse_agnostic(parse, pose_data)
         parse_agnostic = torch.from_numpy(np.array(parse_agnostic)[None]).long()
 
-        labels = {
-            0: ['background', [0, 10]],
-            1: ['hair', [1, 2]],
-            2: ['face', [4, 13]],
-            3: ['upper', [5, 6, 7]],
-            4: ['bottom', [9, 12]],
-            5: ['left_arm', [14]],
-            6: ['right_arm', [15]],
-            7: ['left_leg', [16]],
-            8: ['right_leg', [17]],
-            9: ['left_shoe', [18]],
-            10: ['right_shoe', [19]],
-            11: ['socks', [8]],
-            12: ['noise', [3, 11]]
-        }
-        parse_agnostic_map = torch.zeros(20, self.load_height, self.load_width, dtype=torch.float)
-        print(f"🛑 Checking image: {img_name}")
-        print(f"📊 Unique values in parse_agnostic: {torch.unique(parse_agnostic)}")
-
-        parse_agnostic_map.scatter_(0, parse_agnostic, 1.0)
+        # One-hot of the 13 merged channels in one scatter (the groups partition the 20 labels).
+        # Not a reused buffer: the map is handed to the caller/DataLoader.
         new_parse_agnostic_map = torch.zeros(self.semantic_nc, self.load_height, self.load_width, dtype=torch.float)
-        for i in range(len(labels)):
-            for label in labels[i][1]:
-                new_parse_agnostic_map[i] += parse_agnostic_map[label]
+        new_parse_agnostic_map.scatter_(0, PARSE_REMAP[parse_agnostic], 1.0)
 
         # load person image
         img = Image.open(osp.join(self.data_path, 'image', img_name))
@@ -185,16 +182,32 @@ class VITONDataset(data.Dataset):
         img = self.transform(img)
         img_agnostic = self.transform(img_agnostic)  # [-1,1]
 
-        result = {
-            'img_name': img_name,
-            'c_name': c_name,
+        return {
             'img': img,
             'img_agnostic': img_agnostic,
             'parse_agnostic': new_parse_agnostic_map,
             'pose': pose_rgb,
+        }
+
+    def __getitem__(self, index):
+        img_name = self.img_names[index]
+        c_name = {}
+        c = {}
+        cm = {}
+        for key in self.c_names:
+            c_name[key] = self.c_names[key][index]
+            c[key], cm[key] = self.load_cloth(
+                Image.open(osp.join(self.data_path, 'cloth', c_name[key])),
+                Image.open(osp.join(self.data_path, 'cloth-mask', c_name[key]))
+            )
+
+        result = {
+            'img_name': img_name,
+            'c_name': c_name,
             'cloth': c,
             'cloth_mask': cm,
         }
+        result.update(self.load_person(img_name))
         return result
 
     def __len__(self):
@@ -0,0 +1,134 @@
+import os
+import queue
+import threading
+import time
+
+import torch
+
+from datasets import VITONDataset
+from person_cache import PersonCache
+from preprocessing.mask_cloth import ClothIngest
+from test import get_opt
+from tryon import TryOnPipeline
+from results_io import to_images
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+
+class TryOnService:
+    """
+    Long-lived try-on model: the three networks are loaded once, in eval mode,
+    and every request runs in memory on a (person name, cloth image) pair.
+    Requests are serialised with a lock, since torch already uses every core
+    for one forward pass.
+    """
+    def __init__(self, opt=None, device='cpu'):
+        opt = opt or get_opt()
+        opt.dataset_dir = os.path.join(BASE_DIR, opt.dataset_dir)
+        opt.checkpoint_dir = os.path.join(BASE_DIR, opt.checkpoint_dir)
+        opt.person_cache_dir = os.path.join(BASE_DIR, opt.person_cache_dir)
+        opt.dataset_list = None
+        self.opt = opt
+
+        start = time.perf_counter()
+        self.dataset = VITONDataset(opt)
+        self.person_cache = PersonCache(self.dataset, opt.person_cache_dir)
+        self.cloth_ingest = ClothIngest()
+        self.pipeline = TryOnPipeline.from_checkpoints(opt, device)
+        self.lock = threading.Lock()
+        print(f"[TryOnService] models loaded in {time.perf_counter() - start:.1f}s")
+
+    def _ingest(self, cloth, timings):
+        start = time.perf_counter()
+        cloth_img, cloth_mask = self.cloth_ingest.ingest_bytes(cloth)
+        timings['cloth_mask'] = time.perf_counter() - start
+        return cloth_img, cloth_mask
+
+    def _inputs(self, img_name, cloths, timings):
+        """
+        The person tensors (batch size 1) and the [K, C, H, W] tensors of K
+        (cloth, mask) pairs; call with the lock held.
+        """
+        start = time.perf_counter()
+        # Person inputs come precomputed from the cache; only the cloths are prepared here
+        person = self.pipeline.prepare_person(**self.person_cache.get(img_name))
+        c, cm = zip(*(self.dataset.load_cloth(cloth_img, cloth_mask) for cloth_img, cloth_mask in cloths))
+        timings['preprocess'] = time.perf_counter() - start
+        return person, torch.stack(c), torch.stack(cm)
+
+    def try_on(self, img_name, cloth, quality='final'):
+        """
+        img_name - a person image in datasets/test/image
+        cloth    - encoded image bytes of the garment (any background)
+        quality  - 'final' (load_height x load_width) or 'preview'
+        Returns (result, cleaned cloth, timings) with PIL images and seconds per stage.
+        """
+        timings = {}
+        cloth_img, cloth_mask = self._ingest(cloth, timings)
+        with self.lock:
+            person, c, cm = self._inputs(img_name, [(cloth_img, cloth_mask)], timings)
+            start = time.perf_counter()
+            output = self.pipeline(person, c, cm, quality)
+            timings['inference'] = time.perf_counter() - start
+
+        return to_images(output)[0], cloth_img, timings
+
+    def try_on_progressive(self, img_name, cloth):
+        """
+        Like try_on, but yields (quality, result, timings) twice: the preview
+        as soon as it is ready, then the final image. Segmentation and warping
+        run once for both.
+
+        Both tiers are computed on a worker thread that holds the lock, so
+        the lock is never held while the caller sends a tier to a (possibly
+        slow) client, and the final tier keeps computing meanwhile.
+        """
+        timings = {}
+        cloth_img, cloth_mask = self._ingest(cloth, timings)
+        tiers = queue.Queue()
+
+        def run():
+            try:
+                with self.lock:
+                    person, c, cm = self._inputs(img_name, [(cloth_img, cloth_mask)], timings)
+                    start = time.perf_counter()
+                    for quality, output in self.pipeline.progressive(person, c, cm):
+                        timings[quality] = time.perf_counter() - start
+                        tiers.put((quality, to_images(output)[0], dict(timings)))
+            except Exception as e:
+                tiers.put(e)
+            finally:
+                tiers.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
+        while True:
+            tier = tiers.get()
+            if tier is None:
+                return
+            if isinstance(tier, Exception):
+                raise tier
+            yield tier
+
+    def try_on_many(self, img_name, cloths, quality='final'):
+        """
+        One person and K garments (encoded image bytes) in one batched run:
+        the person inputs are loaded once and broadcast, and the batch is
+        split into chunks of opt.cloth_batch_size to bound memory.
+        Returns (results, cleaned cloths, timings); timings['per_garment'] is
+        the total time divided by K.
+        """
+        if not cloths:
+            raise ValueError("try_on_many needs at least one cloth")
+        start = time.perf_counter()
+        masked = [self.cloth_ingest.ingest_bytes(cloth) for cloth in cloths]
+        timings = {'cloth_mask': time.perf_counter() - start}
+        with self.lock:
+            person, c, cm = self._inputs(img_name, masked, timings)
+            start = time.perf_counter()
+            step = self.opt.cloth_batch_size
+            outputs = torch.cat([self.pipeline(person, c[i:i + step], cm[i:i + step], quality)
+                                 for i in range(0, len(masked), step)])
+            timings['inference'] = time.perf_counter() - start
+
+        timings['per_garment'] = sum(timings.values()) / len(masked)
+        return to_images(outputs), [cloth_img for cloth_img, _ in masked], timings
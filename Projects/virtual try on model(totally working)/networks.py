@@ -182,8 +182,7 @@ class TpsGridGen(nn.Module):
         # Create a grid in numpy.
         # TODO: set an appropriate interval ([-1, 1] in CP-VTON, [-0.9, 0.9] in the current version of VITON-HD)
         grid_X, grid_Y = np.meshgrid(np.linspace(-0.9, 0.9, opt.load_width), np.linspace(-0.9, 0.9, opt.load_height))
-        grid_X = torch.tensor(grid_X, dtype=dtype).unsqueeze(0).unsqueeze(3)  # size: (1, h, w, 1)
-        grid_Y = torch.tensor(grid_Y, dtype=dtype).unsqueeze(0).unsqueeze(3)  # size: (1, h, w, 1)
+        self.grid_size = (opt.load_height, opt.load_width)
 
         # Initialize the regular grid for control points P.
         self.N = opt.grid_size * opt.grid_size
@@ -192,20 +191,20 @@ class TpsGridGen(nn.Module):
         P_Y, P_X = np.meshgrid(coords, coords)
         P_X = torch.tensor(P_X, dtype=dtype).reshape(self.N, 1)
         P_Y = torch.tensor(P_Y, dtype=dtype).reshape(self.N, 1)
-        P_X_base = P_X.clone()
-        P_Y_base = P_Y.clone()
 
-        Li = self.compute_L_inverse(P_X, P_Y).unsqueeze(0)
-        P_X = P_X.unsqueeze(2).unsqueeze(3).unsqueeze(4).transpose(0, 4)  # size: (1, 1, 1, 1, self.N)
-        P_Y = P_Y.unsqueeze(2).unsqueeze(3).unsqueeze(4).transpose(0, 4)  # size: (1, 1, 1, 1, self.N)
+        Li = self.compute_L_inverse(P_X, P_Y)
 
-        self.register_buffer('grid_X', grid_X, False)
-        self.register_buffer('grid_Y', grid_Y, False)
-        self.register_buffer('P_X_base', P_X_base, False)
-        self.register_buffer('P_Y_base', P_Y_base, False)
+        # The grid and the control points never change, so the TPS basis of
+        # every grid point, [U_1..U_N, 1, x, y] with U = d^2 log d^2, is
+        # computed once; a forward pass is then one [H*W, N+3] x [N+3, 2*B] matmul.
+        basis = self.tps_basis(torch.tensor(grid_X.reshape(-1), dtype=torch.float64),
+                               torch.tensor(grid_Y.reshape(-1), dtype=torch.float64),
+                               P_X.double().reshape(-1), P_Y.double().reshape(-1))
+
+        self.register_buffer('P_X_base', P_X, False)
+        self.register_buffer('P_Y_base', P_Y, False)
         self.register_buffer('Li', Li, False)
-        self.register_buffer('P_X', P_X, False)
-        self.register_buffer('P_Y', P_Y, False)
+        self.register_buffer('basis', basis.to(dtype), False)
 
     # TODO: refactor
     def compute_L_inverse(self,X,Y):
@@ -224,86 +223,45 @@ class TpsGridGen(nn.Module):
         Li = torch.inverse(L)
         return Li
 
-    # TODO: refactor
-    def apply_transformation(self,theta,points):
-        if theta.dim()==2:
-            theta = theta.unsqueeze(2).unsqueeze(3)
-        # points should be in the [B,H,W,2] format,
-        # where points[:,:,:,0] are the X coords
+    @staticmethod
+    def tps_basis(points_X, points_Y, P_X, P_Y):
+        """[M] point coordinates and [N] control points -> [M, N+3] TPS basis."""
+        dist_squared = (points_X[:, None] - P_X[None]) ** 2 + (points_Y[:, None] - P_Y[None]) ** 2
+        dist_squared[dist_squared == 0] = 1  # avoid NaN in log computation
+        U = dist_squared * torch.log(dist_squared)
+        return torch.cat((U, torch.ones_like(points_X)[:, None], points_X[:, None], points_Y[:, None]), 1)
+
+    def tps_coefficients(self, theta):
+        """theta [B, 2N] -> [N+3, 2*B] weights (non-linear then affine), X and Y interleaved per batch."""
+        batch_size = theta.size(0)
+        theta = theta.reshape(batch_size, 2, self.N)
+        # Control point displacements + base positions: [B, N, 2]
+        Q = theta.transpose(1, 2) + torch.cat((self.P_X_base, self.P_Y_base), 1)
+        coefficients = torch.matmul(self.Li[:, :self.N], Q)  # [B, N+3, 2]
+        return coefficients.permute(1, 0, 2).reshape(self.N + 3, 2 * batch_size)
+
+    def apply_transformation(self, theta, points):
+        # points should be in the [B,H,W,2] format, or [1,H,W,2] to share
+        # them across the batch, where points[:,:,:,0] are the X coords
         # and points[:,:,:,1] are the Y coords
-
-        # input are the corresponding control points P_i
-        batch_size = theta.size()[0]
-        # split theta into point coordinates
-        Q_X=theta[:,:self.N,:,:].squeeze(3)
-        Q_Y=theta[:,self.N:,:,:].squeeze(3)
-        Q_X = Q_X + self.P_X_base.expand_as(Q_X)
-        Q_Y = Q_Y + self.P_Y_base.expand_as(Q_Y)
-
-        # get spatial dimensions of points
-        points_b = points.size()[0]
-        points_h = points.size()[1]
-        points_w = points.size()[2]
-
-        # repeat pre-defined control points along spatial dimensions of points to be transformed
-        P_X = self.P_X.expand((1,points_h,points_w,1,self.N))
-        P_Y = self.P_Y.expand((1,points_h,points_w,1,self.N))
-
-        # compute weigths for non-linear part
-        W_X = torch.bmm(self.Li[:,:self.N,:self.N].expand((batch_size,self.N,self.N)),Q_X)
-        W_Y = torch.bmm(self.Li[:,:self.N,:self.N].expand((batch_size,self.N,self.N)),Q_Y)
-        # reshape
-        # W_X,W,Y: size [B,H,W,1,N]
-        W_X = W_X.unsqueeze(3).unsqueeze(4).transpose(1,4).repeat(1,points_h,points_w,1,1)
-        W_Y = W_Y.unsqueeze(3).unsqueeze(4).transpose(1,4).repeat(1,points_h,points_w,1,1)
-        # compute weights for affine part
-        A_X = torch.bmm(self.Li[:,self.N:,:self.N].expand((batch_size,3,self.N)),Q_X)
-        A_Y = torch.bmm(self.Li[:,self.N:,:self.N].expand((batch_size,3,self.N)),Q_Y)
-        # reshape
-        # A_X,A,Y: size [B,H,W,1,3]
-        A_X = A_X.unsqueeze(3).unsqueeze(4).transpose(1,4).repeat(1,points_h,points_w,1,1)
-        A_Y = A_Y.unsqueeze(3).unsqueeze(4).transpose(1,4).repeat(1,points_h,points_w,1,1)
-
-        # compute distance P_i - (grid_X,grid_Y)
-        # grid is expanded in point dim 4, but not in batch dim 0, as points P_X,P_Y are fixed for all batch
-        points_X_for_summation = points[:,:,:,0].unsqueeze(3).unsqueeze(4).expand(points[:,:,:,0].size()+(1,self.N))
-        points_Y_for_summation = points[:,:,:,1].unsqueeze(3).unsqueeze(4).expand(points[:,:,:,1].size()+(1,self.N))
-
-        if points_b==1:
-            delta_X = points_X_for_summation-P_X
-            delta_Y = points_Y_for_summation-P_Y
-        else:
-            # use expanded P_X,P_Y in batch dimension
-            delta_X = points_X_for_summation-P_X.expand_as(points_X_for_summation)
-            delta_Y = points_Y_for_summation-P_Y.expand_as(points_Y_for_summation)
-
-        dist_squared = torch.pow(delta_X,2)+torch.pow(delta_Y,2)
-        # U: size [1,H,W,1,N]
-        dist_squared[dist_squared==0]=1 # avoid NaN in log computation
-        U = torch.mul(dist_squared,torch.log(dist_squared))
-
-        # expand grid in batch dimension if necessary
-        points_X_batch = points[:,:,:,0].unsqueeze(3)
-        points_Y_batch = points[:,:,:,1].unsqueeze(3)
-        if points_b==1:
-            points_X_batch = points_X_batch.expand((batch_size,)+points_X_batch.size()[1:])
-            points_Y_batch = points_Y_batch.expand((batch_size,)+points_Y_batch.size()[1:])
-
-        points_X_prime = A_X[:,:,:,:,0]+ \
-                       torch.mul(A_X[:,:,:,:,1],points_X_batch) + \
-                       torch.mul(A_X[:,:,:,:,2],points_Y_batch) + \
-                       torch.sum(torch.mul(W_X,U.expand_as(W_X)),4)
-
-        points_Y_prime = A_Y[:,:,:,:,0]+ \
-                       torch.mul(A_Y[:,:,:,:,1],points_X_batch) + \
-                       torch.mul(A_Y[:,:,:,:,2],points_Y_batch) + \
-                       torch.sum(torch.mul(W_Y,U.expand_as(W_Y)),4)
-
-        return torch.cat((points_X_prime,points_Y_prime),3)
+        h, w = points.size(1), points.size(2)
+        P_X, P_Y = self.P_X_base.reshape(-1), self.P_Y_base.reshape(-1)
+        if points.size(0) == 1:
+            basis = self.tps_basis(points[0, :, :, 0].reshape(-1), points[0, :, :, 1].reshape(-1), P_X, P_Y)
+            return self._warp(basis, theta, h, w)
+        if points.size(0) != theta.size(0):
+            raise ValueError(f"points batch {points.size(0)} doesn't match theta batch {theta.size(0)}")
+        # A basis per batch entry
+        return torch.cat([self._warp(self.tps_basis(p[:, :, 0].reshape(-1), p[:, :, 1].reshape(-1), P_X, P_Y),
+                                     t[None], h, w) for p, t in zip(points, theta)])
+
+    def _warp(self, basis, theta, h, w):
+        batch_size = theta.size(0)
+        warped = torch.matmul(basis, self.tps_coefficients(theta.reshape(batch_size, -1)))  # [H*W, 2*B]
+        return warped.reshape(h, w, batch_size, 2).permute(2, 0, 1, 3)
 
     def forward(self, theta):
-        warped_grid = self.apply_transformation(theta, torch.cat((self.grid_X, self.grid_Y), 3))
-        return warped_grid
+        return self._warp(self.basis, theta, *self.grid_size)
 
 
 class GMM(nn.Module):
@@ -0,0 +1,141 @@
+import argparse
+import hashlib
+import os
+from collections import OrderedDict
+from os import path as osp
+
+import numpy as np
+import torch
+
+from tryon import downsample_person
+
+# name: how the array is stored; uint8 ones round-trip exactly
+#   'image'  - [-1, 1] RGB from an 8-bit image, stored as HxWx3 uint8
+#   'labels' - one-hot map, stored as an HxW uint8 label map
+#   'half'   - anything else, stored as float16
+FIELDS = {
+    'img_agnostic': 'image',
+    'parse_agnostic': 'labels',
+    'pose': 'image',
+    'parse_agnostic_down': 'half',
+    'pose_down': 'half',
+    'agnostic_gmm': 'image',
+    'pose_gmm': 'image',
+}
+
+
+def _encode(tensor, kind):
+    tensor = tensor[0]
+    if kind == 'image':
+        return torch.round((tensor + 1) * 127.5).clamp(0, 255).to(torch.uint8).permute(1, 2, 0).numpy()
+    if kind == 'labels':
+        return tensor.argmax(dim=0).to(torch.uint8).numpy()
+    return tensor.to(torch.float16).numpy()
+
+
+def _decode(array, kind, num_labels):
+    if kind == 'image':
+        tensor = torch.from_numpy(array).permute(2, 0, 1).float() / 127.5 - 1
+    elif kind == 'labels':
+        labels = torch.from_numpy(array).long()
+        tensor = torch.nn.functional.one_hot(labels, num_labels).permute(2, 0, 1).float()
+    else:
+        tensor = torch.from_numpy(array).float()
+    return tensor[None]
+
+
+class PersonCache:
+    """
+    Precomputed person-side inputs for a fixed catalogue of model photos.
+
+    Everything VITONDataset.load_person() derives from a person (agnostic
+    image, agnostic parse map, pose rendering) plus the downsampled variants
+    of the segmentation and GMM stages is stored once per person as a compact
+    .npz under cache_dir. Entries are keyed by image name, a hash of the
+    person's source files (image, parse, pose json and rendering) and the
+    resolution, so editing any source file or the load size rebuilds it.
+    Only cloth-dependent work is left per request.
+    """
+    # Decoded entries kept in memory; each is ~50 MB at 1024x768
+    def __init__(self, dataset, cache_dir, memory_items=4):
+        self.dataset = dataset
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.fingerprints = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def source_files(self, img_name):
+        data_path = self.dataset.data_path
+        return [
+            osp.join(data_path, 'image', img_name),
+            osp.join(data_path, 'image-parse', img_name.replace('.jpg', '.png')),
+            osp.join(data_path, 'openpose-json', img_name.replace('.jpg', '_keypoints.json')),
+            osp.join(data_path, 'openpose-img', img_name.replace('.jpg', '_rendered.png')),
+        ]
+
+    def key(self, img_name):
+        # img_name comes from requests: a plain file name, never a path
+        if img_name != osp.basename(img_name) or img_name in ('', '.', '..') or '\\' in img_name:
+            raise ValueError(f'Invalid image name {img_name!r}')
+        files = self.source_files(img_name)
+        stats = tuple((f, os.stat(f).st_mtime_ns, os.stat(f).st_size) for f in files)
+        # Rehash only when a source file's mtime or size changes
+        if self.fingerprints.get(img_name, (None,))[0] != stats:
+            digest = hashlib.sha1(f'{self.dataset.load_height}x{self.dataset.load_width}'.encode())
+            for f in files:
+                with open(f, 'rb') as fh:
+                    digest.update(fh.read())
+            self.fingerprints[img_name] = (stats, digest.hexdigest()[:16])
+        return f'{osp.splitext(osp.basename(img_name))[0]}-{self.fingerprints[img_name][1]}'
+
+    def get(self, img_name):
+        """Batched [1, C, H, W] person tensors, as TryOnPipeline.prepare_person() takes them."""
+        key = self.key(img_name)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+
+        file = osp.join(self.cache_dir, key + '.npz')
+        if not osp.exists(file):
+            self.build(img_name, file)
+        with np.load(file) as arrays:
+            person = {name: _decode(arrays[name], kind, self.dataset.semantic_nc) for name, kind in FIELDS.items()}
+
+        self.memory[key] = person
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+        return person
+
+    def build(self, img_name, file):
+        person = self.dataset.load_person(img_name)
+        person = {name: person[name][None] for name in ('img_agnostic', 'parse_agnostic', 'pose')}
+        person.update(downsample_person(**person))
+        tmp = file + '.tmp.npz'
+        np.savez(tmp, **{name: _encode(person[name], kind) for name, kind in FIELDS.items()})
+        os.replace(tmp, file)
+
+    def warm(self, img_names):
+        for img_name in img_names:
+            self.get(img_name)
+            print(f"✅ Cached: {img_name}")
+
+
+def main():
+    from datasets import VITONDataset
+    from test import get_opt
+
+    parser = argparse.ArgumentParser(description='Precompute the person cache for every model photo')
+    parser.add_argument('--images', nargs='*', help='Image names (default: all of datasets/test/image)')
+    args = parser.parse_args()
+
+    opt = get_opt()
+    opt.dataset_list = None
+    dataset = VITONDataset(opt)
+    cache = PersonCache(dataset, opt.person_cache_dir, memory_items=0)
+    images = args.images or sorted(f for f in os.listdir(osp.join(dataset.data_path, 'image')) if f.endswith('.jpg'))
+    cache.warm(images)
+
+
+if __name__ == '__main__':
+    main()
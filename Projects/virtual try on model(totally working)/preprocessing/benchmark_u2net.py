@@ -0,0 +1,82 @@
+"""
+Parity and CPU latency of FusedU2Net (and its ONNX export) against the stock
+u2net.U2NET at 320x320 and 1024x768.
+
+Without --checkpoint the weights are random and every BatchNorm gets random
+statistics, so the folding is still exercised.
+
+    python preprocessing/benchmark_u2net.py --checkpoint u2net.pth --onnx
+"""
+import argparse
+import copy
+import os
+import tempfile
+import time
+import warnings
+
+import torch
+
+from u2net import U2NET, U2NETP
+from u2net_fused import FusedU2Net, OnnxU2Net, export_onnx
+
+SIZES = ((320, 320), (1024, 768))
+
+
+def randomize_batchnorm(model):
+    for module in model.modules():
+        if isinstance(module, torch.nn.BatchNorm2d):
+            with torch.no_grad():
+                module.running_mean.normal_(0, 0.1)
+                module.running_var.uniform_(0.5, 1.5)
+                module.weight.uniform_(0.5, 1.5)
+                module.bias.normal_(0, 0.1)
+
+
+def timed(fn, x, repeat):
+    fn(x)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(x)
+    return out, (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checkpoint', help='U²-Net state dict (default: random weights)')
+    parser.add_argument('--small', action='store_true', help='U2NETP instead of U2NET')
+    parser.add_argument('--batch_size', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--onnx', action='store_true', help='also export and time onnxruntime')
+    args = parser.parse_args()
+
+    # The stock module calls the deprecated F.upsample, which warns on every call
+    warnings.filterwarnings('ignore', category=UserWarning)
+    stock = U2NETP(3, 1) if args.small else U2NET(3, 1)
+    if args.checkpoint:
+        stock.load_state_dict(torch.load(args.checkpoint, map_location='cpu'))
+    else:
+        randomize_batchnorm(stock)
+    stock.eval()
+    fused = FusedU2Net(copy.deepcopy(stock))
+
+    print(f"{'size':<10} {'stock ms':>9} {'fused ms':>9} {'onnx ms':>9} {'max |fused-stock|':>18} {'max |onnx-stock|':>17}")
+    for height, width in SIZES:
+        x = torch.rand(args.batch_size, 3, height, width)
+        with torch.inference_mode():
+            expected, stock_ms = timed(lambda t: stock(t)[0], x, args.repeat)
+            actual, fused_ms = timed(fused, x, args.repeat)
+        row = f"{height}x{width:<6} {stock_ms:>9.0f} {fused_ms:>9.0f}"
+
+        if args.onnx:
+            with tempfile.TemporaryDirectory() as tmp:
+                session = OnnxU2Net(export_onnx(fused, os.path.join(tmp, 'u2net.onnx'), height, width))
+                onnx_out, onnx_ms = timed(session, x.numpy(), args.repeat)
+            onnx_error = (torch.from_numpy(onnx_out) - expected).abs().max().item()
+            row += f" {onnx_ms:>9.0f} {(actual - expected).abs().max().item():>18.2e} {onnx_error:>17.2e}"
+        else:
+            row += f" {'-':>9} {(actual - expected).abs().max().item():>18.2e} {'-':>17}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,12 @@
-import os
-import subprocess
+"""
+LIP human parsing for every person image, in process (see person_stages.py):
+writes datasets/test/image-parse/*.png.
 
-image_dir = "datasets/test/image"
-save_dir = "datasets/test/image-parse"
+    python preprocessing/gen_image_parse.py [--backend pspnet|segformer] [--batch_size 4]
+"""
+import sys
 
-os.makedirs(save_dir, exist_ok=True)
+from person_stages import main
 
-for filename in os.listdir(image_dir):
-    if filename.endswith(".jpg") or filename.endswith(".png"):
-        input_path = os.path.join(image_dir, filename)
-        
-        # ✅ Force output to .png
-        base_name = os.path.splitext(filename)[0]
-        output_path = os.path.join(save_dir, base_name + ".png")
-
-        cmd = [
-            "python",
-            "preprocessing/Single-Human-Parsing-LIP/inference.py",
-            input_path,
-            "--save_path", output_path,
-            "--models-path", "preprocessing/Single-Human-Parsing-LIP/checkpoints",
-            "--backend", "resnet50"
-        ]
-        subprocess.run(cmd)
-
-print("✅ Image parsing completed. Saved as PNG.")
+if __name__ == "__main__":
+    main("parse", sys.argv[1:])
@@ -1,14 +1,26 @@
+import hashlib
+import io
+import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import numpy as np
 from PIL import Image, ImageOps
-from rembg import remove
+from rembg import new_session, remove
 
 # === Paths ===
 base_dir = os.path.abspath(os.path.dirname(__file__))
 cloth_dir = os.path.join(base_dir, "../datasets/test/cloth")
 mask_dir = os.path.join(base_dir, "../datasets/test/cloth-mask")
+manifest_path = os.path.join(base_dir, "../datasets/test/cloth-manifest.json")
+upload_cache_dir = os.path.join(base_dir, "../cache/cloth")
 os.makedirs(mask_dir, exist_ok=True)
 
+CLOTH_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+INGEST_WORKERS = int(os.environ.get("CLOTH_INGEST_WORKERS", os.cpu_count() or 2))
+
 # === Canvas settings ===
 CANVAS_WIDTH, CANVAS_HEIGHT = 768, 1024
 
@@ -39,32 +51,141 @@ def center_cloth_on_canvas(image_rgba, canvas_size=(768, 1024)):
     canvas_mask.paste(alpha_resized.point(lambda x: 255 if x > 30 else 0), (paste_x, paste_y))
     return canvas, canvas_mask
 
-# === Process each cloth image ===
-for fname in sorted(os.listdir(cloth_dir)):
-    if not fname.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
-        continue
+# === Background removal + centring for one cloth ===
+@lru_cache(maxsize=1)
+def get_session():
+    """One U²-Net session for the whole process (rembg otherwise builds one per call)."""
+    return new_session("u2net")
 
-    in_path = os.path.join(cloth_dir, fname)
-    base_name, _ = os.path.splitext(fname)
 
-    print(f"🧵 Processing: {fname}")
-    img = Image.open(in_path).convert("RGBA")
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
 
+
+def mask_cloth(img):
+    """PIL cloth photo -> (768x1024 RGB cloth on white, binary L mask)."""
     # Step 1: Background Removal
-    removed = remove(np.array(img))
+    removed = remove(np.array(img.convert("RGBA")), session=get_session())
     cloth_rgba = Image.fromarray(removed).convert("RGBA")
 
     # Step 2: Center cloth on 768x1024 white canvas
-    canvas_img, canvas_mask = center_cloth_on_canvas(cloth_rgba, canvas_size=(CANVAS_WIDTH, CANVAS_HEIGHT))
+    return center_cloth_on_canvas(cloth_rgba, canvas_size=(CANVAS_WIDTH, CANVAS_HEIGHT))
+
+
+# === Incremental processing of the cloth folder and uploads ===
+class ClothIngest:
+    """
+    Background removal + centring for cloth images, done once per content.
+
+    sync() processes only the files of cloth_dir that are new or changed
+    since the last run, according to a manifest of content hashes, on a
+    thread pool sharing one rembg session (ONNX Runtime releases the GIL).
+    Outputs keep the layout VITONDataset reads: the centred 768x1024 cloth
+    as cloth/<name>.jpg (overwriting a .jpg source in place, as before) and
+    its mask as cloth-mask/<name>.jpg. The manifest records the hash of each
+    source as it is *after* the run, and of the cloth/<name>.jpg derived
+    from a .png/.webp/.jpeg source, so outputs aren't redone as new cloths.
+
+    ingest_bytes() does the same for an uploaded image, cached under
+    upload_cache_dir by content hash, so re-uploading a garment is free.
+    """
+    def __init__(self, cloth_dir=cloth_dir, mask_dir=mask_dir, manifest_path=manifest_path,
+                 upload_cache_dir=upload_cache_dir, workers=INGEST_WORKERS):
+        self.cloth_dir = cloth_dir
+        self.mask_dir = mask_dir
+        self.manifest_path = manifest_path
+        self.upload_cache_dir = upload_cache_dir
+        self.workers = workers
+        self.lock = threading.Lock()
+        os.makedirs(mask_dir, exist_ok=True)
+        os.makedirs(upload_cache_dir, exist_ok=True)
+
+    def load_manifest(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {}
+
+    def save_manifest(self, manifest):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def _process_file(self, fname):
+        in_path = os.path.join(self.cloth_dir, fname)
+        base_name, _ = os.path.splitext(fname)
+        canvas_img, canvas_mask = mask_cloth(Image.open(in_path))
+
+        save_img_path = os.path.join(self.cloth_dir, base_name + ".jpg")
+        canvas_img.save(save_img_path, "JPEG")
+        canvas_mask.save(os.path.join(self.mask_dir, base_name + ".jpg"))
+        digests = {}
+        for path in (in_path, save_img_path):
+            with open(path, "rb") as f:
+                digests[os.path.basename(path)] = content_hash(f.read())
+        return fname, digests
+
+    def sync(self):
+        """Processes new/changed cloths; returns the names that were processed."""
+        manifest = self.load_manifest()
+        todo = {}
+        for fname in sorted(os.listdir(self.cloth_dir)):
+            if not fname.lower().endswith(CLOTH_EXTENSIONS):
+                continue
+            base_name, _ = os.path.splitext(fname)
+            try:
+                with open(os.path.join(self.cloth_dir, fname), "rb") as f:
+                    digest = content_hash(f.read())
+            except OSError as e:
+                print(f"❌ Skipped {fname}: {e}")
+                continue
+            mask_exists = os.path.exists(os.path.join(self.mask_dir, base_name + ".jpg"))
+            if manifest.get(fname) != digest or not mask_exists:
+                # One file per base name, since they all write cloth/<base>.jpg;
+                # a .jpg there may be the output of another source, so it loses
+                current = todo.get(base_name)
+                if current is None or current.lower().endswith(".jpg"):
+                    todo[base_name] = fname
+                elif not fname.lower().endswith(".jpg"):
+                    print(f"⚠️ Skipped {fname}: {current} also writes {base_name}.jpg")
+
+        todo = list(todo.values())
+        if not todo:
+            print("🎉 Cloth catalogue unchanged, nothing to process")
+            return []
+
+        # A bad file is reported and skipped; the others still get recorded
+        processed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(fname, pool.submit(self._process_file, fname)) for fname in todo]
+            for fname, future in futures:
+                try:
+                    _, digests = future.result()
+                except Exception as e:
+                    print(f"❌ Failed: {fname}: {e}")
+                    continue
+                manifest.update(digests)
+                processed.append(fname)
+                print(f"✅ Processed: {fname}")
+        self.save_manifest(manifest)
+        print(f"🎉 Processed {len(processed)} of {len(todo)} new or changed cloth(s)")
+        return processed
+
+    def ingest_bytes(self, data):
+        """Uploaded image bytes -> (cloth, mask) PIL images, from the cache when seen before."""
+        digest = content_hash(data)
+        img_path = os.path.join(self.upload_cache_dir, digest + ".jpg")
+        mask_path = os.path.join(self.upload_cache_dir, digest + "_mask.png")
+        if os.path.exists(img_path) and os.path.exists(mask_path):
+            return Image.open(img_path).convert("RGB"), Image.open(mask_path)
 
-    # Step 3: Save cleaned cloth image (.jpg)
-    save_img_path = os.path.join(cloth_dir, base_name + ".jpg")
-    canvas_img.save(save_img_path, "JPEG")
-    print(f"✅ Cleaned cloth saved: {save_img_path}")
+        canvas_img, canvas_mask = mask_cloth(Image.open(io.BytesIO(data)))
+        with self.lock:
+            canvas_img.save(img_path, "JPEG")
+            canvas_mask.save(mask_path)
+        return canvas_img, canvas_mask
 
-    # Step 4: Save binary mask (.jpg or .png)
-    save_mask_path = os.path.join(mask_dir, base_name + ".jpg")
-    canvas_mask.save(save_mask_path)
-    print(f"🎭 Mask saved: {save_mask_path}")
 
-print("🎉 All cloths processed successfully with rembg + centered fit!")
+if __name__ == "__main__":
+    ClothIngest().sync()
@@ -0,0 +1,376 @@
+"""
+In-process pose estimation and human parsing for the person catalogue.
+
+Each stage loads its model backend once and runs it over datasets/test/image
+in batches, writing exactly what VITONDataset reads:
+
+    openpose-json/<name>_keypoints.json   OpenPose BODY_25 JSON (people[0].pose_keypoints_2d)
+    openpose-img/<name>_rendered.png      the skeleton on black, as OpenPose renders it
+    image-parse/<name>.png                LIP labels 0-19 as a palette PNG
+
+    python preprocessing/gen_openpose.py --backend keypointrcnn
+    python preprocessing/gen_image_parse.py --backend pspnet --batch_size 8
+
+Backends are looked up by name in POSE_BACKENDS / PARSE_BACKENDS, or given as
+"module:Class" for any class with predict(list of PIL images).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# === Paths ===
+base_dir = os.path.abspath(os.path.dirname(__file__))
+dataset_dir = os.path.join(base_dir, "../datasets/test")
+openpose_model_dir = os.path.join(base_dir, "openpose/models/pose/body_25")
+lip_dir = os.path.join(base_dir, "Single-Human-Parsing-LIP")
+
+IMAGE_EXTENSIONS = (".jpg", ".png")
+STAGE_WORKERS = int(os.environ.get("PERSON_STAGE_WORKERS", os.cpu_count() or 2))
+
+# === OpenPose BODY_25 ===
+# Limbs in OpenPose's render order; each is drawn in the colour of its second keypoint
+BODY_25_PAIRS = [
+    (1, 8), (1, 2), (1, 5), (2, 3), (3, 4), (5, 6), (6, 7), (8, 9), (9, 10), (10, 11), (8, 12), (12, 13),
+    (13, 14), (1, 0), (0, 15), (15, 17), (0, 16), (16, 18), (14, 19), (19, 20), (14, 21), (11, 22), (22, 23),
+    (11, 24),
+]
+BODY_25_COLORS = [
+    (255, 0, 85), (255, 0, 0), (255, 85, 0), (255, 170, 0), (255, 255, 0), (170, 255, 0), (85, 255, 0),
+    (0, 255, 0), (255, 0, 0), (0, 255, 85), (0, 255, 170), (0, 255, 255), (0, 170, 255), (0, 85, 255),
+    (0, 0, 255), (255, 0, 170), (170, 0, 255), (255, 0, 255), (85, 0, 255), (0, 0, 255), (0, 0, 255),
+    (0, 0, 255), (0, 255, 255), (0, 255, 255), (0, 255, 255),
+]
+# Same as the --render_threshold gen_openpose.py passed to OpenPoseDemo
+RENDER_THRESHOLD = 0.1
+
+# BODY_25 index -> COCO-17 index; neck (1) and mid-hip (8) are midpoints, feet (19-24) have no COCO match
+BODY_25_FROM_COCO = {0: 0, 2: 6, 3: 8, 4: 10, 5: 5, 6: 7, 7: 9, 9: 12, 10: 14, 11: 16, 12: 11, 13: 13, 14: 15,
+                     15: 2, 16: 1, 17: 4, 18: 3}
+
+# === LIP parsing ===
+# Palette of the image-parse PNGs VITON-HD ships (background, hat, hair, glove, ...)
+LIP_PALETTE = [
+    (0, 0, 0), (128, 0, 0), (254, 0, 0), (0, 85, 0), (169, 0, 51), (254, 85, 0), (0, 0, 85), (0, 119, 220),
+    (85, 85, 0), (0, 85, 85), (85, 51, 0), (52, 86, 128), (0, 128, 0), (0, 0, 254), (51, 169, 220),
+    (0, 254, 254), (85, 254, 169), (169, 254, 85), (254, 254, 0), (254, 169, 0),
+]
+# ATR label (background, hat, hair, sunglasses, upper, skirt, pants, dress, belt, left/right shoe,
+# face, left/right leg, left/right arm, bag, scarf) -> LIP label
+ATR_TO_LIP = [0, 1, 2, 4, 5, 12, 9, 6, 9, 18, 19, 13, 16, 17, 14, 15, 0, 11]
+# PSPNet(psp_size, deep_features_size) per backbone, as in Single-Human-Parsing-LIP
+PSPNET_SIZES = {
+    'squeezenet': (512, 256), 'densenet': (1024, 512), 'resnet18': (512, 256), 'resnet34': (512, 256),
+    'resnet50': (2048, 1024), 'resnet101': (2048, 1024), 'resnet152': (2048, 1024),
+}
+
+
+# === Output formats ===
+def pose_json(keypoints):
+    """OpenPose --write_json content for one image; keypoints is [25, 3] or None."""
+    people = []
+    if keypoints is not None:
+        people.append({
+            "person_id": [-1],
+            "pose_keypoints_2d": [round(float(v), 3) for v in keypoints.reshape(-1)],
+            "face_keypoints_2d": [], "hand_left_keypoints_2d": [], "hand_right_keypoints_2d": [],
+            "pose_keypoints_3d": [], "face_keypoints_3d": [], "hand_left_keypoints_3d": [],
+            "hand_right_keypoints_3d": [],
+        })
+    return {"version": 1.3, "people": people}
+
+
+def render_skeleton(keypoints, size):
+    """
+    The skeleton on black, like OpenPose's CPU renderer with --disable_blending:
+    circle and line thickness scale with the person's share of the image.
+    """
+    width, height = size
+    canvas = np.zeros((height, width, 3), dtype=np.uint8)
+    if keypoints is None:
+        return Image.fromarray(canvas)
+
+    visible = keypoints[:, 2] > RENDER_THRESHOLD
+    if not visible.any():
+        return Image.fromarray(canvas)
+    person = keypoints[visible, :2]
+    ratio = min(1.0, max(np.ptp(person[:, 0]) / width, np.ptp(person[:, 1]) / height))
+    thickness = max(int(round(np.sqrt(width * height) / 75 * ratio)), 2)
+    line_width = max(1, int(round(thickness * 0.75)))
+    radius = thickness // 2
+
+    points = [(int(round(x)), int(round(y))) for x, y in keypoints[:, :2]]
+    for a, b in BODY_25_PAIRS:
+        if visible[a] and visible[b]:
+            cv2.line(canvas, points[a], points[b], BODY_25_COLORS[b], line_width, cv2.LINE_8)
+    for i in np.flatnonzero(visible):
+        cv2.circle(canvas, points[i], radius, BODY_25_COLORS[i], -1, cv2.LINE_8)
+    return Image.fromarray(canvas)
+
+
+def parse_image(labels):
+    """[H, W] LIP labels -> palette PNG image."""
+    image = Image.fromarray(labels.astype(np.uint8))
+    image.putpalette([value for color in LIP_PALETTE for value in color])
+    return image
+
+
+# === Pose backends: predict(images) -> [25, 3] BODY_25 keypoints (x, y, score) or None per image ===
+class OpenPoseBackend:
+    """
+    The BODY_25 Caffe model of OpenPose run by OpenCV's dnn module. The
+    catalogue has one person per photo, so each part is the maximum of its
+    heatmap (no part-affinity grouping).
+    """
+    def __init__(self, model_dir=openpose_model_dir, net_height=368, threshold=0.05, device="cpu"):
+        self.net = cv2.dnn.readNetFromCaffe(os.path.join(model_dir, "pose_deploy.prototxt"),
+                                            os.path.join(model_dir, "pose_iter_584000.caffemodel"))
+        self.net_height = net_height
+        self.threshold = threshold
+
+    def predict(self, images):
+        width, height = images[0].size
+        # --net_resolution -1x368: the width follows the aspect ratio, in multiples of 16
+        net_size = (max(16, int(round(self.net_height * width / height / 16)) * 16), self.net_height)
+        # OpenPose feeds BGR scaled to [-0.5, 0.5]
+        blob = cv2.dnn.blobFromImages([cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR) for image in images],
+                                      1 / 256, net_size, (128, 128, 128), swapRB=False, crop=False)
+        self.net.setInput(blob)
+        output = self.net.forward()  # [B, 78, H/8, W/8]: 25 part heatmaps, background, PAFs
+
+        results = []
+        for image, maps in zip(images, output):
+            scale_x, scale_y = image.size[0] / net_size[0], image.size[1] / net_size[1]
+            keypoints = np.zeros((25, 3), dtype=np.float32)
+            for part in range(25):
+                heatmap = cv2.resize(maps[part], net_size, interpolation=cv2.INTER_CUBIC)
+                _, score, _, (x, y) = cv2.minMaxLoc(heatmap)
+                if score > self.threshold:
+                    keypoints[part] = (x * scale_x, y * scale_y, score)
+            results.append(keypoints if keypoints[:, 2].any() else None)
+        return results
+
+
+class KeypointRCNNBackend:
+    """
+    torchvision's COCO Keypoint R-CNN (weights download on first use), mapped
+    to BODY_25. Only the highest-scoring person is kept; foot keypoints stay 0.
+    """
+    def __init__(self, device="cpu", min_score=0.5, threshold=RENDER_THRESHOLD):
+        import torch
+        from torchvision.models.detection import KeypointRCNN_ResNet50_FPN_Weights, keypointrcnn_resnet50_fpn
+        from torchvision.transforms.functional import to_tensor
+
+        self.torch = torch
+        self.to_tensor = to_tensor
+        self.device = device
+        self.min_score = min_score
+        self.threshold = threshold
+        self.model = keypointrcnn_resnet50_fpn(weights=KeypointRCNN_ResNet50_FPN_Weights.DEFAULT).to(device).eval()
+
+    def predict(self, images):
+        with self.torch.inference_mode():
+            outputs = self.model([self.to_tensor(image).to(self.device) for image in images])
+
+        results = []
+        for output in outputs:
+            if not len(output["scores"]) or output["scores"][0] < self.min_score:
+                results.append(None)
+                continue
+            coco = output["keypoints"][0].cpu().numpy()
+            # Keypoint scores are heatmap logits
+            scores = self.torch.sigmoid(output["keypoints_scores"][0]).cpu().numpy()
+            keypoints = np.zeros((25, 3), dtype=np.float32)
+            for body, index in BODY_25_FROM_COCO.items():
+                if scores[index] > self.threshold:
+                    keypoints[body] = (coco[index, 0], coco[index, 1], scores[index])
+            for body, (a, b) in ((1, (2, 5)), (8, (9, 12))):
+                if keypoints[a, 2] and keypoints[b, 2]:
+                    keypoints[body] = (keypoints[a] + keypoints[b]) / 2
+            results.append(keypoints)
+        return results
+
+
+# === Parsing backends: predict(images) -> [H, W] uint8 LIP labels per image ===
+class PSPNetLIPBackend:
+    """The Single-Human-Parsing-LIP PSPNet that gen_image_parse.py used to spawn once per image."""
+    def __init__(self, models_path=os.path.join(lip_dir, "checkpoints"), backbone="resnet50", device="cpu",
+                 size=256):
+        import torch
+        from torchvision import transforms
+
+        sys.path.insert(0, lip_dir)
+        from net.pspnet import PSPNet
+
+        psp_size, deep_features_size = PSPNET_SIZES[backbone]
+        self.net = PSPNet(sizes=(1, 2, 3, 6), psp_size=psp_size, deep_features_size=deep_features_size,
+                          backend=backbone)
+        # Snapshots were saved from nn.DataParallel
+        state = torch.load(os.path.join(models_path, backbone, "PSPNet_last"), map_location=device)
+        self.net.load_state_dict({key.replace("module.", "", 1): value for key, value in state.items()})
+        self.net.to(device).eval()
+
+        self.torch = torch
+        self.device = device
+        self.transform = transforms.Compose([
+            transforms.Resize((size, size), interpolation=3),
+            transforms.ToTensor(),
+            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+        ])
+
+    def predict(self, images):
+        batch = self.torch.stack([self.transform(image) for image in images]).to(self.device)
+        with self.torch.inference_mode():
+            logits, _ = self.net(batch)
+        labels = logits.argmax(dim=1).to(self.torch.uint8).cpu().numpy()
+        return [np.asarray(Image.fromarray(label).resize(image.size, Image.NEAREST))
+                for label, image in zip(labels, images)]
+
+
+class SegformerATRBackend:
+    """A SegFormer clothes parser (ATR labels, needs `transformers`) remapped to the LIP labels."""
+    def __init__(self, model_id="mattmdjaga/segformer_b2_clothes", device="cpu"):
+        import torch
+        from torch.nn import functional as F
+        from transformers import AutoModelForSemanticSegmentation, SegformerImageProcessor
+
+        self.torch = torch
+        self.F = F
+        self.device = device
+        self.processor = SegformerImageProcessor.from_pretrained(model_id)
+        self.model = AutoModelForSemanticSegmentation.from_pretrained(model_id).to(device).eval()
+        self.remap = np.array(ATR_TO_LIP, dtype=np.uint8)
+
+    def predict(self, images):
+        inputs = self.processor(images=images, return_tensors="pt").to(self.device)
+        with self.torch.inference_mode():
+            logits = self.model(**inputs).logits
+            labels = [self.F.interpolate(logit[None], size=image.size[::-1], mode="bilinear", align_corners=False)
+                      .argmax(dim=1)[0].cpu().numpy() for logit, image in zip(logits, images)]
+        return [self.remap[label] for label in labels]
+
+
+POSE_BACKENDS = {"openpose": OpenPoseBackend, "keypointrcnn": KeypointRCNNBackend}
+PARSE_BACKENDS = {"pspnet": PSPNetLIPBackend, "segformer": SegformerATRBackend}
+
+
+def load_backend(registry, spec, **kwargs):
+    """A backend by registry name, or any class given as "module:Class"."""
+    if ":" in spec:
+        module, name = spec.split(":", 1)
+        backend_cls = getattr(import_module(module), name)
+    elif spec in registry:
+        backend_cls = registry[spec]
+    else:
+        raise ValueError(f"Unknown backend '{spec}', expected one of {', '.join(registry)} or module:Class")
+    start = time.perf_counter()
+    backend = backend_cls(**kwargs)
+    print(f"[{backend_cls.__name__}] loaded in {time.perf_counter() - start:.1f}s")
+    return backend
+
+
+# === Stages ===
+class ImageStage:
+    """
+    Runs a backend over the person images in batches. Decoding the next
+    batch and writing the previous one's outputs happen in a thread pool
+    while the model runs. Images whose outputs all exist are skipped unless
+    force=True.
+    """
+    name = "stage"
+
+    def __init__(self, backend, batch_size=4, data_dir=dataset_dir):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.data_dir = data_dir
+        self.image_dir = os.path.join(data_dir, "image")
+
+    def outputs(self, name):
+        raise NotImplementedError
+
+    def write(self, name, image, prediction):
+        raise NotImplementedError
+
+    def load(self, name):
+        return Image.open(os.path.join(self.image_dir, name)).convert("RGB")
+
+    def run(self, names=None, force=False):
+        if names is None:
+            names = sorted(f for f in os.listdir(self.image_dir) if f.lower().endswith(IMAGE_EXTENSIONS))
+        names = [name for name in names if force or not all(map(os.path.exists, self.outputs(name)))]
+        for name in names[:1]:
+            for path in self.outputs(name):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+        batches = [names[i:i + self.batch_size] for i in range(0, len(names), self.batch_size)]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(STAGE_WORKERS) as pool:
+            loading = [pool.submit(self.load, name) for name in batches[0]] if batches else []
+            writing = []
+            for i, batch in enumerate(batches):
+                images = [future.result() for future in loading]
+                if i + 1 < len(batches):
+                    loading = [pool.submit(self.load, name) for name in batches[i + 1]]
+                predictions = self.backend.predict(images)
+                for future in writing:
+                    future.result()
+                writing = [pool.submit(self.write, name, image, prediction)
+                           for name, image, prediction in zip(batch, images, predictions)]
+            for future in writing:
+                future.result()
+        elapsed = time.perf_counter() - start
+
+        rate = len(names) / elapsed if names else 0.0
+        print(f"[{self.name}] {len(names)} images in {elapsed:.1f}s ({rate:.2f} images/sec)")
+        return {"images": len(names), "seconds": elapsed, "images_per_sec": rate}
+
+
+class PoseStage(ImageStage):
+    name = "pose"
+
+    def outputs(self, name):
+        stem = os.path.splitext(name)[0]
+        return [os.path.join(self.data_dir, "openpose-json", f"{stem}_keypoints.json"),
+                os.path.join(self.data_dir, "openpose-img", f"{stem}_rendered.png")]
+
+    def write(self, name, image, keypoints):
+        if keypoints is None:
+            print(f"⚠️ No person found in {name}")
+        json_path, rendered_path = self.outputs(name)
+        with open(json_path, "w") as f:
+            json.dump(pose_json(keypoints), f)
+        render_skeleton(keypoints, image.size).save(rendered_path)
+
+
+class ParseStage(ImageStage):
+    name = "parse"
+
+    def outputs(self, name):
+        return [os.path.join(self.data_dir, "image-parse", os.path.splitext(name)[0] + ".png")]
+
+    def write(self, name, image, labels):
+        parse_image(labels).save(self.outputs(name)[0])
+
+
+STAGES = {"pose": (PoseStage, POSE_BACKENDS, "openpose"), "parse": (ParseStage, PARSE_BACKENDS, "pspnet")}
+
+
+def main(stage, argv=None):
+    stage_cls, registry, default_backend = STAGES[stage]
+    parser = argparse.ArgumentParser(description=f"Run the {stage} stage over datasets/test/image")
+    parser.add_argument("--backend", default=default_backend, help=f"{', '.join(registry)} or module:Class")
+    parser.add_argument("--batch_size", type=int, default=4)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--force", action="store_true", help="redo images whose outputs already exist")
+    parser.add_argument("names", nargs="*", help="image file names (default: all)")
+    args = parser.parse_args(argv)
+
+    backend = load_backend(registry, args.backend, device=args.device)
+    return stage_cls(backend, args.batch_size).run(args.names or None, args.force)
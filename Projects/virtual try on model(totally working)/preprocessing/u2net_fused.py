@@ -0,0 +1,175 @@
+"""
+Inference-only U²-Net (u2net.U2NET / U2NETP) that returns just the fused mask.
+
+FusedU2Net wraps a loaded network and
+- folds every BatchNorm into the convolution before it,
+- runs with channels-last activations,
+- plans every upsample target size once per input size, and skips the
+  upsamples that would be identities,
+- folds the 1x1 outconv into the six side convolutions, so the side maps
+  are summed instead of concatenated, and drops the six side sigmoids.
+
+export_onnx() writes the result for onnxruntime (OnnxU2Net).
+Parity with the stock module and latency: preprocessing/benchmark_u2net.py
+"""
+import copy
+import math
+
+import torch
+from torch import nn
+from torch.nn import functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+try:
+    from .u2net import REBNCONV, RSU4F
+except ImportError:  # run as a script from preprocessing/
+    from u2net import REBNCONV, RSU4F
+
+STAGES = ('stage1', 'stage2', 'stage3', 'stage4', 'stage5', 'stage6')
+DECODER_STAGES = ('stage5d', 'stage4d', 'stage3d', 'stage2d', 'stage1d')
+
+
+def fold_batchnorm(model):
+    """Replaces conv + BatchNorm in every REBNCONV by one convolution (eval mode only)."""
+    for module in model.modules():
+        if isinstance(module, REBNCONV) and not isinstance(module.bn_s1, nn.Identity):
+            module.conv_s1 = fuse_conv_bn_eval(module.conv_s1, module.bn_s1)
+            module.bn_s1 = nn.Identity()
+    return model
+
+
+def rsu_sizes(block, size):
+    """Spatial size of each encoder level (rebnconv1..N) of an RSU block with input `size`."""
+    depth = 1
+    while hasattr(block, 'rebnconv{}'.format(depth + 1)):
+        depth += 1
+    sizes = [size]
+    for level in range(2, depth + 1):
+        h, w = sizes[-1]
+        # Levels 2..N-1 follow a ceil-mode 2x2 pool; the dilated level N and all of RSU4F don't
+        pooled = level < depth and not isinstance(block, RSU4F)
+        sizes.append((math.ceil(h / 2), math.ceil(w / 2)) if pooled else (h, w))
+    return sizes
+
+
+def upsample(x, size):
+    if tuple(x.shape[2:]) == size:
+        return x
+    return F.interpolate(x, size=size, mode='bilinear', align_corners=False)
+
+
+def rsu_forward(block, x, sizes):
+    """RSU7 ... RSU4F forward with the level sizes planned by rsu_sizes."""
+    depth = len(sizes)
+    hxin = block.rebnconvin(x)
+    encoder = []
+    hx = hxin
+    for level in range(1, depth + 1):
+        if 1 < level < depth and not isinstance(block, RSU4F):
+            hx = getattr(block, 'pool{}'.format(level - 1))(hx)
+        hx = getattr(block, 'rebnconv{}'.format(level))(hx)
+        encoder.append(hx)
+
+    hx = encoder[-1]
+    for level in range(depth - 1, 0, -1):
+        hx = getattr(block, 'rebnconv{}d'.format(level))(torch.cat((hx, encoder[level - 1]), 1))
+        if level > 1:
+            hx = upsample(hx, sizes[level - 2])
+    return hx + hxin
+
+
+class FusedU2Net(nn.Module):
+    """
+    model - a U2NET or U2NETP with out_ch=1 and its weights loaded; it is
+            modified in place (BatchNorm folding).
+    forward(x) returns sigmoid(d0) only, [B, 1, H, W].
+    """
+    def __init__(self, model, channels_last=True):
+        super(FusedU2Net, self).__init__()
+        if model.outconv.out_channels != 1:
+            raise ValueError("FusedU2Net needs a single-channel U²-Net (out_ch=1)")
+        self.net = fold_batchnorm(model.eval())
+        self.channels_last = channels_last
+
+        # d0 = outconv(cat(d1..d6)) = sum_i w_i * d_i + b, and bilinear upsampling
+        # commutes with the scale, so w_i goes into side_i
+        weights = model.outconv.weight.detach().view(6)
+        sides = []
+        for i in range(6):
+            side = copy.deepcopy(getattr(model, 'side{}'.format(i + 1)))
+            with torch.no_grad():
+                side.weight.mul_(weights[i])
+                side.bias.mul_(weights[i])
+            sides.append(side)
+        self.sides = nn.ModuleList(sides)
+        self.register_buffer('bias', model.outconv.bias.detach().clone().view(1, 1, 1, 1))
+        for name in ['outconv'] + ['side{}'.format(i + 1) for i in range(6)]:
+            delattr(self.net, name)
+
+        if channels_last:
+            self.to(memory_format=torch.channels_last)
+        self.plans = {}
+
+    def plan(self, size):
+        """Input size of every stage and the level sizes inside each RSU block, per input size."""
+        if size not in self.plans:
+            stage_sizes = [size]
+            for _ in range(5):
+                h, w = stage_sizes[-1]
+                stage_sizes.append((math.ceil(h / 2), math.ceil(w / 2)))
+            blocks = {name: rsu_sizes(getattr(self.net, name), stage_sizes[i]) for i, name in enumerate(STAGES)}
+            blocks.update({name: rsu_sizes(getattr(self.net, name), stage_sizes[4 - i])
+                           for i, name in enumerate(DECODER_STAGES)})
+            self.plans[size] = stage_sizes, blocks
+        return self.plans[size]
+
+    def forward(self, x):
+        net = self.net
+        stage_sizes, blocks = self.plan(tuple(x.shape[2:]))
+        if self.channels_last:
+            x = x.contiguous(memory_format=torch.channels_last)
+
+        encoder = []
+        hx = x
+        for i, name in enumerate(STAGES):
+            if i:
+                hx = getattr(net, 'pool{}{}'.format(i, i + 1))(hx)
+            hx = rsu_forward(getattr(net, name), hx, blocks[name])
+            encoder.append(hx)
+
+        # Decoder outputs, deepest first: hx6, hx5d, hx4d, hx3d, hx2d, hx1d
+        decoder = [hx]
+        for i, name in enumerate(DECODER_STAGES):
+            hx = upsample(hx, stage_sizes[4 - i])
+            hx = rsu_forward(getattr(net, name), torch.cat((hx, encoder[4 - i]), 1), blocks[name])
+            decoder.append(hx)
+
+        d0 = self.sides[0](decoder[5]) + self.bias
+        for side, features in zip(self.sides[1:], decoder[4::-1]):
+            d0 = d0 + upsample(side(features), stage_sizes[0])
+        return torch.sigmoid(d0)
+
+
+def export_onnx(model, path, height=320, width=320, opset=17):
+    """Writes a FusedU2Net for [B, 3, height, width] inputs (the size is baked into the graph)."""
+    model.eval()
+    with torch.no_grad():
+        torch.onnx.export(model, torch.zeros(1, 3, height, width), path, input_names=['image'],
+                          output_names=['mask'], opset_version=opset,
+                          dynamic_axes={'image': {0: 'batch'}, 'mask': {0: 'batch'}})
+    return path
+
+
+class OnnxU2Net:
+    """An exported FusedU2Net on the onnxruntime CPU provider: float32 [B, 3, H, W] -> [B, 1, H, W]."""
+    def __init__(self, path, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, x):
+        return self.session.run(None, {'image': x})[0]
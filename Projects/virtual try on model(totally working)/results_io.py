@@ -0,0 +1,73 @@
+"""
+Conversion and encoding of try-on outputs.
+
+A batch in [-1, 1] becomes uint8 HWC arrays in one vectorised op on the
+device it lives on, and encoding (Pillow releases the GIL while it encodes)
+runs on a thread pool, either to bytes for HTTP responses or to files.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from PIL import Image
+
+ENCODE_WORKERS = int(os.environ.get("RESULT_ENCODE_WORKERS", min(4, os.cpu_count() or 1)))
+
+
+def to_uint8(batch):
+    """[B, C, H, W] in [-1, 1] -> [B, H, W, C] uint8 array, [B, H, W] when C == 1."""
+    array = batch.detach().add(1).mul_(127.5).clamp_(0, 255).to(torch.uint8)
+    array = array.permute(0, 2, 3, 1).contiguous().cpu().numpy()
+    return array[..., 0] if array.shape[-1] == 1 else array
+
+
+def to_images(batch):
+    """[B, C, H, W] in [-1, 1] -> list of PIL images."""
+    return [Image.fromarray(array) for array in to_uint8(batch)]
+
+
+def encode(image, fmt="JPEG", quality=75):
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=quality)
+    return buffer.getvalue()
+
+
+class ResultWriter:
+    """
+    Encodes results on a thread pool. encode() returns the encoded bytes;
+    save() writes files in the background, so call flush() (or close())
+    before relying on them being on disk.
+    """
+    def __init__(self, workers=ENCODE_WORKERS, fmt="JPEG", quality=75):
+        self.pool = ThreadPoolExecutor(workers)
+        self.fmt = fmt
+        self.quality = quality
+        self.pending = []
+
+    def encode(self, images):
+        """PIL images, or a [B, C, H, W] batch in [-1, 1] -> encoded bytes, in order."""
+        if isinstance(images, torch.Tensor):
+            images = to_images(images)
+        return list(self.pool.map(lambda image: encode(image, self.fmt, self.quality), images))
+
+    def save(self, batch, names, save_dir):
+        """Queues save_dir/names[i] for every image of a [B, C, H, W] batch in [-1, 1]."""
+        # Surface errors of finished writes and drop them
+        for future in [f for f in self.pending if f.done()]:
+            future.result()
+        self.pending = [f for f in self.pending if not f.done()]
+        for array, name in zip(to_uint8(batch), names):
+            self.pending.append(self.pool.submit(self._write, array, os.path.join(save_dir, name)))
+
+    def _write(self, array, path):
+        Image.fromarray(array).save(path, format=self.fmt, quality=self.quality)
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+    def close(self):
+        self.flush()
+        self.pool.shutdown()
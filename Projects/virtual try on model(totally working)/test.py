@@ -1,25 +1,24 @@
 import argparse
 import os
-import subprocess
-import sys
-import torch
-from torch import nn
-from torch.nn import functional as F
-import torchgeometry as tgm
 
 from datasets import VITONDataset, VITONDataLoader
-from networks import SegGenerator, GMM, ALIASGenerator
-from utils import gen_noise, load_checkpoint, save_images
+from preprocessing.mask_cloth import ClothIngest
+from tryon import QUALITY_TIERS, TryOnPipeline
+from results_io import ResultWriter
 
 def generate_preprocessing():
     print("\n🧵 [Preprocessing] Generating cloth-mask...")
-    subprocess.run([sys.executable, os.path.join("preprocessing", "mask_cloth.py")], check=True)
+    # Only new or changed cloths are processed (see ClothIngest)
+    ClothIngest().sync()
 
+    # Person-side stages run in process and skip images that are already done.
+    # They need the OpenPose / LIP checkpoints under preprocessing/ (see person_stages.py)
+    # from preprocessing.person_stages import PARSE_BACKENDS, POSE_BACKENDS, ParseStage, PoseStage, load_backend
     # print("\n🧍 [Preprocessing] Generating image-parse...")
-    # subprocess.run([sys.executable, os.path.join("preprocessing", "gen_image_parse.py")], check=True)
+    # ParseStage(load_backend(PARSE_BACKENDS, "pspnet")).run()
 
     # print("\n💃 [Preprocessing] Generating openpose outputs...")
-    # subprocess.run([sys.executable, os.path.join("preprocessing", "gen_openpose.py")], check=True)
+    # PoseStage(load_backend(POSE_BACKENDS, "openpose")).run()
 
     # Generate test_pairs.txt
     # cloth_dir = os.path.join("datasets", "test", "cloth")
@@ -45,6 +44,7 @@ def get_opt():
     parser.add_argument('--dataset_list', type=str, default='test_pairs.txt')
     parser.add_argument('--checkpoint_dir', type=str, default='./checkpoints/')
     parser.add_argument('--save_dir', type=str, default='./results/')
+    parser.add_argument('--person_cache_dir', type=str, default='./cache/persons/')
     parser.add_argument('--display_freq', type=int, default=1)
     parser.add_argument('--seg_checkpoint', type=str, default='seg_final.pth')
     parser.add_argument('--gmm_checkpoint', type=str, default='gmm_final.pth')
@@ -56,81 +56,43 @@ def get_opt():
     parser.add_argument('--norm_G', type=str, default='spectralaliasinstance')
     parser.add_argument('--ngf', type=int, default=64)
     parser.add_argument('--num_upsampling_layers', choices=['normal', 'more', 'most'], default='most')
+
+    # ALIAS quality tiers and fast paths (see tryon.TryOnPipeline)
+    parser.add_argument('--quality', choices=QUALITY_TIERS, default='final')
+    parser.add_argument('--preview_height', type=int, default=512)
+    parser.add_argument('--preview_width', type=int, default=384)
+    parser.add_argument('--channels_last', action='store_true')
+    parser.add_argument('--bf16', action='store_true', help='bfloat16 autocast of the ALIAS generator on CPU')
+    parser.add_argument('--alias_compile', choices=['none', 'trace', 'compile'], default='none')
+    # Cloths run together when one person tries on several (TryOnService.try_on_many)
+    parser.add_argument('--cloth_batch_size', type=int, default=4)
     return parser.parse_args([])
 
 
-def test(opt, seg, gmm, alias):
+def test(opt, pipeline):
     print("\n🚀 Running test pipeline...")
-    up = nn.Upsample(size=(opt.load_height, opt.load_width), mode='bilinear')
-    gauss = tgm.image.GaussianBlur((15, 15), (3, 3)).to('cpu').eval()
 
     test_dataset = VITONDataset(opt)
     test_loader = VITONDataLoader(opt, test_dataset)
+    # JPEG encoding and writes overlap with the next batch's inference
+    writer = ResultWriter()
+
+    for i, inputs in enumerate(test_loader.data_loader):
+        img_names = inputs['img_name']
+        c_names = inputs['c_name']['unpaired']
+        person = pipeline.prepare_person(inputs['img_agnostic'], inputs['parse_agnostic'], inputs['pose'])
+        # Batch runs only keep one image per pair, so 'progressive' saves the final one
+        quality = 'final' if opt.quality == 'progressive' else opt.quality
+        output = pipeline(person, inputs['cloth']['unpaired'], inputs['cloth_mask']['unpaired'], quality)
+
+        # Save images
+        unpaired_names = ['{}_{}'.format(img_name.split('_')[0], c_name) for img_name, c_name in zip(img_names, c_names)]
+        writer.save(output, unpaired_names, os.path.join(opt.save_dir, opt.name))
+
+        if (i + 1) % opt.display_freq == 0:
+            print(f"✅ Step {i+1}: {unpaired_names}")
 
-    with torch.no_grad():
-        for i, inputs in enumerate(test_loader.data_loader):
-            img_names = inputs['img_name']
-            c_names = inputs['c_name']['unpaired']
-            img_agnostic = inputs['img_agnostic'].to('cpu')
-            parse_agnostic = inputs['parse_agnostic'].to('cpu')
-            pose = inputs['pose'].to('cpu')
-            c = inputs['cloth']['unpaired'].to('cpu')
-            cm = inputs['cloth_mask']['unpaired'].to('cpu')
-
-            parse_agnostic_down = F.interpolate(parse_agnostic, size=(256, 192), mode='bilinear')
-            pose_down = F.interpolate(pose, size=(256, 192), mode='bilinear')
-            c_masked_down = F.interpolate(c * cm, size=(256, 192), mode='bilinear')
-            cm_down = F.interpolate(cm, size=(256, 192), mode='bilinear')
-            seg_input = torch.cat((cm_down, c_masked_down, parse_agnostic_down, pose_down, gen_noise(cm_down.size())), dim=1)
-
-            parse_pred_down = seg(seg_input)
-            parse_pred = gauss(up(parse_pred_down))
-            parse_pred = parse_pred.argmax(dim=1)[:, None]
-
-            parse_old = torch.zeros(parse_pred.size(0), 13, opt.load_height, opt.load_width).to('cpu')
-            parse_old.scatter_(1, parse_pred, 1.0)
-
-            # Semantic merging
-            labels = {
-                0:  [0],        # background
-                1:  [2, 4, 7, 8, 9, 10, 11],  # paste
-                2:  [3],        # upper
-                3:  [1],        # hair
-                4:  [5],        # left_arm
-                5:  [6],        # right_arm
-                6:  [12]        # noise
-            }
-            parse = torch.zeros(parse_pred.size(0), 7, opt.load_height, opt.load_width).to('cpu')
-            for idx, channels in labels.items():
-                for ch in channels:
-                    parse[:, idx] += parse_old[:, ch]
-
-            # GMM Warping
-            agnostic_gmm = F.interpolate(img_agnostic, size=(256, 192), mode='nearest')
-            parse_cloth_gmm = F.interpolate(parse[:, 2:3], size=(256, 192), mode='nearest')
-            pose_gmm = F.interpolate(pose, size=(256, 192), mode='nearest')
-            c_gmm = F.interpolate(c, size=(256, 192), mode='nearest')
-            gmm_input = torch.cat((parse_cloth_gmm, pose_gmm, agnostic_gmm), dim=1)
-
-            _, warped_grid = gmm(gmm_input, c_gmm)
-            warped_c = F.grid_sample(c, warped_grid, padding_mode='border')
-            warped_cm = F.grid_sample(cm, warped_grid, padding_mode='border')
-
-            # Misalignment handling
-            misalign_mask = parse[:, 2:3] - warped_cm
-            misalign_mask[misalign_mask < 0.0] = 0.0
-            parse_div = torch.cat((parse, misalign_mask), dim=1)
-            parse_div[:, 2:3] -= misalign_mask
-
-            # Final try-on generation
-            output = alias(torch.cat((img_agnostic, pose, warped_c), dim=1), parse, parse_div, misalign_mask)
-
-            # Save images
-            unpaired_names = ['{}_{}'.format(img_name.split('_')[0], c_name) for img_name, c_name in zip(img_names, c_names)]
-            save_images(output, unpaired_names, os.path.join(opt.save_dir, opt.name))
-
-            if (i + 1) % opt.display_freq == 0:
-                print(f"✅ Step {i+1}: {unpaired_names}")
+    writer.close()
 
 
 def main():
@@ -141,21 +103,8 @@ def main():
 
     os.makedirs(os.path.join(opt.save_dir, opt.name), exist_ok=True)
 
-    seg = SegGenerator(opt, input_nc=opt.semantic_nc + 8, output_nc=opt.semantic_nc)
-    gmm = GMM(opt, inputA_nc=7, inputB_nc=3)
-    opt.semantic_nc = 7
-    alias = ALIASGenerator(opt, input_nc=9)
-    opt.semantic_nc = 13
-
-    load_checkpoint(seg, os.path.join(opt.checkpoint_dir, opt.seg_checkpoint))
-    load_checkpoint(gmm, os.path.join(opt.checkpoint_dir, opt.gmm_checkpoint))
-    load_checkpoint(alias, os.path.join(opt.checkpoint_dir, opt.alias_checkpoint))
-
-    seg.to('cpu').eval()
-    gmm.to('cpu').eval()
-    alias.to('cpu').eval()
-
-    test(opt, seg, gmm, alias)
+    pipeline = TryOnPipeline.from_checkpoints(opt)
+    test(opt, pipeline)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,237 @@
+import copy
+import os
+import torch
+from torch import nn
+from torch.nn import functional as F
+from torch.nn.utils.spectral_norm import remove_spectral_norm
+import torchgeometry as tgm
+
+from networks import SegGenerator, GMM, ALIASGenerator
+from utils import gen_noise, label_remap, load_checkpoint
+
+# Input size of the segmentation and GMM stages
+LOW_RES = (256, 192)
+
+# ALIAS output tiers; 'progressive' returns the preview first, then the final image
+QUALITY_TIERS = ('preview', 'final', 'progressive')
+
+# Semantic merging of the 13 predicted labels into the 7 ALIAS channels
+MERGE_LABELS = {
+    0:  [0],        # background
+    1:  [2, 4, 7, 8, 9, 10, 11],  # paste
+    2:  [3],        # upper
+    3:  [1],        # hair
+    4:  [5],        # left_arm
+    5:  [6],        # right_arm
+    6:  [12]        # noise
+}
+
+
+def downsample_person(img_agnostic, parse_agnostic, pose):
+    """Low-resolution person inputs of the segmentation and GMM stages."""
+    return {
+        'parse_agnostic_down': F.interpolate(parse_agnostic, size=LOW_RES, mode='bilinear'),
+        'pose_down': F.interpolate(pose, size=LOW_RES, mode='bilinear'),
+        'agnostic_gmm': F.interpolate(img_agnostic, size=LOW_RES, mode='nearest'),
+        'pose_gmm': F.interpolate(pose, size=LOW_RES, mode='nearest'),
+    }
+
+
+def fold_spectral_norm(module):
+    """
+    Replaces spectrally normalised weights by plain ones holding W / sigma.
+    In eval mode u and v are never updated, so outputs are unchanged and the
+    per-forward weight computation goes away.
+    """
+    for m in module.modules():
+        if hasattr(m, 'weight_orig'):
+            remove_spectral_norm(m)
+    return module
+
+
+def alias_at(alias, opt, height, width):
+    """
+    The same ALIAS generator, sharing its weights, producing height x width
+    images. The network is fully convolutional and resamples its inputs to
+    every scale itself, so only the latent size changes and it still takes
+    the full-resolution conditioning maps.
+    """
+    factor = opt.load_height // alias.sh
+    if height % factor or width % factor:
+        raise ValueError("ALIAS output size must be a multiple of {}, got {}x{}".format(factor, height, width))
+    tier = copy.copy(alias)
+    tier.sh, tier.sw = height // factor, width // factor
+    return tier
+
+
+class TracedGenerator:
+    """TorchScript traces of a generator, one per set of input shapes."""
+    def __init__(self, generator):
+        self.generator = generator
+        self.traces = {}
+
+    def __call__(self, *inputs):
+        key = tuple(t.shape for t in inputs)
+        if key not in self.traces:
+            # ALIASNorm draws fresh noise on every call, so outputs can't be checked against a rerun
+            traced = torch.jit.trace(self.generator, inputs, check_trace=False)
+            self.traces[key] = torch.jit.freeze(traced)
+        return self.traces[key](*inputs)
+
+
+def compile_generator(generator, mode):
+    if mode == 'trace':
+        return TracedGenerator(generator)
+    if mode == 'compile':
+        return torch.compile(generator)
+    return generator
+
+
+def load_networks(opt, device='cpu'):
+    seg = SegGenerator(opt, input_nc=opt.semantic_nc + 8, output_nc=opt.semantic_nc)
+    gmm = GMM(opt, inputA_nc=7, inputB_nc=3)
+    opt.semantic_nc = 7
+    alias = ALIASGenerator(opt, input_nc=9)
+    opt.semantic_nc = 13
+
+    load_checkpoint(seg, os.path.join(opt.checkpoint_dir, opt.seg_checkpoint))
+    load_checkpoint(gmm, os.path.join(opt.checkpoint_dir, opt.gmm_checkpoint))
+    load_checkpoint(alias, os.path.join(opt.checkpoint_dir, opt.alias_checkpoint))
+
+    seg.to(device).eval()
+    gmm.to(device).eval()
+    fold_spectral_norm(alias.to(device).eval())
+    return seg, gmm, alias
+
+
+class TryOnPipeline:
+    """
+    Segmentation -> GMM warping -> ALIAS generation with networks loaded once.
+
+    Person inputs go through prepare_person() (which also builds the
+    low-resolution variants the first two stages use), then
+    pipeline(person, cloth, cloth_mask, quality) returns the try-on images in
+    [-1, 1]: 'final' at load_height x load_width, 'preview' at
+    preview_height x preview_width from the same weights. progressive()
+    yields both while running the segmentation and GMM stages once. A person
+    prepared with batch size 1 is broadcast over a batch of K cloths, so
+    comparing K garments is a single run of all three stages.
+
+    opt.channels_last, opt.bf16 (CPU autocast) and opt.alias_compile
+    ('none', 'trace' or 'compile') select the fast paths of the generator.
+    """
+    def __init__(self, opt, seg, gmm, alias, device='cpu'):
+        self.opt = opt
+        self.seg = seg
+        self.gmm = gmm
+        self.alias = alias
+        self.device = device
+        self.up = nn.Upsample(size=(opt.load_height, opt.load_width), mode='bilinear')
+        self.gauss = tgm.image.GaussianBlur((15, 15), (3, 3)).to(device).eval()
+        self.merge_index = label_remap(MERGE_LABELS, 13).to(device)
+        # Merged parse maps, one buffer per batch size, and noise maps per shape, reused across calls
+        self.parse_buffers = {}
+        self.noise_buffers = {}
+
+        self.channels_last = opt.channels_last
+        self.bf16 = opt.bf16
+        # Tracing needs autograd-visible tensors, everything else runs in inference mode
+        self.grad_mode = torch.no_grad if opt.alias_compile == 'trace' else torch.inference_mode
+        if self.channels_last:
+            alias.to(memory_format=torch.channels_last)
+        generators = {
+            'final': alias,
+            'preview': alias_at(alias, opt, opt.preview_height, opt.preview_width),
+        }
+        self.generators = {quality: compile_generator(generator, opt.alias_compile)
+                           for quality, generator in generators.items()}
+
+    @classmethod
+    def from_checkpoints(cls, opt, device='cpu'):
+        return cls(opt, *load_networks(opt, device), device=device)
+
+    def prepare_person(self, img_agnostic, parse_agnostic, pose, **downsampled):
+        """
+        Person-side tensors, batched [B, C, H, W], plus their downsampled
+        variants (computed here unless passed in, e.g. from a PersonCache).
+        """
+        person = {'img_agnostic': img_agnostic, 'parse_agnostic': parse_agnostic, 'pose': pose}
+        person.update(downsampled or downsample_person(img_agnostic, parse_agnostic, pose))
+        return {name: tensor.to(self.device) for name, tensor in person.items()}
+
+    def merged_parse_buffer(self, batch_size):
+        if batch_size not in self.parse_buffers:
+            self.parse_buffers[batch_size] = torch.empty(
+                batch_size, len(MERGE_LABELS), self.opt.load_height, self.opt.load_width, device=self.device)
+        return self.parse_buffers[batch_size]
+
+    def noise(self, shape):
+        """Fresh segmentation noise, drawn into the buffer kept for this shape."""
+        if shape not in self.noise_buffers:
+            self.noise_buffers[shape] = torch.empty(shape, device=self.device)
+        return gen_noise(shape, out=self.noise_buffers[shape])
+
+    def condition(self, person, c, cm):
+        """Segmentation and GMM warping: the inputs of the ALIAS generator."""
+        c = c.to(self.device)
+        # One person, K cloths: expand() views instead of K copies of the person tensors
+        person = {name: tensor.expand(c.size(0), *tensor.shape[1:]) for name, tensor in person.items()}
+        cm = cm.to(self.device)
+
+        # Segmentation
+        c_masked_down = F.interpolate(c * cm, size=LOW_RES, mode='bilinear')
+        cm_down = F.interpolate(cm, size=LOW_RES, mode='bilinear')
+        seg_input = torch.cat((cm_down, c_masked_down, person['parse_agnostic_down'], person['pose_down'],
+                               self.noise(cm_down.size())), dim=1)
+
+        parse_pred_down = self.seg(seg_input)
+        parse_pred = self.gauss(self.up(parse_pred_down))
+        parse_pred = parse_pred.argmax(dim=1)[:, None]
+
+        # Semantic merging: the groups partition the 13 labels, so summing
+        # their one-hot channels is the one-hot of the remapped label
+        parse = self.merged_parse_buffer(parse_pred.size(0))
+        parse.zero_().scatter_(1, self.merge_index[parse_pred], 1.0)
+
+        # GMM Warping
+        parse_cloth_gmm = F.interpolate(parse[:, 2:3], size=LOW_RES, mode='nearest')
+        c_gmm = F.interpolate(c, size=LOW_RES, mode='nearest')
+        gmm_input = torch.cat((parse_cloth_gmm, person['pose_gmm'], person['agnostic_gmm']), dim=1)
+
+        _, warped_grid = self.gmm(gmm_input, c_gmm)
+        warped_c = F.grid_sample(c, warped_grid, padding_mode='border')
+        warped_cm = F.grid_sample(cm, warped_grid, padding_mode='border')
+
+        # Misalignment handling
+        misalign_mask = parse[:, 2:3] - warped_cm
+        misalign_mask[misalign_mask < 0.0] = 0.0
+        parse_div = torch.cat((parse, misalign_mask), dim=1)
+        parse_div[:, 2:3] -= misalign_mask
+
+        return torch.cat((person['img_agnostic'], person['pose'], warped_c), dim=1), parse, parse_div, misalign_mask
+
+    def generate(self, inputs, quality='final'):
+        """Final try-on generation at the resolution of the quality tier."""
+        generator = self.generators[quality]
+        if self.channels_last:
+            inputs = [t.contiguous(memory_format=torch.channels_last) for t in inputs]
+        with torch.autocast('cpu', dtype=torch.bfloat16, enabled=self.bf16):
+            return generator(*inputs).float()
+
+    def __call__(self, person, c, cm, quality='final'):
+        if quality not in self.generators:
+            raise ValueError("quality must be 'preview' or 'final', got '{}'".format(quality))
+        with self.grad_mode():
+            return self.generate(self.condition(person, c, cm), quality)
+
+    def progressive(self, person, c, cm):
+        """
+        Yields ('preview', images) and then ('final', images). The merged parse
+        buffer is shared, so don't run the pipeline again until both are out.
+        """
+        with self.grad_mode():
+            inputs = self.condition(person, c, cm)
+        for quality in ('preview', 'final'):
+            with self.grad_mode():
+                images = self.generate(inputs, quality)
+            yield quality, images
@@ -1,37 +1,27 @@
 import os
 
-import cv2
-import numpy as np
-from PIL import Image
 import torch
 
 
-def gen_noise(shape):
-    noise = np.zeros(shape, dtype=np.uint8)
-    ### noise
-    noise = cv2.randn(noise, 0, 255)
-    noise = np.asarray(noise / 255, dtype=np.uint8)
-    noise = torch.tensor(noise, dtype=torch.float32)
-    return noise
+# gen_noise used to draw cv2.randn(std=255) into a uint8 array and integer-divide
+# by 255, which keeps only the samples that saturate to 255: binary noise that is
+# 1 with probability P(N(0, 1) >= 254.5 / 255)
+NOISE_THRESHOLD = 254.5 / 255
 
 
-def save_images(img_tensors, img_names, save_dir):
-    for img_tensor, img_name in zip(img_tensors, img_names):
-        tensor = (img_tensor.clone()+1)*0.5 * 255
-        tensor = tensor.cpu().clamp(0,255)
+def gen_noise(shape, out=None, device='cpu'):
+    """Binary noise map of `shape`, drawn in place into `out` if given."""
+    if out is None:
+        out = torch.empty(shape, device=device)
+    return out.normal_().ge_(NOISE_THRESHOLD)
 
-        try:
-            array = tensor.numpy().astype('uint8')
-        except:
-            array = tensor.detach().numpy().astype('uint8')
 
-        if array.shape[0] == 1:
-            array = array.squeeze(0)
-        elif array.shape[0] == 3:
-            array = array.swapaxes(0, 1).swapaxes(1, 2)
-
-        im = Image.fromarray(array)
-        im.save(os.path.join(save_dir, img_name), format='JPEG')
+def label_remap(groups, num_labels):
+    """{new: [old, ...]} -> index tensor mapping every old label to its new one."""
+    remap = torch.zeros(num_labels, dtype=torch.long)
+    for new, olds in groups.items():
+        remap[olds] = new
+    return remap
 
 
 def load_checkpoint(model, checkpoint_path):
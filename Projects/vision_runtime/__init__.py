@@ -0,0 +1,14 @@
+"""
+Shared real-time vision runtime for the YOLO webcam projects.
+
+Capture -> detect -> post-process plugins -> render -> display lives here
+once, so each app only has to describe its model, thresholds and plugins.
+"""
+from .backends import DetectorBackend, UltralyticsBackend
+from .capture import LatestFrameGrabber
+from .metrics import Metrics, MetricsServer
+from .motion import MotionGate
+from .plugins import ClassFilter, Plugin
+from .render import draw_detections
+from .runtime import FrameState, VisionRuntime
+from .stats import FPSMeter, LatencyHistogram
@@ -0,0 +1,66 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class DetectorBackend:
+    """
+    A detector turns a BGR frame into detections [[x1,y1,x2,y2,conf,cls],...]
+    in frame pixel coordinates. Subclass and implement predict().
+
+    Backends that can split their own time into stages may set last_timings
+    to {"preprocess": s, "inference": s, "postprocess": s} after each call.
+    """
+    names = {}
+    last_timings = None
+
+    def predict(self, frame):
+        raise NotImplementedError
+
+    def warmup(self, frame):
+        self.predict(frame)
+
+
+class UltralyticsBackend(DetectorBackend):
+    """
+    Wraps an ultralytics YOLO model.
+
+    input_width - optionally resize frames to this width before inference
+                  (boxes are scaled back to the original frame)
+    Any other keyword (imgsz, conf, iou, half, classes, ...) is passed to
+    model.predict on every call.
+    """
+    def __init__(self, weights, input_width=None, **predict_kwargs):
+        from ultralytics import YOLO
+
+        self.model = YOLO(weights)
+        self.names = self.model.names
+        self.input_width = input_width
+        self.predict_kwargs = {"verbose": False, **predict_kwargs}
+
+    def predict(self, frame):
+        t0 = time.perf_counter()
+        scale = 1.0
+        if self.input_width and frame.shape[1] != self.input_width:
+            scale = frame.shape[1] / self.input_width
+            height = int(round(frame.shape[0] / scale))
+            frame = cv2.resize(frame, (self.input_width, height), interpolation=cv2.INTER_AREA)
+        resize = time.perf_counter() - t0
+
+        results = self.model.predict(source=frame, **self.predict_kwargs)
+        # ultralytics reports its own preprocess/inference/postprocess split in ms
+        speed = results[0].speed
+        self.last_timings = {
+            "preprocess": resize + (speed.get("preprocess") or 0) / 1000,
+            "inference": (speed.get("inference") or 0) / 1000,
+            "postprocess": (speed.get("postprocess") or 0) / 1000,
+        }
+
+        boxes = results[0].boxes
+        if len(boxes) == 0:
+            return np.empty((0, 6))
+        dets = np.column_stack((boxes.xyxy.cpu().numpy() * scale,
+                                boxes.conf.cpu().numpy(),
+                                boxes.cls.cpu().numpy()))
+        return dets
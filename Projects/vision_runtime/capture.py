@@ -0,0 +1,89 @@
+import threading
+import time
+
+import cv2
+
+
+class LatestFrameGrabber:
+    """
+    Reads frames from a cv2.VideoCapture source.
+
+    In threaded mode a background thread keeps only the newest frame, so a
+    slow detector never works through a backlog of stale frames and the camera
+    buffer never fills up. Video files should use threaded=False so that no
+    frames are skipped.
+    """
+    def __init__(self, source=0, width=None, height=None, threaded=None):
+        self.source = source
+        self.width = width
+        self.height = height
+        # Webcams (int index) default to threaded, files/streams to sequential
+        self.threaded = isinstance(source, int) if threaded is None else threaded
+        self.cap = None
+        self.frame = None
+        self.frame_id = 0
+        self.timestamp = 0.0
+        self.stopped = False
+        self._last_read_id = 0
+        self._dropped = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self.cap = cv2.VideoCapture(self.source)
+        if self.width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open video source: {self.source}")
+        if self.threaded:
+            self._thread = threading.Thread(target=self._reader, daemon=True)
+            self._thread.start()
+        return self
+
+    def _reader(self):
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            with self._cond:
+                if not ret:
+                    self.stopped = True
+                else:
+                    self.frame = frame
+                    self.frame_id += 1
+                    self.timestamp = time.perf_counter()
+                self._cond.notify_all()
+
+    def read(self, timeout=2.0):
+        """
+        Returns (frame_id, timestamp, frame) for a frame not returned before,
+        or None once the source is exhausted or stops delivering frames.
+        """
+        if not self.threaded:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.stopped = True
+                return None
+            self.frame_id += 1
+            return self.frame_id, time.perf_counter(), frame
+
+        with self._cond:
+            fresh = self._cond.wait_for(
+                lambda: self.frame_id > self._last_read_id or self.stopped, timeout)
+            if not fresh or self.frame_id == self._last_read_id:
+                return None
+            self._dropped += self.frame_id - self._last_read_id - 1
+            self._last_read_id = self.frame_id
+            return self.frame_id, self.timestamp, self.frame
+
+    @property
+    def dropped(self):
+        """Frames overwritten before they were handed out (threaded mode only)."""
+        return self._dropped
+
+    def stop(self):
+        self.stopped = True
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        if self.cap is not None:
+            self.cap.release()
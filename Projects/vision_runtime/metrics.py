@@ -0,0 +1,164 @@
+import collections
+import contextlib
+import http.server
+import json
+import threading
+import time
+
+from .stats import LatencyHistogram
+
+# Per-frame pipeline stages, in the order they run
+STAGES = ("capture", "gate", "preprocess", "inference", "postprocess", "tracking", "render", "io")
+QUANTILES = (50, 95, 99)
+
+
+class FrameTrace:
+    """
+    Spans recorded for one frame. Durations of the same stage are summed.
+    """
+    def __init__(self, frame_id):
+        self.frame_id = frame_id
+        self.spans = []  # (stage, start, duration) with perf_counter seconds
+        self.totals = collections.defaultdict(float)
+
+    def add(self, stage, start, duration):
+        self.spans.append((stage, start, duration))
+        self.totals[stage] += duration
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start)
+
+
+class Metrics:
+    """
+    Rolling per-stage latency histograms, counters and gauges for a vision loop.
+
+    trace_path - optional JSONL file; every span is written as a Chrome trace
+                 event ({"name", "ph": "X", "ts", "dur", ...} in microseconds).
+                 `jq -s . trace.jsonl > trace.json` loads in Perfetto/chrome://tracing.
+    """
+    def __init__(self, window=1000, trace_path=None):
+        self.window = window
+        self.stages = {name: LatencyHistogram(window) for name in STAGES}
+        self.end_to_end = LatencyHistogram(window)
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.trace_file = open(trace_path, "a", encoding="utf-8") if trace_path else None
+
+    def begin(self, frame_id):
+        return FrameTrace(frame_id)
+
+    def commit(self, trace, end_to_end=None):
+        with self.lock:
+            for stage, total in trace.totals.items():
+                if stage not in self.stages:
+                    self.stages[stage] = LatencyHistogram(self.window)
+                self.stages[stage].record(total)
+            if end_to_end is not None:
+                self.end_to_end.record(end_to_end)
+            self.counters["frames"] += 1
+
+        if self.trace_file is not None:
+            for stage, start, duration in trace.spans:
+                event = {"name": stage, "ph": "X", "ts": round(start * 1e6), "dur": round(duration * 1e6),
+                         "pid": 0, "tid": 0, "args": {"frame": trace.frame_id}}
+                self.trace_file.write(json.dumps(event) + "\n")
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def summary_lines(self):
+        with self.lock:
+            lines = [f"{name:<11} {hist.summary()}" for name, hist in self.stages.items() if hist.count]
+            lines.append(f"{'end_to_end':<11} {self.end_to_end.summary()}")
+        return lines
+
+    def prometheus_text(self, prefix="vision"):
+        """
+        Renders everything in the Prometheus text exposition format (0.0.4).
+        """
+        out = []
+        with self.lock:
+            name = f"{prefix}_stage_duration_seconds"
+            out.append(f"# HELP {name} Per-frame time spent in each pipeline stage.")
+            out.append(f"# TYPE {name} histogram")
+            hists = dict(self.stages, end_to_end=self.end_to_end)
+            for stage, hist in hists.items():
+                cumulative = 0
+                for edge, count in zip(hist.BUCKETS_MS, hist.counts):
+                    cumulative += count
+                    le = "+Inf" if edge == float("inf") else repr(edge / 1000)
+                    out.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                out.append(f'{name}_sum{{stage="{stage}"}} {hist.total}')
+                out.append(f'{name}_count{{stage="{stage}"}} {hist.count}')
+
+            name = f"{prefix}_stage_duration_rolling_seconds"
+            out.append(f"# HELP {name} Percentiles over the last {self.window} frames.")
+            out.append(f"# TYPE {name} gauge")
+            for stage, hist in hists.items():
+                for q in QUANTILES:
+                    out.append(f'{name}{{stage="{stage}",quantile="{q / 100}"}} {hist.percentile(q)}')
+
+            for counter, value in sorted(self.counters.items()):
+                out.append(f"# TYPE {prefix}_{counter}_total counter")
+                out.append(f"{prefix}_{counter}_total {value}")
+            for gauge, value in sorted(self.gauges.items()):
+                out.append(f"# TYPE {prefix}_{gauge} gauge")
+                out.append(f"{prefix}_{gauge} {value}")
+        return "\n".join(out) + "\n"
+
+    def close(self):
+        if self.trace_file is not None:
+            self.trace_file.close()
+            self.trace_file = None
+
+
+class MetricsServer:
+    """
+    Serves Metrics.prometheus_text() at http://host:port/metrics from a daemon thread.
+    """
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.httpd = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        print(f"[vision_runtime] metrics at http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
@@ -0,0 +1,70 @@
+import time
+
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap change detector that decides whether a frame needs a detector pass.
+
+    The frame is downscaled to `width` pixels wide, converted to grey and
+    compared with the frame that was last sent to the detector (method="diff"),
+    or fed to a MOG2 background subtractor (method="mog2"). If the fraction of
+    changed pixels is below `min_changed`, the previous detections are reused.
+    A detector pass is still forced every `max_interval` seconds as a safety net.
+
+    pixel_threshold - grey level change that counts as a changed pixel
+    min_changed     - sensitivity: fraction of changed pixels needed to re-run
+    """
+    def __init__(self, method="diff", width=160, pixel_threshold=25, min_changed=0.01,
+                 max_interval=2.0):
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion gate method: {method}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed = min_changed
+        self.max_interval = max_interval
+        self.reference = None
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == "mog2" else None
+        self.last_inference = 0.0
+        self.inferences = 0
+        self.skipped = 0
+        self.changed = 0.0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, int(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+    def should_infer(self, frame, now=None):
+        now = time.perf_counter() if now is None else now
+        gray = self._small_gray(frame)
+
+        if self.method == "mog2":
+            mask = self.subtractor.apply(gray)
+            self.changed = cv2.countNonZero(mask) / mask.size
+        elif self.reference is None or self.reference.shape != gray.shape:
+            self.changed = 1.0
+        else:
+            diff = cv2.absdiff(self.reference, gray)
+            self.changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_threshold, 255,
+                                                          cv2.THRESH_BINARY)[1]) / diff.size
+
+        if (self.changed >= self.min_changed or self.inferences == 0
+                or now - self.last_inference >= self.max_interval):
+            self.reference = gray
+            self.last_inference = now
+            self.inferences += 1
+            return True
+
+        self.skipped += 1
+        return False
+
+    @property
+    def skip_ratio(self):
+        total = self.inferences + self.skipped
+        return self.skipped / total if total else 0.0
+
+    def summary(self):
+        return f"inferences={self.inferences} skipped={self.skipped} ({100 * self.skip_ratio:.0f}%)"
@@ -0,0 +1,38 @@
+class Plugin:
+    """
+    Post-processing hook run on every frame after detection.
+
+    process() may filter or replace state.dets, add text to state.overlays or
+    store anything in state.info. draw() is only called when a window is shown.
+    `stage` names the metrics stage process() time is counted under.
+    """
+    stage = "postprocess"
+
+    def on_start(self, runtime):
+        pass
+
+    def process(self, state):
+        pass
+
+    def draw(self, frame, state):
+        pass
+
+    def on_stop(self):
+        pass
+
+
+class ClassFilter(Plugin):
+    """
+    Keeps detections whose class is listed and whose confidence reaches that
+    class's threshold, e.g. ClassFilter({0: 0.5, 1: 0.5}).
+    """
+    def __init__(self, min_conf):
+        self.min_conf = dict(min_conf)
+
+    def process(self, state):
+        dets = state.dets
+        if len(dets) == 0:
+            return
+        keep = [i for i, (conf, cls) in enumerate(dets[:, 4:6])
+                if int(cls) in self.min_conf and conf >= self.min_conf[int(cls)]]
+        state.dets = dets[keep]
@@ -0,0 +1,23 @@
+import cv2
+
+COLORS = [(0, 255, 0), (0, 0, 255), (255, 0, 0), (0, 255, 255), (255, 0, 255), (255, 255, 0)]
+
+
+def draw_detections(frame, dets, names):
+    """
+    Draws [[x1,y1,x2,y2,conf,cls],...] boxes with class name and confidence.
+    """
+    for x1, y1, x2, y2, conf, cls in dets[:, :6]:
+        color = COLORS[int(cls) % len(COLORS)]
+        cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), color, 2)
+        cv2.putText(frame, f"{names.get(int(cls), int(cls))} {conf:.2f}", (int(x1), max(15, int(y1) - 8)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return frame
+
+
+def draw_overlays(frame, lines, origin=(10, 30)):
+    x, y = origin
+    for text, color in lines:
+        cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.75, color, 2, cv2.LINE_AA)
+        y += 30
+    return frame
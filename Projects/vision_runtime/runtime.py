@@ -0,0 +1,177 @@
+import time
+
+import cv2
+
+from .capture import LatestFrameGrabber
+from .metrics import Metrics, MetricsServer
+from .render import draw_detections, draw_overlays
+from .stats import FPSMeter
+
+
+class FrameState:
+    """
+    Everything known about one frame as it moves through the runtime.
+    """
+    def __init__(self, frame_id, timestamp, frame, dets):
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self.frame = frame
+        self.dets = dets
+        self.overlays = []  # (text, bgr colour) lines drawn top-left
+        self.info = {}
+
+
+class VisionRuntime:
+    """
+    Capture -> detect -> plugins -> render -> display loop shared by the apps.
+
+    source       - camera index or video path (see LatestFrameGrabber)
+    backend      - a DetectorBackend
+    plugins      - Plugin instances run in order after detection
+    gate         - optional MotionGate; unchanged frames reuse the last detections
+    headless     - no window; progress is printed every report_every seconds
+    draw_boxes   - draw the (filtered) detections before plugin drawing
+    metrics_port - serve per-stage Prometheus metrics at localhost:<port>/metrics
+    trace_path   - append per-frame stage spans to this JSONL file
+    """
+    def __init__(self, source, backend, plugins=(), gate=None, headless=False, window_name="YOLO",
+                 quit_key="q", capture_width=None, capture_height=None, threaded=None,
+                 draw_boxes=True, show_fps=True, report_every=5.0, max_frames=None,
+                 metrics_port=None, trace_path=None):
+        self.grabber = LatestFrameGrabber(source, capture_width, capture_height, threaded)
+        self.backend = backend
+        self.plugins = list(plugins)
+        self.gate = gate
+        self.last_dets = None
+        self.headless = headless
+        self.window_name = window_name
+        self.quit_key = quit_key
+        self.draw_boxes = draw_boxes
+        self.show_fps = show_fps
+        self.report_every = report_every
+        self.max_frames = max_frames
+
+        self.fps = FPSMeter()
+        self.metrics = Metrics(trace_path=trace_path)
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.frames = 0
+        self.running = False
+
+    def render(self, state):
+        frame = state.frame
+        if self.draw_boxes:
+            draw_detections(frame, state.dets, self.backend.names)
+        for plugin in self.plugins:
+            plugin.draw(frame, state)
+        lines = list(state.overlays)
+        if self.show_fps:
+            lines.insert(0, (f"FPS: {self.fps.fps:.1f}", (0, 255, 0)))
+            if self.gate is not None:
+                lines.insert(1, (f"Skipped: {self.gate.skipped}/{self.gate.skipped + self.gate.inferences}",
+                                 (0, 255, 0)))
+        return draw_overlays(frame, lines)
+
+    def _detect(self, frame, trace):
+        start = time.perf_counter()
+        dets = self.backend.predict(frame)
+        total = time.perf_counter() - start
+        timings = self.backend.last_timings
+        if not timings:
+            trace.add("inference", start, total)
+            return dets
+        # Lay the backend's own split out back to back; the rest is result conversion
+        for stage in ("preprocess", "inference", "postprocess"):
+            duration = timings.get(stage, 0.0)
+            trace.add(stage, start, duration)
+            start += duration
+        trace.add("postprocess", start, max(0.0, total - sum(timings.values())))
+        return dets
+
+    def step(self, item, trace=None):
+        """
+        Runs one captured (frame_id, timestamp, frame) through the pipeline.
+        Returns False when the user asked to quit.
+        """
+        frame_id, timestamp, frame = item
+        trace = trace or self.metrics.begin(frame_id)
+
+        reused = False
+        if self.gate is not None:
+            with trace.stage("gate"):
+                reused = not self.gate.should_infer(frame) and self.last_dets is not None
+        if reused:
+            dets = self.last_dets.copy()
+            self.metrics.inc("inferences_skipped")
+        else:
+            dets = self._detect(frame, trace)
+            self.last_dets = dets
+            self.metrics.inc("inferences")
+
+        state = FrameState(frame_id, timestamp, frame, dets)
+        state.info["reused_detections"] = reused
+        for plugin in self.plugins:
+            with trace.stage(plugin.stage):
+                plugin.process(state)
+
+        keep_going = True
+        if not self.headless:
+            with trace.stage("render"):
+                annotated = self.render(state)
+            with trace.stage("io"):
+                cv2.imshow(self.window_name, annotated)
+                # waitKey(1) only pumps the GUI; capture keeps running in its thread
+                if cv2.waitKey(1) & 0xFF == ord(self.quit_key):
+                    keep_going = False
+
+        now = time.perf_counter()
+        self.fps.update(now)
+        self.metrics.commit(trace, end_to_end=now - timestamp)
+        self.metrics.set_gauge("fps", round(self.fps.fps, 2))
+        self.metrics.set_gauge("frames_dropped", self.grabber.dropped)
+        self.frames += 1
+        return keep_going
+
+    def report(self):
+        print(f"[vision_runtime] frames={self.frames} fps={self.fps.fps:.1f} dropped={self.grabber.dropped}")
+        if self.gate is not None:
+            print(f"  motion gate {self.gate.summary()}")
+        for line in self.metrics.summary_lines():
+            print(f"  {line}")
+
+    def run(self):
+        self.grabber.start()
+        if self.metrics_port:
+            self.metrics_server = MetricsServer(self.metrics, port=self.metrics_port).start()
+        for plugin in self.plugins:
+            plugin.on_start(self)
+        self.running = True
+        last_report = time.perf_counter()
+        try:
+            while self.running:
+                trace = self.metrics.begin(self.frames + 1)
+                with trace.stage("capture"):
+                    item = self.grabber.read()
+                if item is None:
+                    break
+                trace.frame_id = item[0]
+                if not self.step(item, trace):
+                    break
+                if self.max_frames and self.frames >= self.max_frames:
+                    break
+                if self.headless and time.perf_counter() - last_report >= self.report_every:
+                    self.report()
+                    last_report = time.perf_counter()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.running = False
+            self.grabber.stop()
+            for plugin in self.plugins:
+                plugin.on_stop()
+            if not self.headless:
+                cv2.destroyAllWindows()
+            self.report()
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.metrics.close()
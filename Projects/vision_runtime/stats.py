@@ -0,0 +1,58 @@
+import collections
+
+import numpy as np
+
+
+class FPSMeter:
+    """
+    Frame rate smoothed with an exponential moving average of the frame
+    interval, instead of 1 / (single frame delta).
+    """
+    def __init__(self, alpha=0.1):
+        self.alpha = alpha
+        self.interval = None
+        self.last = None
+
+    def update(self, now):
+        if self.last is not None:
+            dt = now - self.last
+            self.interval = dt if self.interval is None else (1 - self.alpha) * self.interval + self.alpha * dt
+        self.last = now
+
+    @property
+    def fps(self):
+        return 1.0 / self.interval if self.interval else 0.0
+
+
+class LatencyHistogram:
+    """
+    Latency samples in seconds: cumulative bucket counts plus a rolling window
+    for percentiles.
+    """
+    BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, float("inf"))
+
+    def __init__(self, window=1000):
+        self.samples = collections.deque(maxlen=window)
+        self.counts = [0] * len(self.BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        ms = seconds * 1000
+        for i, edge in enumerate(self.BUCKETS_MS):
+            if ms <= edge:
+                self.counts[i] += 1
+                break
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        return float(np.percentile(self.samples, q))
+
+    def summary(self):
+        return (f"n={self.count} mean={1000 * self.total / max(self.count, 1):.1f}ms "
+                f"p50={1000 * self.percentile(50):.1f}ms p95={1000 * self.percentile(95):.1f}ms "
+                f"p99={1000 * self.percentile(99):.1f}ms")